@@ -5,6 +5,10 @@ from sqlalchemy import pool
 
 from alembic import context
 from app.models.user_model import Base  # adjust "myapp.models" to the actual location of your Base
+import app.models.token_model  # noqa: F401  registers the token tables on Base.metadata
+import app.models.email_outbox_model  # noqa: F401  registers the email outbox table on Base.metadata
+import app.models.broadcast_model  # noqa: F401  registers the email broadcast table on Base.metadata
+import app.models.password_policy_model  # noqa: F401  registers the password hash policy table on Base.metadata
 
 
 # this is the Alembic Config object, which provides
@@ -0,0 +1,43 @@
+"""add email_outbox table for the transactional email outbox
+
+Revision ID: 5e2b9c7d1a48
+Revises: 9d4a7e1b2c35
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e2b9c7d1a48'
+down_revision: Union[str, None] = '9d4a7e1b2c35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('email_outbox',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('email_type', sa.String(length=50), nullable=False),
+    sa.Column('recipient', sa.String(length=255), nullable=False),
+    sa.Column('context', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('priority', sa.SmallInteger(), nullable=False),
+    sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('available_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('failed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_email_outbox_pending', 'email_outbox', ['priority', 'available_at'], unique=False,
+                    postgresql_where=sa.text('sent_at IS NULL AND failed_at IS NULL'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_email_outbox_pending', table_name='email_outbox', postgresql_where=sa.text('sent_at IS NULL AND failed_at IS NULL'))
+    op.drop_table('email_outbox')
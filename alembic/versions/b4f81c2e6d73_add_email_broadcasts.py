@@ -0,0 +1,43 @@
+"""add email_broadcasts table for admin email campaigns
+
+Revision ID: b4f81c2e6d73
+Revises: 5e2b9c7d1a48
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4f81c2e6d73'
+down_revision: Union[str, None] = '5e2b9c7d1a48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('email_broadcasts',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('subject', sa.String(length=255), nullable=False),
+    sa.Column('body', sa.Text(), nullable=False),
+    sa.Column('audience', sa.String(length=20), nullable=False),
+    sa.Column('role', sa.String(length=20), nullable=True),
+    sa.Column('rate_per_minute', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('sent', sa.Integer(), nullable=False),
+    sa.Column('failed', sa.Integer(), nullable=False),
+    sa.Column('last_created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('last_user_id', sa.UUID(), nullable=True),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('email_broadcasts')
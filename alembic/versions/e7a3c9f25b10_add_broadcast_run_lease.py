@@ -0,0 +1,28 @@
+"""add run_id and lease to email_broadcasts so only one runner sends a campaign
+
+Revision ID: e7a3c9f25b10
+Revises: b4f81c2e6d73
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a3c9f25b10'
+down_revision: Union[str, None] = 'b4f81c2e6d73'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('email_broadcasts', sa.Column('run_id', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('email_broadcasts', sa.Column('lease_expires_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('email_broadcasts', 'lease_expires_at')
+    op.drop_column('email_broadcasts', 'run_id')
@@ -0,0 +1,32 @@
+"""add password_hash_policies table so workers share one calibrated hash cost
+
+Revision ID: f1c8d2a7b964
+Revises: e7a3c9f25b10
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1c8d2a7b964'
+down_revision: Union[str, None] = 'e7a3c9f25b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('password_hash_policies',
+    sa.Column('scheme', sa.String(length=16), nullable=False),
+    sa.Column('cost', sa.Integer(), nullable=False),
+    sa.Column('target_ms', sa.Float(), nullable=False),
+    sa.Column('calibrated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('scheme')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('password_hash_policies')
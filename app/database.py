@@ -1,21 +1,130 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from builtins import ValueError, bool, dict, float, int, isinstance, len, list, max, str
+import itertools
+import time
+from typing import Sequence
+from uuid import uuid4
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 Base = declarative_base()
 
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Async queue pool that records how long callers wait to check out a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._waiting = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_seconds_total = 0.0
+        self._wait_seconds_max = 0.0
+
+    def connect(self):
+        started = time.perf_counter()
+        self._waiting += 1
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self._timeouts += 1
+            raise
+        finally:
+            self._waiting -= 1
+            waited = time.perf_counter() - started
+            self._checkouts += 1
+            self._wait_seconds_total += waited
+            self._wait_seconds_max = max(self._wait_seconds_max, waited)
+
+    def stats(self) -> dict:
+        """Return occupancy and checkout wait-time metrics for the pool."""
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": self.overflow(),
+            "waiting": self._waiting,
+            "checkouts": self._checkouts,
+            "timeouts": self._timeouts,
+            "wait_seconds_total": self._wait_seconds_total,
+            "wait_seconds_max": self._wait_seconds_max,
+            "wait_seconds_avg": self._wait_seconds_total / self._checkouts if self._checkouts else 0.0,
+        }
+
+def create_pooled_engine(database_url: str, echo: bool = False, pool_size: int = 5, max_overflow: int = 10,
+                         pool_timeout: float = 30.0, pool_recycle: int = -1, pool_pre_ping: bool = False,
+                         pgbouncer: bool = False) -> AsyncEngine:
+    """
+    Create an async engine backed by an instrumented connection pool.
+
+    With `pgbouncer` enabled, asyncpg's prepared statement caches are turned off and statement
+    names are made unique, since a transaction-pooling proxy may hand each transaction a
+    different server connection.
+    """
+    connect_args = {}
+    if pgbouncer and "+asyncpg" in database_url:
+        connect_args = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    return create_async_engine(
+        database_url,
+        echo=echo,
+        future=True,
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=pool_recycle,
+        pool_pre_ping=pool_pre_ping,
+        connect_args=connect_args,
+    )
+
 class Database:
-    """Handles database connections and sessions."""
+    """
+    Handles database connections and sessions.
+
+    Writes go to the primary engine. Optional read replicas get their own engines and pools, and
+    `get_replica_session_factory` hands them out round-robin (falling back to the primary).
+    Read session factories open read-only transactions, so lookups never need a COMMIT.
+    """
     _engine = None
     _session_factory = None
+    _read_session_factory = None
+    _replica_engines = []
+    _replica_session_factories = []
+    _replica_cycle = None
 
     @classmethod
-    def initialize(cls, database_url: str, echo: bool = False):
-        """Initialize the async engine and sessionmaker."""
+    def initialize(cls, database_url: str, echo: bool = False, replica_urls: Sequence[str] = (), **pool_options):
+        """
+        Initialize the async engines and sessionmakers.
+
+        `pool_options` are passed to `create_pooled_engine` (pool_size, max_overflow,
+        pool_timeout, pool_recycle, pool_pre_ping, pgbouncer) for the primary and every replica.
+        """
         if cls._engine is None:  # Ensure engine is created once
-            cls._engine = create_async_engine(database_url, echo=echo, future=True)
-            cls._session_factory = sessionmaker(
-                bind=cls._engine, class_=AsyncSession, expire_on_commit=False, future=True
-            )
+            cls._engine = create_pooled_engine(database_url, echo=echo, **pool_options)
+            cls._session_factory = cls._make_session_factory(cls._engine)
+            cls._read_session_factory = cls._make_session_factory(cls._engine, readonly=True)
+            cls._replica_engines = [create_pooled_engine(url, echo=echo, **pool_options) for url in replica_urls]
+            cls._replica_session_factories = [cls._make_session_factory(engine, readonly=True, replica=True)
+                                              for engine in cls._replica_engines]
+            cls._replica_cycle = itertools.cycle(cls._replica_session_factories) if cls._replica_session_factories else None
+
+    @staticmethod
+    def _make_session_factory(engine: AsyncEngine, readonly: bool = False, replica: bool = False):
+        if readonly and engine.dialect.name == "postgresql":
+            # asyncpg folds this into its BEGIN, so it costs no extra round-trip
+            engine = engine.execution_options(postgresql_readonly=True)
+        return sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False, future=True,
+                            info={"replica": replica})
+
+    @staticmethod
+    def is_replica_session(session: AsyncSession) -> bool:
+        """True if the session reads from a replica, which may lag behind the primary."""
+        return session.info.get("replica", False)
 
     @classmethod
     def get_session_factory(cls):
@@ -23,3 +132,67 @@ class Database:
         if cls._session_factory is None:
             raise ValueError("Database not initialized. Call `initialize()` first.")
         return cls._session_factory
+
+    @classmethod
+    def get_engine(cls) -> AsyncEngine:
+        """Returns the primary engine, ensuring it's initialized."""
+        if cls._engine is None:
+            raise ValueError("Database not initialized. Call `initialize()` first.")
+        return cls._engine
+
+    @classmethod
+    def get_engines(cls) -> list:
+        """The primary engine followed by any replica engines; empty before initialization."""
+        return [cls._engine, *cls._replica_engines] if cls._engine is not None else []
+
+    @classmethod
+    async def dispose(cls):
+        """Close every pooled connection and forget the engines, so `initialize()` can run again."""
+        for engine in cls.get_engines():
+            await engine.dispose()
+        cls._engine = None
+        cls._session_factory = None
+        cls._read_session_factory = None
+        cls._replica_engines = []
+        cls._replica_session_factories = []
+        cls._replica_cycle = None
+
+    @classmethod
+    def get_read_session_factory(cls):
+        """Returns the read-only session factory for the primary."""
+        if cls._read_session_factory is None:
+            raise ValueError("Database not initialized. Call `initialize()` first.")
+        return cls._read_session_factory
+
+    @classmethod
+    def get_replica_session_factory(cls):
+        """Returns the next read-only replica session factory, or the primary's when no replicas are configured."""
+        if cls._replica_cycle is None:
+            return cls.get_read_session_factory()
+        return next(cls._replica_cycle)
+
+    @classmethod
+    def has_replicas(cls) -> bool:
+        return len(cls._replica_session_factories) > 0
+
+    @classmethod
+    def set_echo(cls, echo: bool):
+        """Toggle SQL statement logging on the live engines."""
+        for engine in [cls._engine, *cls._replica_engines]:
+            if engine is not None:
+                engine.echo = echo
+
+    @staticmethod
+    def _engine_pool_stats(engine: AsyncEngine) -> dict:
+        pool = engine.pool
+        return pool.stats() if isinstance(pool, InstrumentedAsyncQueuePool) else {"status": pool.status()}
+
+    @classmethod
+    def pool_stats(cls) -> dict:
+        """Return connection pool metrics, or an empty dict before initialization."""
+        if cls._engine is None:
+            return {}
+        stats = cls._engine_pool_stats(cls._engine)
+        if cls._replica_engines:
+            stats["replicas"] = [cls._engine_pool_stats(engine) for engine in cls._replica_engines]
+        return stats
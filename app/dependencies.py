@@ -1,21 +1,19 @@
-from builtins import Exception, dict, str
-from fastapi import Depends, HTTPException
+from builtins import Exception, ValueError, bool, dict, float, str
+import time
+from fastapi import Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import Database
-from app.utils.template_manager import TemplateManager
 from app.services.email_service import EmailService
 from app.services.jwt_service import decode_token
-from settings.config import Settings
+from app.services.service_container import services
+from app.services.token_revocation_service import token_revocation
+from settings.config import Settings, get_settings
 from fastapi import Depends
 
-def get_settings() -> Settings:
-    """Return application settings."""
-    return Settings()
-
 def get_email_service() -> EmailService:
-    template_manager = TemplateManager()
-    return EmailService(template_manager=template_manager)
+    """The process-wide EmailService from the service container."""
+    return services.email_service
 
 async def get_db() -> AsyncSession:
     """Dependency that provides a database session for each request."""
@@ -25,11 +23,42 @@ async def get_db() -> AsyncSession:
             yield session
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
+
+# Cookie holding the time of the client's last write, used for read-your-writes on replicas
+READ_CONSISTENCY_COOKIE = "read_consistency"
+
+def wrote_recently(request: Request) -> bool:
+    """True if the client's consistency token says it wrote within the replica lag window."""
+    token = request.cookies.get(READ_CONSISTENCY_COOKIE)
+    if not token:
+        return False
+    try:
+        written_at = float(token)
+    except ValueError:
+        return False
+    return time.time() - written_at < get_settings().replica_read_your_writes_seconds
+
+async def get_read_db(request: Request) -> AsyncSession:
+    """
+    Dependency that provides a session for read-only routes.
+
+    The session runs one read-only transaction and is bound to a read replica, unless the client
+    wrote recently, in which case it is pinned to the primary so it sees its own changes.
+    """
+    if wrote_recently(request):
+        async_session_factory = Database.get_read_session_factory()
+    else:
+        async_session_factory = Database.get_replica_session_factory()
+    async with async_session_factory() as session:
+        try:
+            yield session
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
         
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
+async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=401,
         detail="Could not validate credentials",
@@ -42,6 +71,8 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
     user_role: str = payload.get("role")
     if user_id is None or user_role is None:
         raise credentials_exception
+    if await token_revocation.is_revoked(payload.get("jti")):
+        raise credentials_exception
     return {"user_id": user_id, "role": user_role}
 
 def require_role(role: str):
@@ -1,12 +1,88 @@
-from builtins import Exception
+from builtins import AttributeError, Exception, NotImplementedError, RuntimeError
+import asyncio
+import logging
+import math
+import signal
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from pydantic import ValidationError
 from starlette.responses import JSONResponse
 from starlette.middleware.cors import CORSMiddleware  # Import the CORSMiddleware
 from app.database import Database
-from app.dependencies import get_settings
-from app.routers import user_routes
+from app.dependencies import READ_CONSISTENCY_COOKIE, get_email_service, get_settings
+from app.routers import admin_routes, user_routes
+from app.services.broadcast_service import broadcast_engine
+from app.services.email_outbox_service import email_outbox
+from app.services.invalidation_bus import invalidation_bus
+from app.services.login_throttle import login_throttle
+from app.services.password_policy_service import PasswordPolicyService
+from app.services.service_container import services
+from app.services.token_revocation_service import token_revocation
+from app.services.user_cache import user_cache
+from app.services.user_service import UserService
 from app.utils.api_description import getDescription
+from app.utils.security import password_hasher
+from settings.config import add_reload_listener, reload_settings
+
+logger = logging.getLogger(__name__)
+
+def _apply_reloaded_settings(settings):
+    Database.set_echo(settings.debug)
+    login_throttle.configure(settings)
+
+def _reload_settings_on_signal():
+    try:
+        reload_settings()
+        logger.info("Settings reloaded on SIGHUP")
+    except ValidationError as e:
+        logger.error(f"Settings reload failed, keeping previous settings: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build and warm the shared services before serving, and drain them after the last request."""
+    settings = get_settings()
+    await services.start(settings)
+    add_reload_listener(_apply_reloaded_settings)
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, _reload_settings_on_signal)
+    except (AttributeError, NotImplementedError, RuntimeError):
+        # No SIGHUP on this platform, or not running in the main thread
+        logger.info("SIGHUP settings reload is unavailable; use POST /admin/settings/reload")
+    if settings.password_hash_target_ms > 0:
+        await PasswordPolicyService.apply_calibrated_cost(
+            Database.get_session_factory(), password_hasher,
+            settings.password_hash_target_ms,
+            min_rounds=settings.password_hash_min_rounds,
+            max_rounds=settings.password_hash_max_rounds
+        )
+    if settings.cache_invalidation_enabled:
+        try:
+            await invalidation_bus.start(Database.get_engine(), UserService.apply_invalidation, on_reset=user_cache.clear,
+                                         listen_url=settings.cache_invalidation_database_url,
+                                         pgbouncer=settings.db_pgbouncer_mode)
+        except Exception as e:
+            # Caches still expire by TTL; only cross-worker eviction is lost
+            logger.error(f"Cache invalidation bus unavailable: {e}")
+    try:
+        await token_revocation.start()
+    except Exception as e:
+        # The first token check retries the load
+        logger.error(f"Could not load revoked tokens: {e}")
+    if settings.email_outbox_enabled:
+        await email_outbox.start(get_email_service)
+    try:
+        yield
+    finally:
+        await broadcast_engine.stop()
+        await email_outbox.stop()
+        await token_revocation.stop()
+        await invalidation_bus.stop()
+        password_hasher.shutdown()
+        await services.stop()
+
 app = FastAPI(
+    lifespan=lifespan,
     title="User Management",
     description=getDescription(),
     version="0.0.1",
@@ -28,15 +104,23 @@ app.add_middleware(
     allow_headers=["*"],  # Allowed HTTP headers
 )
 
-@app.on_event("startup")
-async def startup_event():
-    settings = get_settings()
-    Database.initialize(settings.database_url, settings.debug)
+# Requests with these methods never write, so they don't need read-your-writes pinning
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+@app.middleware("http")
+async def read_consistency_middleware(request, call_next):
+    """Stamp successful writes with a consistency cookie so the client's next reads use the primary."""
+    response = await call_next(request)
+    if Database.has_replicas() and request.method not in SAFE_METHODS and response.status_code < 400:
+        window = get_settings().replica_read_your_writes_seconds
+        response.set_cookie(READ_CONSISTENCY_COOKIE, str(time.time()), max_age=math.ceil(window), httponly=True, samesite="lax")
+    return response
 
 @app.exception_handler(Exception)
 async def exception_handler(request, exc):
     return JSONResponse(status_code=500, content={"message": "An unexpected error occurred."})
 
 app.include_router(user_routes.router)
+app.include_router(admin_routes.router)
 
 
@@ -0,0 +1,55 @@
+from builtins import str
+from datetime import datetime
+from enum import Enum
+import uuid
+from sqlalchemy import Column, DateTime, Integer, String, Text, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+class BroadcastAudience(str, Enum):
+    """Which users a broadcast goes to."""
+    ALL = "all"
+    UNVERIFIED = "unverified"
+    ROLE = "role"
+
+class BroadcastStatus(str, Enum):
+    RUNNING = "running"
+    PAUSED = "paused"
+    COMPLETED = "completed"
+
+class EmailBroadcast(Base):
+    """
+    An admin email campaign and how far it has got.
+
+    Recipients are walked in the users table's (created_at, id) order. After every batch the
+    key of the last recipient is saved in `last_created_at`/`last_user_id`, so a paused or
+    interrupted broadcast resumes right after the last batch it finished.
+
+    Each runner owns the campaign through `run_id`, which every start and resume increments;
+    a runner that finds another run_id stops, so no two runners ever send the same campaign.
+    The runner renews `lease_expires_at` after every batch. A campaign still `running` with
+    an expired lease lost its runner (e.g. its process died) and may be resumed.
+    """
+    __tablename__ = "email_broadcasts"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    subject: Mapped[str] = Column(String(255), nullable=False)
+    body: Mapped[str] = Column(Text, nullable=False)
+    audience: Mapped[str] = Column(String(20), nullable=False)
+    role: Mapped[str] = Column(String(20), nullable=True)
+    rate_per_minute: Mapped[int] = Column(Integer, nullable=False)
+    status: Mapped[str] = Column(String(20), nullable=False, default=BroadcastStatus.RUNNING.value)
+    total: Mapped[int] = Column(Integer, nullable=False, default=0)
+    sent: Mapped[int] = Column(Integer, nullable=False, default=0)
+    failed: Mapped[int] = Column(Integer, nullable=False, default=0)
+    last_created_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+    last_user_id: Mapped[uuid.UUID] = Column(UUID(as_uuid=True), nullable=True)
+    last_error: Mapped[str] = Column(Text, nullable=True)
+    run_id: Mapped[int] = Column(Integer, nullable=False, default=1, server_default="1")
+    lease_expires_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+    created_at: Mapped[datetime] = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    finished_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<EmailBroadcast {self.id} {self.status} {self.sent}/{self.total}>"
@@ -0,0 +1,37 @@
+from builtins import str
+from datetime import datetime
+import uuid
+from sqlalchemy import Column, DateTime, Index, Integer, SmallInteger, String, Text, func, text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+class OutboxEmail(Base):
+    """
+    An email waiting to be sent, written in the same transaction as the change that caused it.
+
+    The outbox worker claims due rows in `priority` order (lower first), sends them, and stamps
+    `sent_at`. Failed sends are pushed back by moving `available_at`; after too many attempts
+    `failed_at` is set and the row is left for inspection.
+    """
+    __tablename__ = "email_outbox"
+    # Workers only ever scan pending rows, in claim order
+    __table_args__ = (
+        Index("ix_email_outbox_pending", "priority", "available_at",
+              postgresql_where=text("sent_at IS NULL AND failed_at IS NULL")),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    email_type: Mapped[str] = Column(String(50), nullable=False)
+    recipient: Mapped[str] = Column(String(255), nullable=False)
+    context: Mapped[dict] = Column(JSONB, nullable=False)
+    priority: Mapped[int] = Column(SmallInteger, nullable=False)
+    attempts: Mapped[int] = Column(Integer, nullable=False, server_default="0")
+    available_at: Mapped[datetime] = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    created_at: Mapped[datetime] = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    sent_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+    failed_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+    last_error: Mapped[str] = Column(Text, nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<OutboxEmail {self.id} {self.email_type} to {self.recipient}>"
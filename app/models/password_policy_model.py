@@ -0,0 +1,22 @@
+from builtins import str
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Float, Integer, String, func
+from sqlalchemy.orm import Mapped
+from app.database import Base
+
+class PasswordHashPolicy(Base):
+    """
+    The calibrated cost of a password hash scheme, shared by every worker.
+
+    The first worker to start with a latency budget calibrates and stores the cost; the others
+    adopt it, so all of them hash, and decide what to rehash, under the same policy.
+    """
+    __tablename__ = "password_hash_policies"
+
+    scheme: Mapped[str] = Column(String(16), primary_key=True)
+    cost: Mapped[int] = Column(Integer, nullable=False)
+    target_ms: Mapped[float] = Column(Float, nullable=False)
+    calibrated_at: Mapped[datetime] = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<PasswordHashPolicy {self.scheme} cost={self.cost}>"
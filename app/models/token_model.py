@@ -0,0 +1,45 @@
+from builtins import str
+from datetime import datetime
+import uuid
+from sqlalchemy import Column, DateTime, ForeignKey, String, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+class RevokedToken(Base):
+    """
+    A revoked access token, identified by its `jti` claim.
+
+    Rows are only needed until the token would have expired anyway, so `expires_at` lets
+    old entries be skipped and purged.
+    """
+    __tablename__ = "revoked_tokens"
+
+    jti: Mapped[str] = Column(String(64), primary_key=True)
+    expires_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=False, index=True)
+    revoked_at: Mapped[datetime] = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<RevokedToken {self.jti}>"
+
+class RefreshToken(Base):
+    """
+    A refresh token issued at login, stored as a SHA-256 hash of the opaque value.
+
+    Each refresh rotates the token: the presented one is marked used and a new one is issued
+    in the same `family_id`. Presenting a used or revoked token again means it leaked, so the
+    whole family is revoked.
+    """
+    __tablename__ = "refresh_tokens"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id: Mapped[uuid.UUID] = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    family_id: Mapped[uuid.UUID] = Column(UUID(as_uuid=True), nullable=False, index=True)
+    token_hash: Mapped[str] = Column(String(64), nullable=False, unique=True)
+    expires_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=False, index=True)
+    created_at: Mapped[datetime] = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    used_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+    revoked_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<RefreshToken {self.id} family={self.family_id}>"
@@ -0,0 +1,134 @@
+from builtins import ValueError, dict, sorted, str
+import logging
+from datetime import datetime, timezone
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import Database
+from app.dependencies import get_db, require_role
+from app.models.broadcast_model import EmailBroadcast
+from app.schemas.broadcast_schemas import BroadcastCreate, BroadcastResponse
+from app.schemas.token_schema import RevokeTokenRequest
+from app.services.broadcast_service import broadcast_engine
+from app.services.email_outbox_service import email_outbox
+from app.services.invalidation_bus import invalidation_bus
+from app.services.jwt_service import claims_cache, decode_token
+from app.services.login_throttle import login_throttle
+from app.services.service_container import services
+from app.services.token_revocation_service import token_revocation
+from app.services.user_cache import user_cache
+from app.utils.security import password_hasher
+from app.utils.smtp_connection import smtp_stats
+from settings.config import reload_settings
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+@router.get("/admin/metrics", name="admin_metrics", tags=["Administration Requires (Admin Role)"])
+async def metrics(current_user: dict = Depends(require_role(["ADMIN"]))):
+    """
+    Runtime metrics for the worker pools behind the API.
+
+    - **password_hasher**: queue depth, in-flight operations and wait times of the bcrypt pool.
+    - **database_pool**: checked-out and overflow connections, waiting callers and checkout wait times.
+    - **user_cache**: size, hits, misses and evictions of the in-process user lookup cache.
+    - **cache_invalidation**: whether this worker is listening for invalidations from the others.
+    - **jwt_claims_cache**: size and hit rate of the verified-token claims cache.
+    - **token_revocation**: size of the revoked-token bloom filter and how often it sent checks to the database.
+    - **login_throttle**: login attempts allowed and rejected before reaching bcrypt.
+    - **smtp**: open and idle sessions, sends, failures and reconnects of the SMTP pool.
+    - **email_outbox**: batches claimed and emails sent, retried and given up on by this worker.
+    - **broadcasts**: campaigns running on this worker and what they have sent.
+    - **services**: what this worker warmed up at startup and how long it took.
+    """
+    return {
+        "password_hasher": password_hasher.stats(),
+        "database_pool": Database.pool_stats(),
+        "user_cache": user_cache.stats(),
+        "cache_invalidation": invalidation_bus.stats(),
+        "jwt_claims_cache": claims_cache.stats(),
+        "token_revocation": token_revocation.stats(),
+        "login_throttle": login_throttle.stats(),
+        "smtp": smtp_stats(),
+        "email_outbox": email_outbox.stats(),
+        "broadcasts": broadcast_engine.stats(),
+        "services": services.stats(),
+    }
+
+@router.post("/admin/tokens/revoke", status_code=status.HTTP_204_NO_CONTENT, name="revoke_token", tags=["Administration Requires (Admin Role)"])
+async def revoke_token(revoke_request: RevokeTokenRequest, session: AsyncSession = Depends(get_db), current_user: dict = Depends(require_role(["ADMIN"]))):
+    """
+    Revoke a compromised access token. Other workers reject it after their next filter sync.
+    """
+    claims = decode_token(revoke_request.token)
+    if claims is None or not claims.get("jti"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Token is invalid, expired or cannot be revoked")
+    await token_revocation.revoke(session, claims["jti"], datetime.fromtimestamp(claims["exp"], timezone.utc))
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.post("/admin/settings/reload", name="reload_settings", tags=["Administration Requires (Admin Role)"])
+async def reload_settings_endpoint(current_user: dict = Depends(require_role(["ADMIN"]))):
+    """
+    Re-read the environment and .env and atomically swap the shared settings snapshot.
+
+    Values read per request, such as `max_login_attempts` and `debug`, take effect immediately.
+    If the new configuration fails validation the previous settings stay active.
+    """
+    try:
+        settings = reload_settings()
+    except ValidationError as e:
+        # The full error echoes the rejected values, which may be secrets; only name the fields
+        logger.error(f"Settings reload rejected: {e}")
+        fields = sorted({".".join(str(part) for part in error["loc"]) for error in e.errors()})
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid settings: {', '.join(fields)}")
+    return {
+        "message": "Settings reloaded",
+        "max_login_attempts": settings.max_login_attempts,
+        "debug": settings.debug,
+    }
+
+@router.post("/admin/broadcasts", response_model=BroadcastResponse, status_code=status.HTTP_202_ACCEPTED, name="create_broadcast", tags=["Administration Requires (Admin Role)"])
+async def create_broadcast(broadcast: BroadcastCreate, session: AsyncSession = Depends(get_db), current_user: dict = Depends(require_role(["ADMIN"]))):
+    """
+    Email every user in an audience: everyone, unverified users, or one role.
+
+    Sending starts in the background at the campaign's per-minute rate; poll
+    GET /admin/broadcasts/{broadcast_id} for progress.
+    """
+    try:
+        created = await broadcast_engine.create(session, broadcast.subject, broadcast.body, broadcast.audience,
+                                                broadcast.role, broadcast.rate_per_minute)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return BroadcastResponse.model_validate(created)
+
+@router.get("/admin/broadcasts/{broadcast_id}", response_model=BroadcastResponse, name="get_broadcast", tags=["Administration Requires (Admin Role)"])
+async def get_broadcast(broadcast_id: UUID, session: AsyncSession = Depends(get_db), current_user: dict = Depends(require_role(["ADMIN"]))):
+    broadcast = await session.get(EmailBroadcast, broadcast_id, populate_existing=True)
+    if broadcast is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Broadcast not found")
+    return BroadcastResponse.model_validate(broadcast)
+
+@router.post("/admin/broadcasts/{broadcast_id}/pause", response_model=BroadcastResponse, name="pause_broadcast", tags=["Administration Requires (Admin Role)"])
+async def pause_broadcast(broadcast_id: UUID, session: AsyncSession = Depends(get_db), current_user: dict = Depends(require_role(["ADMIN"]))):
+    """
+    Stop a running broadcast after the batch it is sending. Works from any worker.
+    """
+    broadcast = await broadcast_engine.pause(session, broadcast_id)
+    if broadcast is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Broadcast is not running")
+    return BroadcastResponse.model_validate(broadcast)
+
+@router.post("/admin/broadcasts/{broadcast_id}/resume", response_model=BroadcastResponse, name="resume_broadcast", tags=["Administration Requires (Admin Role)"])
+async def resume_broadcast(broadcast_id: UUID, session: AsyncSession = Depends(get_db), current_user: dict = Depends(require_role(["ADMIN"]))):
+    """
+    Continue a paused broadcast from the first recipient it has not sent to yet.
+
+    Also takes over a broadcast left running by a worker that died, once its lease has expired.
+    Returns 409 while a paused broadcast is still finishing the batch it was sending.
+    """
+    broadcast = await broadcast_engine.resume(session, broadcast_id)
+    if broadcast is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Broadcast is not paused, or is still finishing a batch")
+    return BroadcastResponse.model_validate(broadcast)
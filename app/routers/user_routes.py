@@ -1,24 +1,72 @@
 
-from builtins import dict, int, len, str
-from datetime import timedelta
+from builtins import ValueError, bool, dict, int, len, str
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, Response, status, Request
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.dependencies import get_current_user, get_db, get_email_service, require_role
+from app.dependencies import get_current_user, get_db, get_email_service, get_read_db, require_role
 from app.schemas.pagination_schema import EnhancedPagination
-from app.schemas.token_schema import TokenResponse
-from app.schemas.user_schemas import LoginRequest, UserBase, UserCreate, UserListResponse, UserResponse, UserUpdate
-from app.services.user_service import UserService
-from app.services.jwt_service import create_access_token
-from app.utils.link_generation import create_user_links, generate_pagination_links
+from app.schemas.token_schema import RefreshTokenRequest, TokenResponse
+from app.schemas.user_schemas import RecordFormat, LinkMode, LoginRequest, UserBase, UserCreate, UserImportResponse, UserListResponse, UserResponse, UserUpdate, USER_RESPONSE_FIELDS, parse_user_fields
+from app.services.login_throttle import client_ip, login_throttle
+from app.services.refresh_token_service import RefreshTokenService
+from app.services.user_export_service import UserExportService
+from app.services.user_import_service import UserImportService
+from app.services.user_service import LOGIN_LOCKED, LOGIN_OK, UserService
+from app.services.jwt_service import create_access_token, decode_token
+from app.services.token_revocation_service import token_revocation
+from app.utils.link_generation import generate_cursor_pagination_links, generate_pagination_links, get_user_link_templates
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.record_stream import iter_csv_batches, iter_ndjson_batches
+from app.utils.serialization import user_list_response, user_response
 from app.dependencies import get_settings
 from app.services.email_service import EmailService
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
-settings = get_settings()
+def _parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    try:
+        return parse_user_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+EXPORT_MEDIA_TYPES = {RecordFormat.CSV: "text/csv", RecordFormat.NDJSON: "application/x-ndjson"}
+
+# Declared before /users/{user_id}, which would otherwise match "export" as a user id
+@router.get("/users/export", name="export_users", tags=["User Management Requires (Admin or Manager Roles)"])
+async def export_users(
+    request: Request,
+    format: RecordFormat = RecordFormat.NDJSON,
+    fields: Optional[str] = None,
+    after_created_at: Optional[datetime] = None,
+    after_id: Optional[UUID] = None,
+    token: str = Depends(oauth2_scheme),
+    current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))
+):
+    """
+    Stream every user as NDJSON or CSV (with a header row), ordered by creation time.
+
+    - **fields**: optional comma-separated sparse fieldset; `id` and `created_at` are always included.
+    - **after_created_at**, **after_id**: resume an interrupted export after the last row received.
+
+    The body is gzip-compressed when the request accepts gzip.
+    """
+    selected_fields = _parse_fields(fields) or USER_RESPONSE_FIELDS
+    if (after_created_at is None) != (after_id is None):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Pass both after_created_at and after_id to resume")
+    after = (after_created_at, after_id) if after_id is not None else None
+    gzip = "gzip" in request.headers.get("accept-encoding", "").lower()
+    headers = {"Content-Disposition": f'attachment; filename="users.{format.value}"', "Vary": "Accept-Encoding"}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(UserExportService.stream(selected_fields, format, after, gzip=gzip),
+                             media_type=EXPORT_MEDIA_TYPES[format], headers=headers)
+
 @router.get("/users/{user_id}", response_model=UserResponse, name="get_user", tags=["User Management Requires (Admin or Manager Roles)"])
-async def get_user(user_id: UUID, request: Request, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
+async def get_user(user_id: UUID, request: Request, fields: Optional[str] = None, links: LinkMode = LinkMode.ITEMS, db: AsyncSession = Depends(get_read_db), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
     """
     Endpoint to fetch a user by their unique identifier (UUID).
 
@@ -28,29 +76,18 @@ async def get_user(user_id: UUID, request: Request, db: AsyncSession = Depends(g
     Args:
         user_id: UUID of the user to fetch.
         request: The request object, used to generate full URLs in the response.
+        fields: Optional comma-separated sparse fieldset, e.g. `id,email`; only those columns are selected.
+        links: `none` leaves out the HATEOAS links; sparse fieldsets never include them.
         db: Dependency that provides an AsyncSession for database access.
         token: The OAuth2 access token obtained through OAuth2PasswordBearer dependency.
     """
-    user = await UserService.get_by_id(db, user_id)
+    selected_fields = _parse_fields(fields)
+    user = await UserService.get_by_id(db, user_id, columns=selected_fields, cached=True)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-
-    return UserResponse.model_construct(
-        id=user.id,
-        nickname=user.nickname,
-        first_name=user.first_name,
-        last_name=user.last_name,
-        bio=user.bio,
-        profile_picture_url=user.profile_picture_url,
-        github_profile_url=user.github_profile_url,
-        linkedin_profile_url=user.linkedin_profile_url,
-        role=user.role,
-        email=user.email,
-        last_login_at=user.last_login_at,
-        created_at=user.created_at,
-        updated_at=user.updated_at,
-        links=create_user_links(user.id, request)  
-    )
+    if selected_fields is not None or links is LinkMode.NONE:
+        return user_response(user, fields=selected_fields or USER_RESPONSE_FIELDS)
+    return user_response(user, link_templates=get_user_link_templates(request))
 
 # Additional endpoints for update, delete, create, and list users follow a similar pattern, using
 # asynchronous database operations, handling security with OAuth2PasswordBearer, and enhancing response
@@ -72,22 +109,7 @@ async def update_user(user_id: UUID, user_update: UserUpdate, request: Request,
     if not updated_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    return UserResponse.model_construct(
-        id=updated_user.id,
-        bio=updated_user.bio,
-        first_name=updated_user.first_name,
-        last_name=updated_user.last_name,
-        nickname=updated_user.nickname,
-        email=updated_user.email,
-        role=updated_user.role,
-        last_login_at=updated_user.last_login_at,
-        profile_picture_url=updated_user.profile_picture_url,
-        github_profile_url=updated_user.github_profile_url,
-        linkedin_profile_url=updated_user.linkedin_profile_url,
-        created_at=updated_user.created_at,
-        updated_at=updated_user.updated_at,
-        links=create_user_links(updated_user.id, request)
-    )
+    return user_response(updated_user, link_templates=get_user_link_templates(request))
 
 
 @router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT, name="delete_user", tags=["User Management Requires (Admin or Manager Roles)"])
@@ -116,47 +138,91 @@ async def create_user(user: UserCreate, request: Request, db: AsyncSession = Dep
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to create user")
     
     
-    return UserResponse.model_construct(
-        id=created_user.id,
-        bio=created_user.bio,
-        first_name=created_user.first_name,
-        last_name=created_user.last_name,
-        profile_picture_url=created_user.profile_picture_url,
-        nickname=created_user.nickname,
-        email=created_user.email,
-        role=created_user.role,
-        last_login_at=created_user.last_login_at,
-        created_at=created_user.created_at,
-        updated_at=created_user.updated_at,
-        links=create_user_links(created_user.id, request)
-    )
+    return user_response(created_user, status_code=status.HTTP_201_CREATED, link_templates=get_user_link_templates(request))
+
+
+IMPORT_CONTENT_TYPES = {
+    "text/csv": RecordFormat.CSV,
+    "application/x-ndjson": RecordFormat.NDJSON,
+    "application/jsonl": RecordFormat.NDJSON,
+}
+
+@router.post("/users/import", response_model=UserImportResponse, name="import_users", tags=["User Management Requires (Admin or Manager Roles)"])
+async def import_users(
+    request: Request,
+    format: Optional[RecordFormat] = None,
+    send_verification: bool = True,
+    db: AsyncSession = Depends(get_db),
+    token: str = Depends(oauth2_scheme),
+    current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))
+):
+    """
+    Create users in bulk from a CSV (with a header row) or NDJSON body, one user per record.
+
+    The body is parsed as it arrives and written in batches, each committed on its own, so
+    failed rows are reported per row and never undo the rest. The format comes from the
+    `format` parameter or the Content-Type.
+    """
+    if format is None:
+        content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+        format = IMPORT_CONTENT_TYPES.get(content_type)
+        if format is None:
+            raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                                detail="Send text/csv or application/x-ndjson, or pass format=csv|ndjson")
+    parse = iter_csv_batches if format == RecordFormat.CSV else iter_ndjson_batches
+    batches = parse(request.stream(), get_settings().user_import_batch_size)
+    return await UserImportService.import_users(db, batches, send_verification=send_verification)
 
 
 @router.get("/users/", response_model=UserListResponse, tags=["User Management Requires (Admin or Manager Roles)"])
 async def list_users(
     request: Request,
-    skip: int = 0,
     limit: int = 10,
-    db: AsyncSession = Depends(get_db),
+    cursor: Optional[str] = None,
+    skip: Optional[int] = None,
+    fields: Optional[str] = None,
+    links: LinkMode = LinkMode.ITEMS,
+    db: AsyncSession = Depends(get_read_db),
     current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))
 ):
-    total_users = await UserService.count(db)
-    users = await UserService.list_users(db, skip, limit)
+    """
+    List users ordered by creation time.
 
-    user_responses = [
-        UserResponse.model_validate(user) for user in users
-    ]
-    
-    pagination_links = generate_pagination_links(request, skip, limit, total_users)
-    
-    # Construct the final response with pagination details
-    return UserListResponse(
-        items=user_responses,
-        total=total_users,
-        page=skip // limit + 1,
-        size=len(user_responses),
-        links=pagination_links  # Ensure you have appropriate logic to create these links
-    )
+    - **cursor**: opaque cursor from a previous response's `next`/`prev`/`last` link; omit for the first page.
+    - **skip**: legacy offset pagination, used instead of cursors when given.
+    - **fields**: optional comma-separated sparse fieldset, e.g. `id,email,nickname,role`; only those
+      columns are selected and returned, without per-user links.
+    - **links**: `items` (default) adds links to every user, `templates` sends them once as URI
+      templates in `link_templates`, `none` leaves them out.
+    """
+    selected_fields = _parse_fields(fields)
+    # Cursors are built from (created_at, id), so a projection always selects them
+    columns = None if selected_fields is None else tuple(dict.fromkeys((*selected_fields, "id", "created_at")))
+    total_users, total_kind = await UserService.count_with_strategy(db, get_settings().user_count_strategy)
+
+    if skip is not None:
+        users = await UserService.list_users(db, skip, limit, columns=columns)
+        pagination_links = generate_pagination_links(request, skip, limit, total_users)
+        page = skip // limit + 1
+    else:
+        try:
+            decoded_cursor = decode_cursor(cursor) if cursor else None
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor")
+        users, has_more = await UserService.list_users_keyset(db, limit, decoded_cursor, columns=columns)
+        if decoded_cursor is not None and decoded_cursor.backward:
+            has_next, has_prev = decoded_cursor.key is not None, has_more
+        else:
+            has_next, has_prev = has_more, decoded_cursor is not None and decoded_cursor.key is not None
+        next_cursor = encode_cursor((users[-1].created_at, users[-1].id)) if users and has_next else None
+        prev_cursor = encode_cursor((users[0].created_at, users[0].id), backward=True) if users and has_prev else None
+        pagination_links = generate_cursor_pagination_links(request, limit, cursor, next_cursor, prev_cursor)
+        page = 1 if decoded_cursor is None else None
+
+    if selected_fields is not None or links is LinkMode.NONE:
+        return user_list_response(users, total_users, total_kind, page, pagination_links, fields=selected_fields or USER_RESPONSE_FIELDS)
+    return user_list_response(users, total_users, total_kind, page, pagination_links,
+                              link_templates=get_user_link_templates(request), templates_only=links is LinkMode.TEMPLATES)
 
 
 @router.post("/register/", response_model=UserResponse, tags=["Login and Registration"])
@@ -166,39 +232,72 @@ async def register(user_data: UserCreate, session: AsyncSession = Depends(get_db
         return user
     raise HTTPException(status_code=400, detail="Email already exists")
 
-@router.post("/login/", response_model=TokenResponse, tags=["Login and Registration"])
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: AsyncSession = Depends(get_db)):
-    if await UserService.is_account_locked(session, form_data.username):
-        raise HTTPException(status_code=400, detail="Account locked due to too many failed login attempts.")
-
-    user = await UserService.login_user(session, form_data.username, form_data.password)
-    if user:
-        access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
-
-        access_token = create_access_token(
-            data={"sub": user.email, "role": str(user.role.name)},
-            expires_delta=access_token_expires
+def _throttle_login(request: Request, email: str):
+    """Reject the attempt with 429 and Retry-After before any database or bcrypt work."""
+    retry_after = login_throttle.check(email, client_ip(request))
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts. Try again later.",
+            headers={"Retry-After": str(math.ceil(retry_after))}
         )
 
-        return {"access_token": access_token, "token_type": "bearer"}
+def _token_response(user, refresh_token: str) -> dict:
+    access_token_expires = timedelta(minutes=get_settings().access_token_expire_minutes)
+    access_token = create_access_token(
+        data={"sub": user.email, "role": str(user.role.name)},
+        expires_delta=access_token_expires
+    )
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+@router.post("/login/", response_model=TokenResponse, tags=["Login and Registration"])
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), session: AsyncSession = Depends(get_db)):
+    _throttle_login(request, form_data.username)
+    outcome, user = await UserService.authenticate(session, form_data.username, form_data.password)
+    if outcome == LOGIN_LOCKED:
+        raise HTTPException(status_code=400, detail="Account locked due to too many failed login attempts.")
+    if outcome == LOGIN_OK:
+        return _token_response(user, await RefreshTokenService.issue(session, user.id))
     raise HTTPException(status_code=401, detail="Incorrect email or password.")
 
 @router.post("/login/", include_in_schema=False, response_model=TokenResponse, tags=["Login and Registration"])
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: AsyncSession = Depends(get_db)):
-    if await UserService.is_account_locked(session, form_data.username):
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), session: AsyncSession = Depends(get_db)):
+    _throttle_login(request, form_data.username)
+    outcome, user = await UserService.authenticate(session, form_data.username, form_data.password)
+    if outcome == LOGIN_LOCKED:
         raise HTTPException(status_code=400, detail="Account locked due to too many failed login attempts.")
+    if outcome == LOGIN_OK:
+        return _token_response(user, await RefreshTokenService.issue(session, user.id))
+    raise HTTPException(status_code=401, detail="Incorrect email or password.")
 
-    user = await UserService.login_user(session, form_data.username, form_data.password)
-    if user:
-        access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
+@router.post("/token/refresh", response_model=TokenResponse, name="refresh_token", tags=["Login and Registration"])
+async def refresh_token(refresh_request: RefreshTokenRequest, session: AsyncSession = Depends(get_db)):
+    """
+    Exchange a refresh token for a new access token and a new refresh token.
 
-        access_token = create_access_token(
-            data={"sub": user.email, "role": str(user.role.name)},
-            expires_delta=access_token_expires
-        )
+    Each refresh token works once. Presenting one again revokes every token issued from the same login.
+    """
+    rotated = await RefreshTokenService.rotate(session, refresh_request.refresh_token)
+    if rotated is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired refresh token.")
+    user, new_refresh_token = rotated
+    return _token_response(user, new_refresh_token)
 
-        return {"access_token": access_token, "token_type": "bearer"}
-    raise HTTPException(status_code=401, detail="Incorrect email or password.")
+@router.post("/logout/", status_code=status.HTTP_204_NO_CONTENT, name="logout", tags=["Login and Registration"])
+async def logout(refresh_request: Optional[RefreshTokenRequest] = None, token: str = Depends(oauth2_scheme),
+                 session: AsyncSession = Depends(get_db), current_user: dict = Depends(get_current_user)):
+    """
+    Revoke the access token used for this request, so it is rejected before it expires.
+
+    - **refresh_token**: optional; when given, the refresh tokens from the same login are revoked too.
+    """
+    if refresh_request is not None:
+        await RefreshTokenService.revoke(session, refresh_request.refresh_token)
+    claims = decode_token(token)
+    if not claims.get("jti"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Token cannot be revoked")
+    await token_revocation.revoke(session, claims["jti"], datetime.fromtimestamp(claims["exp"], timezone.utc))
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
 @router.get("/verify-email/{user_id}/{token}", status_code=status.HTTP_200_OK, name="verify_email", tags=["Login and Registration"])
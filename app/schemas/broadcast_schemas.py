@@ -0,0 +1,38 @@
+from builtins import ValueError
+from datetime import datetime
+from typing import Optional
+import uuid
+from pydantic import BaseModel, Field, model_validator
+from app.models.broadcast_model import BroadcastAudience
+from app.models.user_model import UserRole
+
+class BroadcastCreate(BaseModel):
+    subject: str = Field(..., min_length=1, max_length=255, example="Scheduled maintenance on Sunday")
+    body: str = Field(..., min_length=1, description="Markdown body. May use {name}, {first_name}, {last_name}, {nickname} and {email}.",
+                      example="Hello {name},\n\nThe site will be down for maintenance on Sunday from 02:00 to 04:00 UTC.")
+    audience: BroadcastAudience = Field(..., example=BroadcastAudience.UNVERIFIED)
+    role: Optional[UserRole] = Field(None, description="Required when audience is 'role'.", example=None)
+    rate_per_minute: Optional[int] = Field(None, gt=0, description="Cap on emails per minute; defaults to the configured rate.")
+
+    @model_validator(mode="after")
+    def check_role(self):
+        if (self.audience == BroadcastAudience.ROLE) != (self.role is not None):
+            raise ValueError("role must be given exactly when audience is 'role'")
+        return self
+
+class BroadcastResponse(BaseModel):
+    id: uuid.UUID
+    subject: str
+    audience: BroadcastAudience
+    role: Optional[UserRole] = None
+    rate_per_minute: int
+    status: str = Field(..., description="running, paused or completed")
+    total: int = Field(..., description="Matching users when the broadcast was created")
+    sent: int
+    failed: int
+    last_error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
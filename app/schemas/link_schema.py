@@ -15,3 +15,9 @@ class Link(BaseModel):
                 "type": "application/json"
             }
         }
+
+class LinkTemplate(BaseModel):
+    rel: str = Field(..., description="Relation type of the link.")
+    href: str = Field(..., description="RFC 6570 URI template, e.g. `https://api.example.com/users/{user_id}`.")
+    method: str = Field(default="GET", description="HTTP method for the action this link represents.")
+    templated: bool = Field(default=True, description="Always true; `href` must be expanded before use.")
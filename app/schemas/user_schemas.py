@@ -1,11 +1,13 @@
-from builtins import ValueError, any, bool, str
+from builtins import ValueError, any, bool, dict, str, tuple
 from pydantic import BaseModel, EmailStr, Field, validator, root_validator
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from datetime import datetime
 from enum import Enum
 import uuid
 import re
 from app.models.user_model import UserRole
+from app.schemas.link_schema import Link, LinkTemplate
+from app.schemas.pagination_schema import PaginationLink
 from app.utils.nickname_gen import generate_nickname
 
 
@@ -60,6 +62,30 @@ class UserResponse(UserBase):
     nickname: Optional[str] = Field(None, min_length=3, pattern=r'^[\w-]+$', example=generate_nickname())    
     is_professional: Optional[bool] = Field(default=False, example=True)
     role: UserRole
+    links: List[Link] = Field(default_factory=list, description="HATEOAS links for actions on this user.")
+
+# Fields a client may select with the `fields` query parameter; each maps to a users column
+USER_RESPONSE_FIELDS = tuple(name for name in UserResponse.model_fields if name != "links")
+
+def parse_user_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    Parse a comma-separated sparse fieldset such as "id,email,nickname".
+
+    Returns None when no fieldset was requested. Raises ValueError for unknown fields.
+    """
+    if fields is None:
+        return None
+    selected = tuple(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in selected if name not in USER_RESPONSE_FIELDS]
+    if unknown or not selected:
+        raise ValueError(f"Unknown or empty fields: {', '.join(unknown)}. Allowed: {', '.join(USER_RESPONSE_FIELDS)}")
+    return selected
+
+class LinkMode(str, Enum):
+    """How user responses carry their HATEOAS links."""
+    ITEMS = "items"
+    TEMPLATES = "templates"
+    NONE = "none"
 
 class LoginRequest(BaseModel):
     email: str = Field(..., example="john.doe@example.com")
@@ -79,5 +105,27 @@ class UserListResponse(BaseModel):
         "github_profile_url": "https://github.com/johndoe"
     }])
     total: int = Field(..., example=100)
-    page: int = Field(..., example=1)
+    total_kind: str = Field(default="exact", example="exact", description="How `total` was obtained: 'exact', 'estimated' or 'cached'.")
+    page: Optional[int] = Field(None, example=1, description="Page number; only known for offset pagination and the first cursor page.")
     size: int = Field(..., example=10)
+    links: List[PaginationLink] = Field(default=[], description="Pagination links; cursor links carry opaque `cursor` values.")
+    link_templates: Optional[List[LinkTemplate]] = Field(None, description="Per-user action links as URI templates, sent instead of item links with `links=templates`.")
+
+class RecordFormat(str, Enum):
+    """Record formats of the bulk user import and export."""
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+class UserImportError(BaseModel):
+    row: int = Field(..., example=3, description="1-based record number, not counting the CSV header.")
+    email: Optional[str] = Field(None, example="john.doe@example.com")
+    errors: List[str] = Field(..., example=["Email already exists"])
+
+class UserImportResponse(BaseModel):
+    total_rows: int = Field(..., example=10000)
+    created: int = Field(..., example=9998)
+    failed: int = Field(..., example=2)
+    errors: List[UserImportError] = Field(default_factory=list)
+    errors_truncated: bool = Field(False, description="True when more rows failed than are listed in `errors`.")
+    seconds: float = Field(..., example=12.5)
+    rows_per_second: float = Field(..., example=800.0)
@@ -0,0 +1,301 @@
+from builtins import Exception, ValueError, dict, int, isinstance, len, list, max, set, sorted, str, sum, zip
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from uuid import UUID
+from sqlalchemy import and_, case, func, null, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import Database
+from app.models.broadcast_model import BroadcastAudience, BroadcastStatus, EmailBroadcast
+from app.models.user_model import User, UserRole
+from app.utils.smtp_connection import SMTPClient
+from app.utils.template_manager import CompiledTemplate, TemplateManager
+from settings.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Placeholders a broadcast body may use
+RECIPIENT_FIELDS = ("name", "first_name", "last_name", "nickname", "email")
+RECIPIENT_COLUMNS = (User.id, User.created_at, User.email, User.first_name, User.last_name, User.nickname)
+
+class Pacer:
+    """Spaces sends evenly so that no more than `per_minute` start in any minute."""
+
+    def __init__(self, per_minute: int):
+        self.interval = 60.0 / per_minute
+        self._next = time.monotonic()
+
+    async def wait(self):
+        now = time.monotonic()
+        slot = max(now, self._next)
+        self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+class BroadcastEngine:
+    """
+    Sends admin email campaigns to every user matching an audience.
+
+    Recipients are streamed from a server-side cursor in `broadcast_batch_size` partitions,
+    so memory stays flat however many users match. The cursor is reopened every
+    `broadcast_cursor_window` rows from the saved position, which keeps its transaction
+    short. Each batch is rendered from a body compiled once, then sent over a dedicated SMTP
+    pool of `broadcast_smtp_connections` sessions, so campaigns can't starve account mail.
+    A pacer holds the campaign to its per-minute rate.
+
+    Progress is saved after every batch in the same UPDATE that reads the campaign status,
+    which is how a pause requested on any worker stops the runner at the next batch boundary.
+    That UPDATE only matches the runner's own `run_id` and renews its lease, or releases it
+    when the runner is about to stop. A campaign can only be resumed once its lease is
+    released or has run out, so a resume never overlaps a batch still being sent; a runner
+    presumed dead that turns out to be alive finds a newer `run_id` and stops.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[UUID, asyncio.Task] = {}
+        # The run each local task is sending, by broadcast id
+        self._runs: Dict[UUID, int] = {}
+        self._smtp_client: Optional[SMTPClient] = None
+        self.template_manager = TemplateManager()
+        self._batches = 0
+        self._sent = 0
+        self._failed = 0
+
+    @staticmethod
+    def audience_filters(audience: str, role: Optional[str]) -> list:
+        if audience == BroadcastAudience.UNVERIFIED.value:
+            return [User.email_verified.is_(False)]
+        if audience == BroadcastAudience.ROLE.value:
+            return [User.role == UserRole(role)]
+        return []
+
+    def compile_body(self, body: str) -> CompiledTemplate:
+        """Compile a campaign body. Raises ValueError for malformed or unknown placeholders."""
+        compiled = self.template_manager.compile_markdown(body)
+        unknown = set(compiled.fields) - set(RECIPIENT_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown placeholders: {', '.join(sorted(unknown))}")
+        return compiled
+
+    async def create(self, session: AsyncSession, subject: str, body: str, audience: BroadcastAudience,
+                     role: Optional[UserRole] = None, rate_per_minute: Optional[int] = None) -> EmailBroadcast:
+        """Save a campaign and start sending it from this worker."""
+        self.compile_body(body)
+        role_value = role.value if role is not None else None
+        total = await session.scalar(
+            select(func.count()).select_from(User).where(*self.audience_filters(audience.value, role_value))
+        )
+        broadcast = EmailBroadcast(subject=subject, body=body, audience=audience.value, role=role_value,
+                                   rate_per_minute=rate_per_minute or get_settings().broadcast_rate_per_minute,
+                                   status=BroadcastStatus.RUNNING.value, total=total, sent=0, failed=0, run_id=1)
+        session.add(broadcast)
+        await session.commit()
+        self._launch(broadcast.id, broadcast.run_id)
+        return broadcast
+
+    @staticmethod
+    def _lease_expiry():
+        """When a runner's lease ends: one batch at the campaign's rate, plus the configured margin."""
+        settings = get_settings()
+        seconds = settings.broadcast_lease_seconds + settings.broadcast_batch_size * 60.0 / EmailBroadcast.rate_per_minute
+        return func.now() + func.make_interval(0, 0, 0, 0, 0, 0, seconds)
+
+    async def _update(self, session: AsyncSession, broadcast_id: UUID, condition, **values) -> Optional[EmailBroadcast]:
+        statement = (
+            update(EmailBroadcast)
+            .where(EmailBroadcast.id == broadcast_id, condition)
+            .values(**values)
+            .returning(EmailBroadcast)
+            .execution_options(synchronize_session="fetch")
+        )
+        broadcast = (await session.execute(statement)).scalar()
+        await session.commit()
+        return broadcast
+
+    async def pause(self, session: AsyncSession, broadcast_id: UUID) -> Optional[EmailBroadcast]:
+        """Stop a running campaign after its current batch. Returns None if it wasn't running."""
+        return await self._update(session, broadcast_id, EmailBroadcast.status == BroadcastStatus.RUNNING.value,
+                                  status=BroadcastStatus.PAUSED.value)
+
+    async def resume(self, session: AsyncSession, broadcast_id: UUID) -> Optional[EmailBroadcast]:
+        """
+        Continue a campaign from its last batch under a new run. Returns None unless it is
+        paused, or running without a live runner (its process died), and no runner still
+        holds its lease, e.g. while finishing the batch it was sending when paused.
+        """
+        resumable = and_(
+            EmailBroadcast.status.in_([BroadcastStatus.PAUSED.value, BroadcastStatus.RUNNING.value]),
+            or_(EmailBroadcast.lease_expires_at.is_(None), EmailBroadcast.lease_expires_at < func.now()),
+        )
+        broadcast = await self._update(
+            session, broadcast_id, resumable,
+            status=BroadcastStatus.RUNNING.value, run_id=EmailBroadcast.run_id + 1, lease_expires_at=self._lease_expiry(),
+        )
+        if broadcast is not None:
+            self._launch(broadcast.id, broadcast.run_id)
+        return broadcast
+
+    def _launch(self, broadcast_id: UUID, run_id: int):
+        task = self._tasks.get(broadcast_id)
+        if task is not None and not task.done() and self._runs.get(broadcast_id) == run_id:
+            return
+        # A local task of an older run stops by itself at its next batch
+        self._runs[broadcast_id] = run_id
+        self._tasks[broadcast_id] = asyncio.get_running_loop().create_task(self._run(broadcast_id, run_id))
+
+    def task(self, broadcast_id: UUID) -> Optional[asyncio.Task]:
+        """The task sending a campaign on this worker, if there is one."""
+        return self._tasks.get(broadcast_id)
+
+    def _get_smtp_client(self) -> SMTPClient:
+        settings = get_settings()
+        options = {**SMTPClient.settings_options(settings), "pool_size": settings.broadcast_smtp_connections}
+        if self._smtp_client is None or self._smtp_client.options() != options:
+            if self._smtp_client is not None:
+                self._smtp_client.retire()
+            self._smtp_client = SMTPClient(**options)
+        return self._smtp_client
+
+    async def _run(self, broadcast_id: UUID, run_id: int):
+        try:
+            await self._send_campaign(broadcast_id, run_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Broadcast {broadcast_id} stopped: {e}")
+            async with Database.get_session_factory()() as session:
+                await session.execute(
+                    update(EmailBroadcast)
+                    .where(EmailBroadcast.id == broadcast_id, EmailBroadcast.run_id == run_id)
+                    .values(status=BroadcastStatus.PAUSED.value, last_error=str(e)[:1000], lease_expires_at=None)
+                )
+                await session.commit()
+
+    async def _send_campaign(self, broadcast_id: UUID, run_id: int):
+        settings = get_settings()
+        async with Database.get_session_factory()() as session:
+            # Take the lease; nothing comes back if the campaign was paused or resumed elsewhere
+            broadcast = await self._update(
+                session, broadcast_id,
+                and_(EmailBroadcast.run_id == run_id, EmailBroadcast.status == BroadcastStatus.RUNNING.value),
+                lease_expires_at=self._lease_expiry(),
+            )
+            if broadcast is None:
+                await self._release(session, broadcast_id, run_id)
+                return
+        body = self.compile_body(broadcast.body)
+        pacer = Pacer(broadcast.rate_per_minute)
+        client = self._get_smtp_client()
+        filters = self.audience_filters(broadcast.audience, broadcast.role)
+        key = (broadcast.last_created_at, broadcast.last_user_id) if broadcast.last_user_id is not None else None
+        while True:
+            query = select(*RECIPIENT_COLUMNS).where(*filters)
+            if key is not None:
+                query = query.where(tuple_(User.created_at, User.id) > tuple_(*key))
+            query = query.order_by(User.created_at, User.id).limit(settings.broadcast_cursor_window)
+            streamed = 0
+            async with Database.get_read_session_factory()() as read_session:
+                result = await read_session.stream(query.execution_options(yield_per=settings.broadcast_batch_size))
+                async for rows in result.partitions():
+                    streamed += len(rows)
+                    if not await self._send_batch(broadcast, run_id, body, pacer, client, rows):
+                        return
+                    key = (rows[-1].created_at, rows[-1].id)
+            if streamed < settings.broadcast_cursor_window:
+                break
+        async with Database.get_session_factory()() as session:
+            await session.execute(
+                update(EmailBroadcast)
+                .where(EmailBroadcast.id == broadcast_id, EmailBroadcast.run_id == run_id,
+                       EmailBroadcast.status == BroadcastStatus.RUNNING.value)
+                .values(status=BroadcastStatus.COMPLETED.value, finished_at=datetime.now(timezone.utc),
+                        lease_expires_at=None)
+            )
+            await session.commit()
+
+    @staticmethod
+    async def _release(session: AsyncSession, broadcast_id: UUID, run_id: int):
+        """Give up the lease of a run that is stopping, so the campaign can be resumed at once."""
+        await session.execute(
+            update(EmailBroadcast).where(EmailBroadcast.id == broadcast_id, EmailBroadcast.run_id == run_id)
+            .values(lease_expires_at=None)
+        )
+        await session.commit()
+
+    def _render(self, body: CompiledTemplate, row) -> str:
+        context = {
+            "name": row.first_name or row.nickname,
+            "first_name": row.first_name or "",
+            "last_name": row.last_name or "",
+            "nickname": row.nickname,
+            "email": row.email,
+        }
+        return self.template_manager.render_compiled(body, context)
+
+    async def _send_batch(self, broadcast: EmailBroadcast, run_id: int, body: CompiledTemplate, pacer: Pacer,
+                          client: SMTPClient, rows: list) -> bool:
+        """Send one batch, save progress and renew the lease. Returns False when this run should stop."""
+        messages = [client.build_message(broadcast.subject, self._render(body, row), row.email) for row in rows]
+
+        async def send(message: str, recipient: str):
+            await pacer.wait()
+            await client.send_message(message, recipient)
+
+        results = await asyncio.gather(*(send(message, row.email) for message, row in zip(messages, rows)),
+                                       return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        self._batches += 1
+        self._sent += len(rows) - len(errors)
+        self._failed += len(errors)
+        if len(errors) == len(rows):
+            # Nothing got through, so the relay is down: keep the position and stop
+            raise errors[0]
+        # Matches nothing once another run owns the campaign, so a superseded runner saves nothing
+        statement = (
+            update(EmailBroadcast)
+            .where(EmailBroadcast.id == broadcast.id, EmailBroadcast.run_id == run_id)
+            .values(sent=EmailBroadcast.sent + len(rows) - len(errors), failed=EmailBroadcast.failed + len(errors),
+                    last_created_at=rows[-1].created_at, last_user_id=rows[-1].id,
+                    # Renewed while running; released when the runner stops here after a pause
+                    lease_expires_at=case((EmailBroadcast.status == BroadcastStatus.RUNNING.value, self._lease_expiry()),
+                                          else_=null()))
+            .returning(EmailBroadcast.status)
+        )
+        async with Database.get_session_factory()() as session:
+            status = (await session.execute(statement)).scalar()
+            await session.commit()
+        return status == BroadcastStatus.RUNNING.value
+
+    async def stop(self):
+        """Cancel this worker's campaigns and leave them paused, to be resumed later."""
+        tasks = dict(self._tasks)
+        runs = [(broadcast_id, self._runs[broadcast_id]) for broadcast_id in tasks]
+        for task in tasks.values():
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            async with Database.get_session_factory()() as session:
+                await session.execute(
+                    update(EmailBroadcast)
+                    .where(tuple_(EmailBroadcast.id, EmailBroadcast.run_id).in_(runs))
+                    .values(status=case((EmailBroadcast.status == BroadcastStatus.RUNNING.value, BroadcastStatus.PAUSED.value),
+                                        else_=EmailBroadcast.status),
+                            lease_expires_at=None)
+                )
+                await session.commit()
+        if self._smtp_client is not None:
+            await self._smtp_client.close()
+            self._smtp_client = None
+
+    def stats(self) -> dict:
+        return {
+            "running": sum(1 for task in self._tasks.values() if not task.done()),
+            "batches": self._batches,
+            "sent": self._sent,
+            "failed": self._failed,
+            "smtp": self._smtp_client.stats() if self._smtp_client is not None else {},
+        }
+
+broadcast_engine = BroadcastEngine()
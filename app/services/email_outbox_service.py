@@ -0,0 +1,184 @@
+from builtins import Exception, dict, int, isinstance, len, list, min, sorted, str, zip
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+from sqlalchemy import Insert, Select, func, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import Database
+from app.models.email_outbox_model import OutboxEmail
+from settings.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Outbox priorities; lower values are sent first
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 50
+PRIORITY_BULK = 100
+
+class EmailOutbox:
+    """
+    Transactional outbox for outgoing email.
+
+    `enqueue` only adds a row to the caller's session, so the email is committed together with
+    the change that caused it and the request never waits on the mail server. A background
+    worker claims due rows with FOR UPDATE SKIP LOCKED, so any number of workers can drain the
+    outbox without sending a message twice. Claimed rows are leased by moving `available_at`
+    into the future, which hands them to another worker if this one dies mid-batch. Failed
+    sends are retried with exponential backoff.
+    """
+
+    def __init__(self):
+        self._email_service_factory: Optional[Callable] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._batches = 0
+        self._sent = 0
+        self._retried = 0
+        self._failed = 0
+
+    @staticmethod
+    def enqueue(session: AsyncSession, email_type: str, recipient: str, context: dict,
+                priority: int = PRIORITY_NORMAL) -> OutboxEmail:
+        """Add an email to the outbox in the caller's transaction. The caller commits."""
+        email = OutboxEmail(email_type=email_type, recipient=recipient, context=context, priority=priority)
+        session.add(email)
+        return email
+
+    @staticmethod
+    async def enqueue_many(session: AsyncSession, email_type: str, messages: list, priority: int = PRIORITY_NORMAL):
+        """Add many (recipient, context) emails in one multi-row INSERT in the caller's transaction."""
+        if messages:
+            await session.execute(insert(OutboxEmail), [
+                {"email_type": email_type, "recipient": recipient, "context": context, "priority": priority}
+                for recipient, context in messages
+            ])
+
+    @staticmethod
+    def enqueue_from(email_type: str, rows: Select, priority: int = PRIORITY_NORMAL) -> Insert:
+        """
+        An INSERT ... SELECT that queues one email per (recipient, context) row of `rows`, to run
+        inside another statement (e.g. as a CTE) so the email commits atomically with it.
+        """
+        recipient, context = rows.subquery().c
+        return insert(OutboxEmail).from_select(
+            ["id", "email_type", "recipient", "context", "priority"],
+            select(func.gen_random_uuid(), literal(email_type), recipient, context, literal(priority)),
+        )
+
+    def wake(self):
+        """Run the worker now instead of at the next poll, e.g. right after an enqueue commits."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def claim(self, session: AsyncSession, limit: int) -> list:
+        """Lease up to `limit` due emails, highest priority first, skipping rows other workers hold."""
+        settings = get_settings()
+        due = (
+            select(OutboxEmail.id)
+            .where(OutboxEmail.sent_at.is_(None), OutboxEmail.failed_at.is_(None),
+                   OutboxEmail.available_at <= func.now())
+            .order_by(OutboxEmail.priority, OutboxEmail.available_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        statement = (
+            update(OutboxEmail)
+            .where(OutboxEmail.id.in_(due.scalar_subquery()))
+            .values(attempts=OutboxEmail.attempts + 1,
+                    available_at=func.now() + timedelta(seconds=settings.email_outbox_lease_seconds))
+            .returning(OutboxEmail)
+            .execution_options(synchronize_session=False)
+        )
+        emails = (await session.execute(statement)).scalars().all()
+        await session.commit()
+        # RETURNING does not keep the subquery's order
+        return sorted(emails, key=lambda email: (email.priority, email.created_at))
+
+    def retry_delay(self, attempts: int) -> float:
+        settings = get_settings()
+        return min(settings.email_outbox_retry_base_seconds * 2 ** (attempts - 1), settings.email_outbox_retry_max_seconds)
+
+    async def process_batch(self, email_service=None) -> int:
+        """Claim and send one batch. Returns the number of emails claimed."""
+        if email_service is None and self._email_service_factory is not None:
+            email_service = self._email_service_factory()
+        if email_service is None or email_service.smtp_client is None:
+            return 0
+        settings = get_settings()
+        session_factory = Database.get_session_factory()
+        async with session_factory() as session:
+            emails = await self.claim(session, settings.email_outbox_batch_size)
+            if not emails:
+                return 0
+            self._batches += 1
+            # The SMTP pool bounds how many of these are actually in flight
+            results = await asyncio.gather(
+                *(email_service.send_user_email(email.context, email.email_type) for email in emails),
+                return_exceptions=True,
+            )
+            sent_ids = [email.id for email, result in zip(emails, results) if not isinstance(result, Exception)]
+            if sent_ids:
+                await session.execute(
+                    update(OutboxEmail).where(OutboxEmail.id.in_(sent_ids)).values(sent_at=func.now())
+                    .execution_options(synchronize_session=False)
+                )
+                self._sent += len(sent_ids)
+            now = datetime.now(timezone.utc)
+            for email, result in zip(emails, results):
+                if not isinstance(result, Exception):
+                    continue
+                values = {"last_error": str(result)[:1000]}
+                if email.attempts >= settings.email_outbox_max_attempts:
+                    values["failed_at"] = now
+                    self._failed += 1
+                    logger.error(f"Giving up on {email.email_type} email {email.id} after {email.attempts} attempts: {result}")
+                else:
+                    values["available_at"] = now + timedelta(seconds=self.retry_delay(email.attempts))
+                    self._retried += 1
+                await session.execute(
+                    update(OutboxEmail).where(OutboxEmail.id == email.id).values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+            await session.commit()
+        return len(emails)
+
+    async def _run(self):
+        while True:
+            try:
+                claimed = await self.process_batch()
+            except Exception as e:
+                logger.error(f"Email outbox batch failed: {e}")
+                claimed = 0
+            if claimed >= get_settings().email_outbox_batch_size:
+                continue  # more may be waiting
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), get_settings().email_outbox_poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def start(self, email_service_factory: Callable):
+        """Start draining the outbox with services from `email_service_factory`."""
+        self._email_service_factory = email_service_factory
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Cancel the worker and wait for it, so no batch is still using a session afterwards."""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        self._wakeup = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "batches": self._batches,
+            "sent": self._sent,
+            "retried": self._retried,
+            "failed": self._failed,
+        }
+
+email_outbox = EmailOutbox()
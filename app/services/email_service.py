@@ -1,45 +1,66 @@
 # email_service.py
-from builtins import ValueError, dict, str
-from settings.config import settings
-from app.utils.smtp_connection import SMTPClient
+from builtins import ValueError, classmethod, dict, staticmethod, str
+from sqlalchemy.ext.asyncio import AsyncSession
+from settings.config import get_settings
+from app.services.email_outbox_service import PRIORITY_HIGH, PRIORITY_NORMAL, email_outbox
+from app.utils.smtp_connection import get_smtp_client
 from app.utils.template_manager import TemplateManager
 from app.models.user_model import User
 
 class EmailService:
+    SUBJECTS = {
+        'email_verification': "Verify Your Account",
+        'password_reset': "Password Reset Instructions",
+        'account_locked': "Account Locked Notification"
+    }
+    # Account mail goes out ahead of anything bulk that is queued
+    PRIORITIES = {
+        'email_verification': PRIORITY_HIGH,
+        'password_reset': PRIORITY_HIGH,
+        'account_locked': PRIORITY_HIGH
+    }
+
     def __init__(self, template_manager: TemplateManager):
+        settings = get_settings()
         if not settings.smtp_server or not settings.smtp_port or not settings.smtp_username or not settings.smtp_password:
             print("SMTP settings not configured. Email service will not work.")
             self.smtp_client = None
         else:
-            self.smtp_client = SMTPClient(
-                server=settings.smtp_server,
-                port=settings.smtp_port,
-                username=settings.smtp_username,
-                password=settings.smtp_password
-            )
+            self.smtp_client = get_smtp_client(settings)
         self.template_manager = template_manager
 
     async def send_user_email(self, user_data: dict, email_type: str):
+        """Render and send an email now."""
         if not self.smtp_client:
             return
-        subject_map = {
-            'email_verification': "Verify Your Account",
-            'password_reset': "Password Reset Instructions",
-            'account_locked': "Account Locked Notification"
-        }
-
-        if email_type not in subject_map:
+        if email_type not in self.SUBJECTS:
             raise ValueError("Invalid email type")
 
         html_content = self.template_manager.render_template(email_type, **user_data)
-        self.smtp_client.send_email(subject_map[email_type], html_content, user_data['email'])
+        await self.smtp_client.send_email(self.SUBJECTS[email_type], html_content, user_data['email'])
 
-    async def send_verification_email(self, user: User):
-        if not self.smtp_client:
-            return
-        verification_url = f"{settings.server_base_url}verify-email/{user.id}/{user.verification_token}"
-        await self.send_user_email({
+    @classmethod
+    def queue_user_email(cls, session: AsyncSession, user_data: dict, email_type: str):
+        """Queue an email in the session's transaction; the outbox worker sends it after the commit."""
+        if email_type not in cls.SUBJECTS:
+            raise ValueError("Invalid email type")
+        email_outbox.enqueue(session, email_type, user_data['email'], user_data,
+                             cls.PRIORITIES.get(email_type, PRIORITY_NORMAL))
+
+    @staticmethod
+    def verification_email_data(user: User) -> dict:
+        verification_url = f"{get_settings().server_base_url}verify-email/{user.id}/{user.verification_token}"
+        return {
             "name": user.first_name,
             "verification_url": verification_url,
             "email": user.email
-        }, 'email_verification')
\ No newline at end of file
+        }
+
+    async def send_verification_email(self, user: User):
+        if not self.smtp_client:
+            return
+        await self.send_user_email(self.verification_email_data(user), 'email_verification')
+
+    @classmethod
+    def queue_verification_email(cls, session: AsyncSession, user: User):
+        cls.queue_user_email(session, cls.verification_email_data(user), 'email_verification')
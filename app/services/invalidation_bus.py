@@ -0,0 +1,225 @@
+from builtins import Exception, ValueError, bool, dict, int, isinstance, min, property, str
+import asyncio
+import json
+import logging
+from typing import Callable, Dict, Optional
+from uuid import UUID, uuid4
+import asyncpg
+from sqlalchemy import func, select
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from settings.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Handler signature: (user_id, email, count_changed)
+InvalidationHandler = Callable[[Optional[UUID], Optional[str], bool], None]
+
+class InvalidationBus:
+    """
+    Cross-worker cache invalidation over Postgres LISTEN/NOTIFY.
+
+    Writers queue a NOTIFY in the same transaction as their change, so it is delivered only
+    if the change commits. Every worker keeps one dedicated connection listening on the channel
+    and hands each message to its handler. Messages a worker published itself are skipped,
+    since it already evicted locally. Other worker-to-worker messages share the channel
+    through `broadcast` and `add_handler`.
+
+    The listening connection is opened directly with asyncpg, outside the engine's pool, so
+    it doesn't take one of the `db_pool_size` connections for the life of the process. Each
+    worker holds one extra server connection for it. LISTEN needs a session-level connection,
+    so behind a transaction-pooling proxy the bus must be given a direct `listen_url`.
+
+    If the listening connection drops, notifications may have been missed: the `on_reset`
+    callback runs (typically clearing the cache) and the bus reconnects with backoff.
+    Cache TTLs bound staleness in the meantime.
+    """
+
+    def __init__(self, channel: str):
+        self.channel = channel
+        self._origin = uuid4().hex
+        # Set while the bus runs; writers only need this, not a live listener, to publish
+        self._engine: Optional[AsyncEngine] = None
+        self._listen_url: Optional[URL] = None
+        # The dedicated asyncpg connection listening on the channel
+        self._raw: Optional[asyncpg.Connection] = None
+        # asyncpg runs one operation per connection at a time, so broadcasts take turns
+        self._send_lock: Optional[asyncio.Lock] = None
+        self._handler: Optional[InvalidationHandler] = None
+        # Handlers for other kinds of worker-to-worker messages, keyed by message kind
+        self._kind_handlers: Dict[str, Callable[[dict], None]] = {}
+        self._on_reset: Optional[Callable[[], None]] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._published = 0
+        self._received = 0
+        self._reconnects = 0
+
+    @property
+    def listening(self) -> bool:
+        return self._raw is not None
+
+    async def start(self, engine: AsyncEngine, handler: InvalidationHandler, on_reset: Optional[Callable[[], None]] = None,
+                    listen_url: Optional[str] = None, pgbouncer: bool = False):
+        """
+        Open a dedicated connection and LISTEN on the channel.
+
+        The connection goes to `listen_url`, or to the engine's database when it is not set.
+        Raises ValueError in `pgbouncer` mode without a `listen_url`, since LISTEN through a
+        transaction-pooling proxy would never receive anything.
+        """
+        if engine.dialect.name != "postgresql":
+            logger.info("Cache invalidation bus needs PostgreSQL; cross-worker invalidation is off")
+            return
+        if pgbouncer and not listen_url:
+            raise ValueError("LISTEN does not work through a transaction-pooling proxy; set a direct listen URL")
+        self._listen_url = make_url(listen_url) if listen_url else engine.url
+        self._handler, self._on_reset = handler, on_reset
+        self._closing = False
+        await self._listen()
+        self._engine = engine
+
+    async def _listen(self):
+        url = self._listen_url
+        raw = await asyncpg.connect(user=url.username, password=url.password, host=url.host, port=url.port,
+                                    database=url.database)
+        try:
+            await raw.add_listener(self.channel, self._on_notification)
+            raw.add_termination_listener(self._on_termination)
+        except Exception:
+            await raw.close()
+            raise
+        self._raw, self._send_lock = raw, asyncio.Lock()
+
+    async def stop(self):
+        """Stop listening and close the connection."""
+        self._closing = True
+        self._engine = None
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            try:
+                raw.remove_termination_listener(self._on_termination)
+                await raw.remove_listener(self.channel, self._on_notification)
+                await raw.close()
+            except Exception as e:
+                logger.warning(f"Could not UNLISTEN cleanly: {e}")
+                raw.terminate()
+
+    def _payload(self, user_id: Optional[UUID], email: Optional[str], count_changed: bool) -> str:
+        return json.dumps({
+            "origin": self._origin,
+            "id": str(user_id) if user_id is not None else None,
+            "email": email,
+            "count": count_changed,
+        }, separators=(",", ":"))
+
+    async def publish(self, session: AsyncSession, user_id: Optional[UUID] = None, email: Optional[str] = None,
+                      count_changed: bool = False):
+        """
+        Queue an invalidation in the session's current transaction.
+
+        Postgres delivers it when the transaction commits and drops it on rollback.
+        """
+        notify = self.notify_expression(user_id, email, count_changed)
+        if notify is not None:
+            await session.execute(select(notify))
+
+    def notify_expression(self, user_id: Optional[UUID] = None, email: Optional[str] = None, count_changed: bool = False):
+        """
+        A `pg_notify(...)` call to embed in a write statement, e.g. in its RETURNING clause,
+        so the invalidation costs no extra round-trip. None when the bus is not running.
+
+        Notifications go out with the writer's transaction, so they are still sent while this
+        worker's own listener is reconnecting.
+        """
+        if self._engine is None:
+            return None
+        self._published += 1
+        return func.pg_notify(self.channel, self._payload(user_id, email, count_changed))
+
+    def add_handler(self, kind: str, handler: Callable[[dict], None]):
+        """Receive messages that other workers `broadcast` with this kind."""
+        self._kind_handlers[kind] = handler
+
+    async def broadcast(self, kind: str, data: dict) -> bool:
+        """
+        Send a non-transactional message to the other workers over the listening connection,
+        so it needs no pooled connection. Concurrent broadcasts are sent one after another.
+        Returns False when the bus is not running.
+        """
+        raw, lock = self._raw, self._send_lock
+        if raw is None:
+            return False
+        payload = json.dumps({"origin": self._origin, "kind": kind, "data": data}, separators=(",", ":"))
+        try:
+            async with lock:
+                await raw.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+        except Exception as e:
+            logger.warning(f"Broadcast of {kind} message failed: {e}")
+            return False
+        self._published += 1
+        return True
+
+    def _on_notification(self, connection, pid: int, channel: str, payload: str):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Ignoring malformed cache invalidation: {payload!r}")
+            return
+        if not isinstance(message, dict) or message.get("origin") == self._origin:
+            return
+        self._received += 1
+        kind = message.get("kind")
+        if kind is not None:
+            handler = self._kind_handlers.get(kind)
+            if handler is not None:
+                try:
+                    handler(message.get("data") or {})
+                except Exception as e:
+                    logger.error(f"Handler for {kind} messages failed: {e}")
+            return
+        user_id = UUID(message["id"]) if message.get("id") else None
+        try:
+            self._handler(user_id, message.get("email"), bool(message.get("count")))
+        except Exception as e:
+            logger.error(f"Cache invalidation handler failed: {e}")
+
+    def _on_termination(self, connection):
+        if self._closing or connection is not self._raw:
+            return
+        logger.warning("Cache invalidation listener lost its connection; reconnecting")
+        connection.remove_termination_listener(self._on_termination)
+        self._raw = None
+        connection.terminate()
+        if self._on_reset is not None:
+            self._on_reset()
+        self._reconnect_task = asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def _reconnect(self):
+        delay = 0.5
+        while not self._closing:
+            try:
+                await self._listen()
+                self._reconnects += 1
+                # Anything published while we were away was missed
+                if self._on_reset is not None:
+                    self._on_reset()
+                return
+            except Exception as e:
+                logger.warning(f"Cache invalidation reconnect failed, retrying in {delay}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+    def stats(self) -> dict:
+        return {
+            "channel": self.channel,
+            "listening": self.listening,
+            "published": self._published,
+            "received": self._received,
+            "reconnects": self._reconnects,
+        }
+
+invalidation_bus = InvalidationBus(settings.cache_invalidation_channel)
@@ -1,22 +1,100 @@
 # app/services/jwt_service.py
-from builtins import dict, str
+from builtins import dict, float, int, isinstance, iter, len, next, str
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from uuid import uuid4
 import jwt
 from datetime import datetime, timedelta
-from settings.config import settings
+from settings.config import Settings, get_settings
+
+class ClaimsCache:
+    """
+    Bounded LRU cache of verified JWT claims, keyed by a SHA-256 digest of the token.
+
+    Entries live until the token's `exp`. Only successfully verified tokens are stored, and
+    the whole cache is dropped when the settings snapshot (and with it possibly the signing
+    key) is replaced.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, Tuple[dict, float]]" = OrderedDict()
+        self._settings: Optional[Settings] = None
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def _check_settings(self, settings: Settings):
+        if settings is not self._settings:
+            self._entries.clear()
+            self._settings = settings
+
+    def get(self, token: str, settings: Settings) -> Optional[dict]:
+        self._check_settings(settings)
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return None
+        claims, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self._misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return claims
+
+    def put(self, token: str, claims: dict, settings: Settings):
+        expires_at = claims.get("exp")
+        if self.max_entries <= 0 or not isinstance(expires_at, (int, float)):
+            return
+        self._check_settings(settings)
+        self._entries[self._key(token)] = (claims, float(expires_at))
+        while len(self._entries) > self.max_entries:
+            del self._entries[next(iter(self._entries))]
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self._hits + self._misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": self._hits / lookups if lookups else 0.0,
+        }
+
+claims_cache = ClaimsCache(get_settings().jwt_claims_cache_max_entries)
 
 def create_access_token(*, data: dict, expires_delta: timedelta = None):
+    settings = get_settings()
     to_encode = data.copy()
     # Convert role to uppercase before encoding the JWT
     if 'role' in to_encode:
         to_encode['role'] = to_encode['role'].upper()
     expire = datetime.utcnow() + (expires_delta if expires_delta else timedelta(minutes=settings.access_token_expire_minutes))
     to_encode.update({"exp": expire})
+    # Unique id so the token can be revoked before it expires
+    to_encode.setdefault("jti", uuid4().hex)
     encoded_jwt = jwt.encode(to_encode, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
     return encoded_jwt
 
 def decode_token(token: str):
-    try:
-        decoded = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
-        return decoded
-    except jwt.PyJWTError:
-        return None
+    settings = get_settings()
+    claims = claims_cache.get(token, settings)
+    if claims is None:
+        try:
+            claims = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
+        except jwt.PyJWTError:
+            return None
+        claims_cache.put(token, claims, settings)
+    # Callers get their own copy so the cached claims stay untouched
+    return dict(claims)
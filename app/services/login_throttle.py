@@ -0,0 +1,128 @@
+from builtins import ValueError, any, dict, float, int, isinstance, len, max, reversed, set, str
+import asyncio
+import logging
+from ipaddress import ip_address
+from typing import Optional, Sequence
+from fastapi import Request
+from app.services.invalidation_bus import invalidation_bus
+from app.utils.rate_limiter import TokenBucketLimiter
+from settings.config import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+
+# Message kind used to share exhausted buckets between workers
+THROTTLE_MESSAGE = "login_throttle"
+
+def _is_trusted(address: str, trusted_proxies: Sequence) -> bool:
+    try:
+        ip = ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted_proxies)
+
+def client_ip(request: Request, trusted_proxies: Optional[Sequence] = None) -> str:
+    """
+    The client address.
+
+    X-Real-IP and X-Forwarded-For (set by nginx) are only believed when the peer is one of
+    `trusted_proxies` (default: the `trusted_proxies` setting); otherwise anyone reaching the
+    app directly could pick the address their attempts are counted against. In
+    X-Forwarded-For the nearest address that isn't a trusted proxy is the client.
+    """
+    peer = request.client.host if request.client else "unknown"
+    if trusted_proxies is None:
+        trusted_proxies = get_settings().trusted_proxies
+    if not _is_trusted(peer, trusted_proxies):
+        return peer
+    real_ip = request.headers.get("x-real-ip")
+    if real_ip:
+        return real_ip.strip()
+    forwarded_for = request.headers.get("x-forwarded-for")
+    if forwarded_for:
+        for address in reversed([address.strip() for address in forwarded_for.split(",")]):
+            if address and not _is_trusted(address, trusted_proxies):
+                return address
+    return peer
+
+class LoginThrottle:
+    """
+    Token-bucket limits on login attempts per email and per client IP.
+
+    `check` runs before any database or bcrypt work. State lives in each worker; when an
+    attempt takes a bucket's last token, the worker broadcasts it once over the cache
+    invalidation channel so the other workers reject the same email or IP until it refills.
+    Rejected attempts are not broadcast, so a burst against one key costs one message.
+    """
+
+    def __init__(self, settings: Settings):
+        self.configure(settings)
+        # Broadcasts in flight, referenced so they aren't garbage collected mid-send
+        self._sharing = set()
+        self._allowed = 0
+        self._rejected = 0
+
+    def configure(self, settings: Settings):
+        self.enabled = settings.login_throttle_enabled
+        self.share = settings.login_throttle_share
+        self._limiters = {
+            "email": TokenBucketLimiter(settings.login_throttle_email_burst, settings.login_throttle_email_per_minute / 60,
+                                        settings.login_throttle_max_keys),
+            "ip": TokenBucketLimiter(settings.login_throttle_ip_burst, settings.login_throttle_ip_per_minute / 60,
+                                     settings.login_throttle_max_keys),
+        }
+
+    def check(self, email: str, ip: str) -> float:
+        """
+        Count a login attempt.
+
+        :return: 0.0 if it may proceed, otherwise the seconds the client should wait (Retry-After).
+        """
+        if not self.enabled:
+            return 0.0
+        retry_after = 0.0
+        for kind, key in (("ip", ip), ("email", email.strip().lower())):
+            limiter = self._limiters[kind]
+            wait = limiter.acquire(key)
+            if wait > 0:
+                retry_after = max(retry_after, wait)
+            else:
+                exhausted_for = limiter.wait(key)
+                if exhausted_for > 0:
+                    # This attempt emptied the bucket; later rejections needn't say so again
+                    self._share(kind, key, exhausted_for)
+        if retry_after > 0:
+            self._rejected += 1
+        else:
+            self._allowed += 1
+        return retry_after
+
+    def _share(self, kind: str, key: str, seconds: float):
+        if self.share and invalidation_bus.listening:
+            task = asyncio.get_running_loop().create_task(
+                invalidation_bus.broadcast(THROTTLE_MESSAGE, {"kind": kind, "key": key, "seconds": seconds})
+            )
+            self._sharing.add(task)
+            task.add_done_callback(self._sharing.discard)
+
+    def apply_remote(self, data: dict):
+        """Handle a bucket that ran dry in another worker."""
+        limiter = self._limiters.get(data.get("kind"))
+        seconds = data.get("seconds")
+        if limiter is not None and isinstance(data.get("key"), str) and isinstance(seconds, (int, float)):
+            limiter.block(data["key"], seconds)
+
+    def reset(self):
+        for limiter in self._limiters.values():
+            limiter.clear()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "allowed": self._allowed,
+            "rejected": self._rejected,
+            "tracked_emails": len(self._limiters["email"]),
+            "tracked_ips": len(self._limiters["ip"]),
+        }
+
+login_throttle = LoginThrottle(get_settings())
+invalidation_bus.add_handler(THROTTLE_MESSAGE, login_throttle.apply_remote)
@@ -0,0 +1,46 @@
+from builtins import classmethod, float, int
+import logging
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from app.models.password_policy_model import PasswordHashPolicy
+from app.utils.security import PasswordHasher
+
+logger = logging.getLogger(__name__)
+
+# pg_advisory_xact_lock key that serializes calibration across workers
+CALIBRATION_LOCK_ID = 7340021
+
+class PasswordPolicyService:
+    """
+    Keeps the calibrated password hash cost identical in every worker.
+
+    Calibrating per worker gives slightly different costs on every start, and `needs_rehash`
+    would then move users back and forth between them. Instead the cost is calibrated once
+    for a latency budget and stored; workers started later, or with the same budget after a
+    restart, adopt the stored cost. Changing the budget recalibrates.
+    """
+
+    @classmethod
+    async def apply_calibrated_cost(cls, session_factory, hasher: PasswordHasher, target_ms: float,
+                                    min_rounds: int = 10, max_rounds: int = 16) -> int:
+        """Set `hasher`'s cost to the shared policy for `target_ms`, calibrating it first if there is none."""
+        async with session_factory() as session:
+            async with session.begin():
+                # Workers starting together wait here for the first one's result
+                await session.execute(select(func.pg_advisory_xact_lock(CALIBRATION_LOCK_ID)))
+                policy = await session.get(PasswordHashPolicy, hasher.scheme)
+                if policy is not None and policy.target_ms == target_ms and cls._within_bounds(hasher, policy.cost, min_rounds, max_rounds):
+                    hasher.cost = policy.cost
+                    logger.info("Using stored %s cost %s for a %sms budget", hasher.scheme, policy.cost, target_ms)
+                    return policy.cost
+                cost = await hasher.calibrate(target_ms, min_rounds=min_rounds, max_rounds=max_rounds)
+                values = {"cost": cost, "target_ms": target_ms, "calibrated_at": func.now()}
+                await session.execute(
+                    insert(PasswordHashPolicy).values(scheme=hasher.scheme, **values)
+                    .on_conflict_do_update(index_elements=[PasswordHashPolicy.scheme], set_=values)
+                )
+                return cost
+
+    @staticmethod
+    def _within_bounds(hasher: PasswordHasher, cost: int, min_rounds: int, max_rounds: int) -> bool:
+        return hasher.scheme != "bcrypt" or min_rounds <= cost <= max_rounds
@@ -0,0 +1,122 @@
+from builtins import bool, classmethod, int, str
+import hashlib
+import logging
+import secrets
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.token_model import RefreshToken
+from app.models.user_model import User
+from settings.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+class RefreshTokenService:
+    """
+    Opaque, rotating refresh tokens.
+
+    Only a SHA-256 hash of each token is stored, so checking one is a single indexed lookup
+    and never a bcrypt verification.
+    Every login and refresh adds a row; `purge_expired` deletes them again once they expire.
+    """
+
+    @staticmethod
+    def _hash(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def _new_token(cls, session: AsyncSession, user_id: uuid.UUID, family_id: uuid.UUID) -> str:
+        token = secrets.token_urlsafe(32)
+        expires_at = datetime.now(timezone.utc) + timedelta(minutes=get_settings().refresh_token_expire_minutes)
+        session.add(RefreshToken(user_id=user_id, family_id=family_id, token_hash=cls._hash(token), expires_at=expires_at))
+        return token
+
+    @classmethod
+    async def issue(cls, session: AsyncSession, user_id: uuid.UUID) -> str:
+        """Start a new token family for a fresh login and return its first token."""
+        token = cls._new_token(session, user_id, uuid.uuid4())
+        await session.commit()
+        return token
+
+    @classmethod
+    async def rotate(cls, session: AsyncSession, token: str) -> Optional[Tuple[User, str]]:
+        """
+        Exchange a refresh token for its successor.
+
+        Returns the user and the new token, or None if the token is unknown, expired, or the
+        account can no longer log in. A token that was already used or revoked revokes its
+        whole family.
+        """
+        now = datetime.now(timezone.utc)
+        query = (
+            select(RefreshToken, User)
+            .join(User, User.id == RefreshToken.user_id)
+            .where(RefreshToken.token_hash == cls._hash(token))
+        )
+        row = (await session.execute(query)).first()
+        if row is None:
+            return None
+        stored, user = row
+        if stored.used_at is not None or stored.revoked_at is not None:
+            logger.warning(f"Refresh token reuse detected for user {user.id}; revoking family {stored.family_id}")
+            await cls.revoke_family(session, stored.family_id)
+            return None
+        if stored.expires_at <= now or user.is_locked or not user.email_verified:
+            await session.rollback()
+            return None
+        # Claim the token atomically; a concurrent refresh with the same token loses here
+        claimed = await session.execute(
+            update(RefreshToken)
+            .where(RefreshToken.id == stored.id, RefreshToken.used_at.is_(None), RefreshToken.revoked_at.is_(None))
+            .values(used_at=now)
+            .returning(RefreshToken.id)
+        )
+        if claimed.scalar() is None:
+            await session.rollback()
+            logger.warning(f"Refresh token reuse detected for user {user.id}; revoking family {stored.family_id}")
+            await cls.revoke_family(session, stored.family_id)
+            return None
+        new_token = cls._new_token(session, user.id, stored.family_id)
+        await session.commit()
+        return user, new_token
+
+    @classmethod
+    async def revoke_family(cls, session: AsyncSession, family_id: uuid.UUID) -> None:
+        await session.execute(
+            update(RefreshToken)
+            .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=datetime.now(timezone.utc))
+        )
+        await session.commit()
+
+    @classmethod
+    async def revoke_for_user(cls, session: AsyncSession, user_id: uuid.UUID) -> None:
+        """Revoke every outstanding refresh token of a user, e.g. after a password reset. Does not commit."""
+        await session.execute(
+            update(RefreshToken)
+            .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=datetime.now(timezone.utc))
+        )
+
+    @classmethod
+    async def revoke(cls, session: AsyncSession, token: str) -> bool:
+        """Revoke the family of a presented refresh token, e.g. on logout."""
+        result = await session.execute(select(RefreshToken.family_id).where(RefreshToken.token_hash == cls._hash(token)))
+        family_id = result.scalar()
+        if family_id is None:
+            return False
+        await cls.revoke_family(session, family_id)
+        return True
+
+    @classmethod
+    async def purge_expired(cls, session: AsyncSession) -> int:
+        """
+        Delete tokens past their expiry, whether used, revoked or never presented.
+
+        An expired token is rejected whether or not its row exists, so dropping it loses nothing.
+        """
+        result = await session.execute(delete(RefreshToken).where(RefreshToken.expires_at <= datetime.now(timezone.utc)))
+        await session.commit()
+        return result.rowcount
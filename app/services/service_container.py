@@ -0,0 +1,105 @@
+from builtins import Exception, dict, int, min, range
+import asyncio
+import logging
+import time
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from app.database import Database
+from app.services.email_service import EmailService
+from app.utils.smtp_connection import close_smtp_client
+from app.utils.template_manager import TemplateManager
+from settings.config import Settings, add_reload_listener
+
+logger = logging.getLogger(__name__)
+
+class ServiceContainer:
+    """
+    The long-lived services behind request dependencies, built once per process.
+
+    `start()` runs in the app lifespan: it creates the database engines, then warms them up by
+    opening `db_warm_connections` pooled connections per engine, compiles every email template
+    and optionally opens SMTP sessions, so the first requests don't pay for any of it. `stop()`
+    closes the SMTP sessions and disposes the engines.
+
+    Outside the lifespan (scripts, tests) the services are still built lazily on first use.
+    The EmailService is rebuilt after a settings reload, so it picks up new SMTP settings.
+    """
+
+    def __init__(self):
+        self._template_manager: Optional[TemplateManager] = None
+        self._email_service: Optional[EmailService] = None
+        self._warm_up: dict = {}
+        add_reload_listener(self._on_settings_reload)
+
+    @property
+    def template_manager(self) -> TemplateManager:
+        if self._template_manager is None:
+            self._template_manager = TemplateManager()
+        return self._template_manager
+
+    @property
+    def email_service(self) -> EmailService:
+        if self._email_service is None:
+            self._email_service = EmailService(template_manager=self.template_manager)
+        return self._email_service
+
+    def _on_settings_reload(self, settings: Settings):
+        self._email_service = None
+
+    async def start(self, settings: Settings):
+        Database.initialize(
+            settings.database_url,
+            settings.debug,
+            replica_urls=settings.replica_urls,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+            pool_pre_ping=settings.db_pool_pre_ping,
+            pgbouncer=settings.db_pgbouncer_mode
+        )
+        await self.warm_up(settings)
+
+    async def warm_up(self, settings: Settings) -> dict:
+        """Open connections and compile templates ahead of traffic. Failures are logged, not raised."""
+        started = time.perf_counter()
+        report = {"database_connections": 0, "templates": 0, "smtp_connections": 0}
+        for engine in Database.get_engines():
+            try:
+                report["database_connections"] += await self._warm_engine(engine, settings.db_warm_connections)
+            except Exception as e:
+                logger.error(f"Could not warm up database connections: {e}")
+        try:
+            report["templates"] = self.template_manager.precompile()
+        except Exception as e:
+            logger.error(f"Could not precompile email templates: {e}")
+        smtp_client = self.email_service.smtp_client
+        if smtp_client is not None and settings.smtp_warm_connections > 0:
+            report["smtp_connections"] = await smtp_client.warm(settings.smtp_warm_connections)
+        report["seconds"] = time.perf_counter() - started
+        self._warm_up = report
+        logger.info(f"Warm-up finished: {report}")
+        return report
+
+    @staticmethod
+    async def _warm_engine(engine: AsyncEngine, connections: int) -> int:
+        connections = min(connections, engine.pool.size())
+
+        async def ping():
+            async with engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+
+        # Held concurrently, so each ping opens its own connection and returns it to the pool
+        await asyncio.gather(*(ping() for _ in range(connections)))
+        return connections
+
+    async def stop(self):
+        await close_smtp_client()
+        await Database.dispose()
+        self._email_service = None
+
+    def stats(self) -> dict:
+        return {"warm_up": self._warm_up}
+
+services = ServiceContainer()
@@ -0,0 +1,165 @@
+from builtins import Exception, bool, dict, int, len, list, max, set, str
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import List, Optional
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import Database
+from app.models.token_model import RevokedToken
+from app.services.refresh_token_service import RefreshTokenService
+from app.utils.bloom_filter import BloomFilter
+from settings.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+class TokenRevocationService:
+    """
+    Revocation of access tokens by their `jti` claim.
+
+    Revocations are stored in the revoked_tokens table and mirrored in a per-worker bloom
+    filter. `is_revoked` answers "no" from the filter alone for almost every token; only
+    filter hits are confirmed with a primary-key lookup. Revocations made by this worker
+    are added to the filter at once; those made by other workers arrive with the next
+    periodic rebuild. Every `token_revocation_purge_seconds` the rebuild loop also deletes
+    revocations of tokens that have expired, and expired refresh tokens, so neither table
+    grows forever.
+    """
+
+    def __init__(self):
+        self._bloom: Optional[BloomFilter] = None
+        self._sync_task: Optional[asyncio.Task] = None
+        self._load_lock: Optional[asyncio.Lock] = None
+        # Local revocations made while a rebuild is running, one set per running rebuild
+        self._revoked_during_sync: List[set] = []
+        self._last_purge = time.monotonic()
+        self._purged = 0
+        self._purged_refresh_tokens = 0
+        self._checks = 0
+        self._bloom_positives = 0
+        self._revoked_hits = 0
+        self._syncs = 0
+
+    async def revoke(self, session: AsyncSession, jti: str, expires_at: datetime) -> None:
+        """Record a revocation durably and add it to this worker's filter."""
+        statement = insert(RevokedToken).values(jti=jti, expires_at=expires_at).on_conflict_do_nothing()
+        await session.execute(statement)
+        await session.commit()
+        self._remember(jti)
+
+    def _remember(self, jti: str):
+        if self._bloom is not None:
+            self._bloom.add(jti)
+        # A rebuild that already ran its SELECT would otherwise drop this jti when it swaps
+        for revoked in self._revoked_during_sync:
+            revoked.add(jti)
+
+    async def is_revoked(self, jti: Optional[str]) -> bool:
+        """True if the token with this `jti` was revoked. Tokens without a `jti` cannot be revoked."""
+        if not jti:
+            return False
+        if self._bloom is None:
+            await self._ensure_loaded()
+        self._checks += 1
+        if jti not in self._bloom:
+            return False
+        self._bloom_positives += 1
+        async with Database.get_read_session_factory()() as session:
+            result = await session.execute(select(RevokedToken.jti).where(RevokedToken.jti == jti))
+            revoked = result.scalar() is not None
+        if revoked:
+            self._revoked_hits += 1
+        return revoked
+
+    async def _ensure_loaded(self):
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+        async with self._load_lock:
+            if self._bloom is None:
+                await self.sync()
+
+    async def sync(self) -> None:
+        """Rebuild the filter from unexpired revocations and swap it in."""
+        settings = get_settings()
+        revoked_meanwhile = set()
+        self._revoked_during_sync.append(revoked_meanwhile)
+        try:
+            async with Database.get_read_session_factory()() as session:
+                result = await session.execute(
+                    select(RevokedToken.jti).where(RevokedToken.expires_at > datetime.now(timezone.utc))
+                )
+                jtis = result.scalars().all()
+            # Leave headroom so revocations between rebuilds keep the error rate near its target
+            bloom = BloomFilter(max(settings.token_revocation_bloom_capacity, 2 * len(jtis)),
+                                settings.token_revocation_bloom_error_rate)
+            for jti in jtis:
+                bloom.add(jti)
+            for jti in revoked_meanwhile:
+                bloom.add(jti)
+            self._bloom = bloom
+        finally:
+            self._revoked_during_sync.remove(revoked_meanwhile)
+        self._syncs += 1
+
+    async def purge_expired(self, session: AsyncSession) -> int:
+        """Delete revocations of tokens that have expired anyway."""
+        result = await session.execute(delete(RevokedToken).where(RevokedToken.expires_at <= datetime.now(timezone.utc)))
+        await session.commit()
+        self._purged += result.rowcount
+        return result.rowcount
+
+    async def _purge_if_due(self):
+        if time.monotonic() - self._last_purge < get_settings().token_revocation_purge_seconds:
+            return
+        self._last_purge = time.monotonic()
+        async with Database.get_session_factory()() as session:
+            await self.purge_expired(session)
+            self._purged_refresh_tokens += await RefreshTokenService.purge_expired(session)
+
+    async def _sync_periodically(self):
+        while True:
+            await asyncio.sleep(get_settings().token_revocation_sync_seconds)
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error(f"Revoked-token filter sync failed, keeping the previous filter: {e}")
+            try:
+                await self._purge_if_due()
+            except Exception as e:
+                logger.error(f"Purging expired token revocations failed: {e}")
+
+    async def start(self):
+        """Load the filter and keep rebuilding it in the background."""
+        self._sync_task = asyncio.get_running_loop().create_task(self._sync_periodically())
+        await self.sync()
+
+    async def stop(self):
+        """Cancel the rebuild loop and wait for it, so no rebuild or purge is still using a session afterwards."""
+        task, self._sync_task = self._sync_task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    def reset(self):
+        """Forget the filter; the next check reloads it."""
+        self._bloom = None
+        self._load_lock = None
+
+    def stats(self) -> dict:
+        bloom = self._bloom
+        return {
+            "loaded": bloom is not None,
+            "entries": len(bloom) if bloom is not None else 0,
+            "bloom_bits": bloom.size if bloom is not None else 0,
+            "bloom_hashes": bloom.hash_count if bloom is not None else 0,
+            "checks": self._checks,
+            "bloom_positives": self._bloom_positives,
+            "revoked_hits": self._revoked_hits,
+            "syncs": self._syncs,
+            "purged": self._purged,
+            "purged_refresh_tokens": self._purged_refresh_tokens,
+        }
+
+token_revocation = TokenRevocationService()
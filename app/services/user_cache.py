@@ -0,0 +1,136 @@
+from builtins import AttributeError, bool, dict, float, getattr, int, isinstance, iter, len, next, object, property, str
+from collections import OrderedDict
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+from uuid import UUID
+from settings.config import settings
+
+# Columns copied into a snapshot; secrets such as hashed_password and verification_token stay in the database
+SNAPSHOT_FIELDS = (
+    "id", "nickname", "email", "first_name", "last_name", "bio", "profile_picture_url", "linkedin_profile_url",
+    "github_profile_url", "role", "is_professional", "professional_status_updated_at", "last_login_at",
+    "failed_login_attempts", "is_locked", "email_verified", "created_at", "updated_at",
+)
+
+# Lookup keys the cache can answer besides the primary key
+INDEXED_FIELDS = ("email", "nickname")
+
+class UserSnapshot:
+    """
+    Immutable, detached copy of a user row.
+
+    Reads like a `User` for the attributes in SNAPSHOT_FIELDS, but is not bound to any session,
+    so it is safe to share between requests.
+    """
+    __slots__ = SNAPSHOT_FIELDS
+
+    def __init__(self, **values):
+        for name in SNAPSHOT_FIELDS:
+            object.__setattr__(self, name, values.get(name))
+
+    @classmethod
+    def from_user(cls, user) -> "UserSnapshot":
+        return cls(**{name: getattr(user, name) for name in SNAPSHOT_FIELDS})
+
+    def __setattr__(self, name, value):
+        raise AttributeError("UserSnapshot is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("UserSnapshot is immutable")
+
+    def __repr__(self) -> str:
+        return f"<UserSnapshot {self.nickname}, Role: {self.role.name if self.role else None}>"
+
+class UserCache:
+    """
+    Bounded in-process cache of user snapshots with TTL and LRU eviction.
+
+    Entries are stored by id; email and nickname lookups go through a secondary index that is
+    dropped together with the entry. Writes must call `invalidate` so other requests in this
+    process stop seeing the old row.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[UUID, Tuple[UserSnapshot, float]]" = OrderedDict()
+        self._index: Dict[Tuple[str, Any], UUID] = {}
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, field: str, value) -> Optional[UserSnapshot]:
+        """Return the live snapshot whose `field` equals `value`, or None on a miss."""
+        user_id = value if field == "id" else self._index.get((field, value))
+        entry = self._entries.get(user_id) if user_id is not None else None
+        if entry is None:
+            self._misses += 1
+            return None
+        snapshot, expires_at = entry
+        if expires_at <= self._clock():
+            self._drop(user_id)
+            self._misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self._hits += 1
+        return snapshot
+
+    def put(self, user) -> Optional[UserSnapshot]:
+        """Snapshot `user` and cache it, evicting the least recently used entries beyond the bound."""
+        if not self.enabled:
+            return None
+        snapshot = user if isinstance(user, UserSnapshot) else UserSnapshot.from_user(user)
+        self._drop(snapshot.id)
+        self._entries[snapshot.id] = (snapshot, self._clock() + self.ttl_seconds)
+        for field in INDEXED_FIELDS:
+            value = getattr(snapshot, field)
+            if value is not None:
+                self._index[(field, value)] = snapshot.id
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+            self._evictions += 1
+        return snapshot
+
+    def invalidate(self, user_id: Optional[UUID] = None, email: Optional[str] = None) -> None:
+        """Drop the entry for a user, found by id or email."""
+        if user_id is None and email is not None:
+            user_id = self._index.get(("email", email))
+        if user_id is not None and self._drop(user_id):
+            self._invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._index.clear()
+
+    def _drop(self, user_id) -> bool:
+        entry = self._entries.pop(user_id, None)
+        if entry is None:
+            return False
+        snapshot = entry[0]
+        for field in INDEXED_FIELDS:
+            key = (field, getattr(snapshot, field))
+            if self._index.get(key) == user_id:
+                del self._index[key]
+        return True
+
+    def stats(self) -> dict:
+        """Return size, hit/miss counters and hit rate."""
+        lookups = self._hits + self._misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": self._hits / lookups if lookups else 0.0,
+            "evictions": self._evictions,
+            "invalidations": self._invalidations,
+        }
+
+user_cache = UserCache(settings.user_cache_max_entries, settings.user_cache_ttl_seconds)
@@ -0,0 +1,73 @@
+from builtins import dict, len
+import logging
+import zlib
+from typing import AsyncIterator, Optional, Sequence
+from sqlalchemy import select, tuple_
+from app.database import Database
+from app.models.user_model import User
+from app.schemas.user_schemas import RecordFormat
+from app.utils.pagination import UserKey
+from app.utils.record_stream import encode_csv, encode_ndjson
+from settings.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+class UserExportService:
+    """
+    Streams the whole user directory as NDJSON or CSV.
+
+    Rows are read as plain column tuples from a server-side cursor in `user_export_batch_size`
+    partitions and encoded one partition at a time, so memory stays flat however many users
+    there are. Like broadcasts, the cursor is reopened every `user_export_cursor_window` rows
+    from the last (created_at, id) key, which keeps each replica transaction short. Every row
+    carries `id` and `created_at`, so an interrupted export can be resumed after its last row.
+    """
+
+    @staticmethod
+    def export_fields(fields: Sequence[str]) -> tuple:
+        # The resume key is always exported, after the requested fields
+        return tuple(dict.fromkeys((*fields, "id", "created_at")))
+
+    @classmethod
+    async def stream(cls, fields: Sequence[str], format: RecordFormat, after: Optional[UserKey] = None,
+                     gzip: bool = False) -> AsyncIterator[bytes]:
+        """Yield the encoded export in chunks, gzip-compressed when `gzip` is set."""
+        compressor = zlib.compressobj(wbits=31) if gzip else None
+        async for chunk in cls._encoded(cls.export_fields(fields), format, after):
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+        if compressor is not None:
+            yield compressor.flush()
+
+    @classmethod
+    async def _encoded(cls, fields: tuple, format: RecordFormat, after: Optional[UserKey]) -> AsyncIterator[bytes]:
+        if format == RecordFormat.CSV:
+            yield encode_csv([fields])
+        async for rows in cls._batches(fields, after):
+            yield encode_csv(rows) if format == RecordFormat.CSV else encode_ndjson(fields, rows)
+
+    @staticmethod
+    async def _batches(fields: tuple, key: Optional[UserKey]) -> AsyncIterator[list]:
+        settings = get_settings()
+        columns = [getattr(User, name) for name in fields]
+        # Positions of the key columns in each row
+        created_at, user_id = fields.index("created_at"), fields.index("id")
+        exported = 0
+        while True:
+            query = select(*columns)
+            if key is not None:
+                query = query.where(tuple_(User.created_at, User.id) > tuple_(*key))
+            query = query.order_by(User.created_at, User.id).limit(settings.user_export_cursor_window)
+            streamed = 0
+            async with Database.get_replica_session_factory()() as session:
+                result = await session.stream(query.execution_options(yield_per=settings.user_export_batch_size))
+                async for rows in result.partitions():
+                    streamed += len(rows)
+                    key = (rows[-1][created_at], rows[-1][user_id])
+                    yield rows
+            exported += streamed
+            if streamed < settings.user_export_cursor_window:
+                break
+        logger.info(f"Exported {exported} users")
@@ -0,0 +1,167 @@
+from builtins import Exception, classmethod, isinstance, len, list, set, sorted, str, zip
+import asyncio
+import logging
+import secrets
+import time
+from types import SimpleNamespace
+from typing import AsyncIterator, List, Optional
+from uuid import uuid4
+from pydantic import ValidationError
+from sqlalchemy import String, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.user_model import User, UserRole
+from app.schemas.user_schemas import UserCreate, UserImportError, UserImportResponse
+from app.services.email_outbox_service import PRIORITY_BULK, email_outbox
+from app.services.email_service import EmailService
+from app.services.user_service import UserService
+from app.utils.nickname_gen import generate_nickname
+from app.utils.record_stream import Record
+from app.utils.security import generate_verification_token, password_hasher
+from settings.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# UserCreate doesn't bound every field, so check lengths here rather than let one row fail the batch INSERT
+_COLUMN_LENGTHS = {
+    column.name: column.type.length for column in User.__table__.columns
+    if isinstance(column.type, String) and column.type.length
+}
+
+class _ImportReport:
+    def __init__(self, max_errors: int):
+        self.max_errors = max_errors
+        self.total_rows = 0
+        self.created = 0
+        self.failed = 0
+        self.errors: List[UserImportError] = []
+        self.started = time.perf_counter()
+
+    def fail(self, row: int, email: Optional[str], *errors: str):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(UserImportError(row=row, email=email, errors=list(errors)))
+
+    def response(self) -> UserImportResponse:
+        seconds = time.perf_counter() - self.started
+        return UserImportResponse(
+            total_rows=self.total_rows, created=self.created, failed=self.failed,
+            errors=sorted(self.errors, key=lambda error: error.row),
+            errors_truncated=self.failed > len(self.errors), seconds=seconds,
+            rows_per_second=self.total_rows / seconds if seconds > 0 else 0.0,
+        )
+
+class UserImportService:
+    """
+    Bulk user creation from a stream of parsed records.
+
+    Each batch is validated with UserCreate (records without a role become AUTHENTICATED
+    users) and against the users table's column lengths, checked for duplicates against the
+    import so far and against the users table in one query, hashed on the password hasher's
+    worker pool in parallel, and written with one multi-row INSERT ... ON CONFLICT DO NOTHING,
+    so rows created concurrently by someone else are reported instead of failing the batch.
+    No transaction is open while a batch hashes, and bulk hashes leave a worker free for logins.
+    Verification emails go into the outbox at bulk priority in the same transaction. Every
+    batch commits on its own; a failed row never rolls back the others.
+    """
+
+    @classmethod
+    async def import_users(cls, session: AsyncSession, batches: AsyncIterator[List[Record]],
+                           send_verification: bool = True) -> UserImportResponse:
+        report = _ImportReport(get_settings().user_import_max_errors)
+        seen_emails, seen_nicknames = set(), set()
+        async for batch in batches:
+            report.total_rows += len(batch)
+            candidates = cls._validate(batch, report, seen_emails, seen_nicknames)
+            candidates = await cls._drop_existing(session, candidates, report)
+            if candidates:
+                hashes = await asyncio.gather(*(password_hasher.hash(user.password, bulk=True) for _, user in candidates))
+                await cls._insert(session, candidates, hashes, report, send_verification)
+        return report.response()
+
+    @staticmethod
+    def _validate(batch: List[Record], report: _ImportReport, seen_emails: set, seen_nicknames: set) -> list:
+        candidates = []
+        for row, record in batch:
+            if isinstance(record, Exception):
+                report.fail(row, None, f"Unreadable record: {record}")
+                continue
+            try:
+                user = UserCreate(**{"role": UserRole.AUTHENTICATED.value, **record})
+            except ValidationError as e:
+                report.fail(row, record.get("email"), *(
+                    f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+                ))
+                continue
+            if user.nickname is None:
+                # The adjective_animal_number space is small, so make generated names unique
+                user.nickname = f"{generate_nickname()}_{secrets.token_hex(3)}"
+            too_long = [
+                f"{name}: must be at most {length} characters" for name, length in _COLUMN_LENGTHS.items()
+                if isinstance(getattr(user, name, None), str) and len(getattr(user, name)) > length
+            ]
+            if too_long:
+                report.fail(row, user.email, *too_long)
+                continue
+            if user.email in seen_emails:
+                report.fail(row, user.email, "Email appears earlier in this import")
+                continue
+            if user.nickname in seen_nicknames:
+                report.fail(row, user.email, "Nickname appears earlier in this import")
+                continue
+            seen_emails.add(user.email)
+            seen_nicknames.add(user.nickname)
+            candidates.append((row, user))
+        return candidates
+
+    @staticmethod
+    async def _drop_existing(session: AsyncSession, candidates: list, report: _ImportReport) -> list:
+        """Drop candidates whose email or nickname is already taken, with one query for the batch."""
+        if not candidates:
+            return candidates
+        emails = [user.email for _, user in candidates]
+        nicknames = [user.nickname for _, user in candidates]
+        result = await session.execute(
+            select(User.email, User.nickname).where(or_(User.email.in_(emails), User.nickname.in_(nicknames)))
+        )
+        taken_emails, taken_nicknames = set(), set()
+        for email, nickname in result:
+            taken_emails.add(email)
+            taken_nicknames.add(nickname)
+        # End the read transaction so the connection isn't held idle while the batch hashes
+        await session.commit()
+        remaining = []
+        for row, user in candidates:
+            if user.email in taken_emails:
+                report.fail(row, user.email, "Email already exists")
+            elif user.nickname in taken_nicknames:
+                report.fail(row, user.email, "Nickname already exists")
+            else:
+                remaining.append((row, user))
+        return remaining
+
+    @classmethod
+    async def _insert(cls, session: AsyncSession, candidates: list, hashes: List[str], report: _ImportReport,
+                      send_verification: bool):
+        values = []
+        for (_, user), hashed_password in zip(candidates, hashes):
+            data = user.model_dump(exclude={"password"})
+            data.update(id=uuid4(), hashed_password=hashed_password, verification_token=generate_verification_token(),
+                        email_verified=False, is_locked=False, failed_login_attempts=0, is_professional=False)
+            values.append(data)
+        result = await session.execute(
+            insert(User).on_conflict_do_nothing().returning(User.email), values,
+        )
+        inserted = set(result.scalars().all())
+        for row, user in candidates:
+            if user.email not in inserted:
+                report.fail(row, user.email, "Email or nickname was taken while importing")
+        report.created += len(inserted)
+        if send_verification and inserted:
+            await email_outbox.enqueue_many(session, "email_verification", [
+                (data["email"], EmailService.verification_email_data(SimpleNamespace(**data)))
+                for data in values if data["email"] in inserted
+            ], PRIORITY_BULK)
+        await UserService._commit_user_change(session, None, count_changed=True)
+        if send_verification and inserted:
+            email_outbox.wake()
@@ -1,25 +1,45 @@
-from builtins import Exception, bool, classmethod, int, str
+from builtins import Exception, ValueError, bool, classmethod, getattr, int, len, list, staticmethod, str
 from datetime import datetime, timezone
 import secrets
-from typing import Optional, Dict, List
+import time
+from typing import Optional, Dict, List, Sequence, Tuple
 from pydantic import ValidationError
-from sqlalchemy import func, null, update, select
+from sqlalchemy import func, null, text, update, select, tuple_
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from app.database import Database
 from app.dependencies import get_email_service, get_settings
 from app.models.user_model import User
 from app.schemas.user_schemas import UserCreate, UserUpdate
+from app.services.invalidation_bus import invalidation_bus
+from app.services.refresh_token_service import RefreshTokenService
+from app.services.user_cache import UserSnapshot, user_cache
 from app.utils.nickname_gen import generate_nickname
-from app.utils.security import generate_verification_token, hash_password, verify_password
-from uuid import UUID
+from app.utils.pagination import Cursor
+from app.utils.security import generate_verification_token, password_hasher
+from uuid import UUID, uuid4
+from app.services.email_outbox_service import email_outbox
 from app.services.email_service import EmailService
 from app.models.user_model import UserRole
 import logging
 
-settings = get_settings()
 logger = logging.getLogger(__name__)
 
+# Kinds of user counts reported by UserService.count_with_strategy
+COUNT_EXACT = "exact"
+COUNT_ESTIMATED = "estimated"
+COUNT_CACHED = "cached"
+
+# Outcomes of UserService.authenticate
+LOGIN_OK = "ok"
+LOGIN_INVALID = "invalid"
+LOGIN_LOCKED = "locked"
+
 class UserService:
+    # (count, expires_at) for the 'cached' count strategy
+    _count_cache: Optional[Tuple[int, float]] = None
+
     @classmethod
     async def _execute_query(cls, session: AsyncSession, query):
         try:
@@ -32,22 +52,87 @@ class UserService:
             return None
 
     @classmethod
-    async def _fetch_user(cls, session: AsyncSession, **filters) -> Optional[User]:
-        query = select(User).filter_by(**filters)
-        result = await cls._execute_query(session, query)
-        return result.scalars().first() if result else None
+    async def _execute_read(cls, session: AsyncSession, query):
+        """Run a lookup in the session's current transaction without committing it."""
+        try:
+            return await session.execute(query)
+        except SQLAlchemyError as e:
+            logger.error(f"Database error: {e}")
+            await session.rollback()
+            return None
+
+    @staticmethod
+    def _select_users(columns: Optional[Sequence[str]] = None):
+        """Select full User entities, or only the named columns as plain rows (no ORM hydration)."""
+        if columns is None:
+            return select(User)
+        return select(*(getattr(User, name) for name in columns))
+
+    @staticmethod
+    def _users_from_result(result, columns: Optional[Sequence[str]] = None) -> list:
+        return list(result.scalars().all() if columns is None else result.all())
+
+    @classmethod
+    async def _fetch_user(cls, session: AsyncSession, columns: Optional[Sequence[str]] = None, cached: bool = False, **filters) -> Optional[User]:
+        """
+        Fetch one user by the given filters.
+
+        With `cached`, a single id, email or nickname filter is answered from the in-process
+        cache when possible and the result is a read-only `UserSnapshot`, which holds every
+        public column, so `columns` is ignored. Misses read on a replica session are not cached,
+        since a lagging replica could refill an entry a write just invalidated with the old row.
+        """
+        if cached and user_cache.enabled and len(filters) == 1:
+            (field, value), = filters.items()
+            snapshot = user_cache.get(field, value)
+            if snapshot is not None:
+                return snapshot
+            user = await cls._fetch_user(session, **filters)
+            if user is None:
+                return None
+            if Database.is_replica_session(session):
+                return UserSnapshot.from_user(user)
+            return user_cache.put(user)
+        query = cls._select_users(columns).filter_by(**filters)
+        result = await cls._execute_read(session, query)
+        if not result:
+            return None
+        return result.scalars().first() if columns is None else result.first()
+
+    @classmethod
+    async def get_by_id(cls, session: AsyncSession, user_id: UUID, columns: Optional[Sequence[str]] = None, cached: bool = False) -> Optional[User]:
+        """Fetch a user; with `columns`, return a row holding only those columns. See `_fetch_user` for `cached`."""
+        return await cls._fetch_user(session, columns, cached, id=user_id)
+
+    @classmethod
+    async def get_by_nickname(cls, session: AsyncSession, nickname: str, cached: bool = False) -> Optional[User]:
+        return await cls._fetch_user(session, cached=cached, nickname=nickname)
+
+    @classmethod
+    async def get_by_email(cls, session: AsyncSession, email: str, cached: bool = False) -> Optional[User]:
+        return await cls._fetch_user(session, cached=cached, email=email)
 
     @classmethod
-    async def get_by_id(cls, session: AsyncSession, user_id: UUID) -> Optional[User]:
-        return await cls._fetch_user(session, id=user_id)
+    def invalidate_user(cls, user_id: Optional[UUID] = None, email: Optional[str] = None) -> None:
+        """Drop a user's cached snapshot after the row changed."""
+        user_cache.invalidate(user_id, email)
 
     @classmethod
-    async def get_by_nickname(cls, session: AsyncSession, nickname: str) -> Optional[User]:
-        return await cls._fetch_user(session, nickname=nickname)
+    def apply_invalidation(cls, user_id: Optional[UUID], email: Optional[str], count_changed: bool) -> None:
+        """Handle an invalidation published by another worker."""
+        cls.invalidate_user(user_id, email)
+        if count_changed:
+            cls.invalidate_count()
 
     @classmethod
-    async def get_by_email(cls, session: AsyncSession, email: str) -> Optional[User]:
-        return await cls._fetch_user(session, email=email)
+    async def _commit_user_change(cls, session: AsyncSession, user_id: Optional[UUID], email: Optional[str] = None,
+                                  count_changed: bool = False) -> None:
+        """Commit a change to one user and drop cached copies in this and every other worker."""
+        await invalidation_bus.publish(session, user_id, email, count_changed)
+        await session.commit()
+        cls.invalidate_user(user_id, email)
+        if count_changed:
+            cls.invalidate_count()
 
     @classmethod
     async def create(cls, session: AsyncSession, user_data: Dict[str, str], email_service: EmailService) -> Optional[User]:
@@ -57,16 +142,19 @@ class UserService:
             if existing_user:
                 logger.error("User with given email already exists.")
                 return None
-            validated_data['hashed_password'] = hash_password(validated_data.pop('password'))
-            new_user = User(**validated_data)
+            validated_data['hashed_password'] = await password_hasher.hash(validated_data.pop('password'))
+            # The id is needed for the verification link before the row is flushed
+            new_user = User(id=uuid4(), **validated_data)
             new_user.verification_token = generate_verification_token()
             # new_nickname = generate_nickname()
             # while await cls.get_by_nickname(session, new_nickname):
             #     new_nickname = generate_nickname()
             # new_user.nickname = new_nickname
             session.add(new_user)
-            await session.commit()
-            await email_service.send_verification_email(new_user)
+            # Committed with the user; the outbox worker sends it, so a mail outage can't fail registration
+            email_service.queue_verification_email(session, new_user)
+            await cls._commit_user_change(session, None, count_changed=True)
+            email_outbox.wake()
             return new_user
         except ValidationError as e:
             logger.error(f"Validation error during user creation: {e}")
@@ -79,9 +167,12 @@ class UserService:
             validated_data = UserUpdate(**update_data).dict(exclude_unset=True)
 
             if 'password' in validated_data:
-                validated_data['hashed_password'] = hash_password(validated_data.pop('password'))
+                validated_data['hashed_password'] = await password_hasher.hash(validated_data.pop('password'))
             query = update(User).where(User.id == user_id).values(**validated_data).execution_options(synchronize_session="fetch")
+            # Queued before the UPDATE commits, so other workers hear about it only if it does
+            await invalidation_bus.publish(session, user_id)
             await cls._execute_query(session, query)
+            cls.invalidate_user(user_id)
             updated_user = await cls.get_by_id(session, user_id)
             if updated_user:
                 session.refresh(updated_user)  # Explicitly refresh the updated user object
@@ -101,14 +192,43 @@ class UserService:
             logger.info(f"User with ID {user_id} not found.")
             return False
         await session.delete(user)
-        await session.commit()
+        await cls._commit_user_change(session, user_id, user.email, count_changed=True)
         return True
 
     @classmethod
-    async def list_users(cls, session: AsyncSession, skip: int = 0, limit: int = 10) -> List[User]:
-        query = select(User).offset(skip).limit(limit)
-        result = await cls._execute_query(session, query)
-        return result.scalars().all() if result else []
+    async def list_users(cls, session: AsyncSession, skip: int = 0, limit: int = 10, columns: Optional[Sequence[str]] = None) -> List[User]:
+        """Offset pagination, kept for backward compatibility; prefer `list_users_keyset`."""
+        query = cls._select_users(columns).order_by(User.created_at, User.id).offset(skip).limit(limit)
+        result = await cls._execute_read(session, query)
+        return cls._users_from_result(result, columns) if result else []
+
+    @classmethod
+    async def list_users_keyset(cls, session: AsyncSession, limit: int = 10, cursor: Optional[Cursor] = None,
+                                columns: Optional[Sequence[str]] = None) -> Tuple[List[User], bool]:
+        """
+        Keyset pagination over the (created_at, id) index, so every page costs the same.
+
+        Returns up to `limit` users in ascending order and whether more rows exist in the
+        direction of travel. With `columns`, rows hold only those columns.
+        """
+        cursor = cursor or Cursor(key=None)
+        order_key = tuple_(User.created_at, User.id)
+        query = cls._select_users(columns)
+        if cursor.backward:
+            if cursor.key is not None:
+                query = query.where(order_key < tuple_(*cursor.key))
+            query = query.order_by(User.created_at.desc(), User.id.desc())
+        else:
+            if cursor.key is not None:
+                query = query.where(order_key > tuple_(*cursor.key))
+            query = query.order_by(User.created_at, User.id)
+        result = await cls._execute_read(session, query.limit(limit + 1))
+        users = cls._users_from_result(result, columns) if result else []
+        has_more = len(users) > limit
+        users = users[:limit]
+        if cursor.backward:
+            users.reverse()
+        return users, has_more
 
     @classmethod
     async def register_user(cls, session: AsyncSession, user_data: Dict[str, str], get_email_service) -> Optional[User]:
@@ -116,43 +236,111 @@ class UserService:
     
 
     @classmethod
-    async def login_user(cls, session: AsyncSession, email: str, password: str) -> Optional[User]:
-        user = await cls.get_by_email(session, email)
-        if user:
-            if user.email_verified is False:
-                return None
-            if user.is_locked:
-                return None
-            if verify_password(password, user.hashed_password):
-                user.failed_login_attempts = 0
-                user.last_login_at = datetime.now(timezone.utc)
-                session.add(user)
+    async def authenticate(cls, session: AsyncSession, email: str, password: str) -> Tuple[str, Optional[User]]:
+        """
+        Check a password and record the attempt in two statements.
+
+        One SELECT fetches only the auth columns. After the password check, one
+        UPDATE ... RETURNING either resets the failure counter (returning the user) or
+        increments it and computes the lock in SQL, so concurrent bad attempts cannot lose
+        updates. The cache invalidation rides along in the RETURNING clause. On a fresh
+        session both statements run in autocommit, which saves the BEGIN and COMMIT
+        round-trips; each statement is atomic on its own.
+
+        :return: One of LOGIN_OK, LOGIN_INVALID or LOGIN_LOCKED, and the user when LOGIN_OK.
+        """
+        autocommit = not session.in_transaction()
+        if autocommit:
+            await session.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+        try:
+            query = select(User.id, User.hashed_password, User.email_verified, User.is_locked).where(User.email == email)
+            account = (await session.execute(query)).first()
+            if account is None:
+                return LOGIN_INVALID, None
+            if account.is_locked:
+                return LOGIN_LOCKED, None
+            if not account.email_verified:
+                return LOGIN_INVALID, None
+            notify = invalidation_bus.notify_expression(account.id)
+            extra_returning = (notify,) if notify is not None else ()
+
+            if await password_hasher.verify(password, account.hashed_password):
+                values = {"failed_login_attempts": 0, "last_login_at": datetime.now(timezone.utc)}
+                if password_hasher.needs_rehash(account.hashed_password):
+                    # Upgrade the stored hash to the current policy while we hold the plain password
+                    values["hashed_password"] = await password_hasher.hash(password)
+                statement = (
+                    update(User)
+                    .where(User.id == account.id, User.is_locked.is_(False))
+                    .values(**values)
+                    .returning(User, *extra_returning)
+                    # With RETURNING, "fetch" refreshes a copy already in the identity map at no extra cost
+                    .execution_options(synchronize_session="fetch")
+                )
+                row = (await session.execute(statement)).first()
                 await session.commit()
-                return user
-            else:
-                user.failed_login_attempts += 1
-                if user.failed_login_attempts >= settings.max_login_attempts:
-                    user.is_locked = True
-                session.add(user)
+                cls.invalidate_user(account.id)
+                # Locked by a concurrent failed attempt after our SELECT
+                return (LOGIN_OK, row[0]) if row is not None else (LOGIN_LOCKED, None)
+
+            # The guard on is_locked makes exactly one attempt see the lock happen, and only that
+            # one queues the email, in the same statement so it commits with the lock
+            attempts = User.failed_login_attempts + 1
+            attempt = (
+                update(User)
+                .where(User.id == account.id, User.is_locked.is_(False))
+                .values(failed_login_attempts=attempts, is_locked=attempts >= get_settings().max_login_attempts)
+                .returning(*User.__table__.c)
+                .cte("attempt")
+            )
+            lock_email = email_outbox.enqueue_from(
+                'account_locked',
+                select(attempt.c.email, func.jsonb_build_object("name", attempt.c.first_name, "email", attempt.c.email))
+                .where(attempt.c.is_locked),
+                EmailService.PRIORITIES['account_locked'],
+            ).cte("lock_email")
+            # Loaded as the User entity, with populate_existing refreshing a copy already in the identity map
+            statement = (
+                select(aliased(User, attempt), *extra_returning).add_cte(lock_email)
+                .execution_options(populate_existing=True)
+            )
+            row = (await session.execute(statement)).first()
+            await session.commit()
+            cls.invalidate_user(account.id)
+            if row is None:
+                # Locked by a concurrent failed attempt after our SELECT
+                return LOGIN_LOCKED, None
+            if row[0].is_locked:
+                email_outbox.wake()
+            return LOGIN_INVALID, None
+        finally:
+            if autocommit and session.in_transaction():
                 await session.commit()
-        return None
+
+    @classmethod
+    async def login_user(cls, session: AsyncSession, email: str, password: str) -> Optional[User]:
+        """Authenticate and return the user, or None if the login failed for any reason."""
+        outcome, user = await cls.authenticate(session, email, password)
+        return user if outcome == LOGIN_OK else None
 
     @classmethod
     async def is_account_locked(cls, session: AsyncSession, email: str) -> bool:
-        user = await cls.get_by_email(session, email)
+        user = await cls.get_by_email(session, email, cached=True)
         return user.is_locked if user else False
 
 
     @classmethod
     async def reset_password(cls, session: AsyncSession, user_id: UUID, new_password: str) -> bool:
-        hashed_password = hash_password(new_password)
+        hashed_password = await password_hasher.hash(new_password)
         user = await cls.get_by_id(session, user_id)
         if user:
             user.hashed_password = hashed_password
             user.failed_login_attempts = 0  # Resetting failed login attempts
             user.is_locked = False  # Unlocking the user account, if locked
             session.add(user)
-            await session.commit()
+            # Sessions started with the old password must log in again
+            await RefreshTokenService.revoke_for_user(session, user_id)
+            await cls._commit_user_change(session, user_id)
             return True
         return False
 
@@ -164,7 +352,7 @@ class UserService:
             user.verification_token = None  # Clear the token once used
             user.role = UserRole.AUTHENTICATED
             session.add(user)
-            await session.commit()
+            await cls._commit_user_change(session, user_id)
             return True
         return False
 
@@ -180,6 +368,50 @@ class UserService:
         result = await session.execute(query)
         count = result.scalar()
         return count
+
+    @classmethod
+    async def estimated_count(cls, session: AsyncSession) -> Optional[int]:
+        """
+        Estimate the number of users from the planner statistics in pg_class.
+
+        :param session: The AsyncSession instance for database access.
+        :return: The estimate, or None if the table has not been analyzed yet.
+        """
+        query = text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)")
+        result = await session.execute(query, {"table": User.__tablename__})
+        estimate = result.scalar()
+        # reltuples is -1 until the first VACUUM/ANALYZE
+        return estimate if estimate is not None and estimate >= 0 else None
+
+    @classmethod
+    async def count_with_strategy(cls, session: AsyncSession, strategy: str = COUNT_EXACT) -> Tuple[int, str]:
+        """
+        Count users with the given strategy and report which kind of count was produced.
+
+        :param session: The AsyncSession instance for database access.
+        :param strategy: 'exact', 'estimated' (falls back to exact before the first ANALYZE)
+            or 'cached' (exact count reused until the TTL expires or a user is created or deleted).
+        :return: The count and its kind.
+        """
+        if strategy == COUNT_ESTIMATED:
+            estimate = await cls.estimated_count(session)
+            if estimate is not None:
+                return estimate, COUNT_ESTIMATED
+        elif strategy == COUNT_CACHED:
+            cached = cls._count_cache
+            if cached is not None and cached[1] > time.monotonic():
+                return cached[0], COUNT_CACHED
+            count = await cls.count(session)
+            cls._count_cache = (count, time.monotonic() + get_settings().user_count_cache_ttl_seconds)
+            return count, COUNT_EXACT
+        elif strategy != COUNT_EXACT:
+            raise ValueError(f"Unknown count strategy: {strategy}")
+        return await cls.count(session), COUNT_EXACT
+
+    @classmethod
+    def invalidate_count(cls) -> None:
+        """Drop the cached user count after rows are inserted or deleted."""
+        cls._count_cache = None
     
     @classmethod
     async def unlock_user_account(cls, session: AsyncSession, user_id: UUID) -> bool:
@@ -188,6 +420,6 @@ class UserService:
             user.is_locked = False
             user.failed_login_attempts = 0  # Optionally reset failed login attempts
             session.add(user)
-            await session.commit()
+            await cls._commit_user_change(session, user_id)
             return True
         return False
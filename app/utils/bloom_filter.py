@@ -0,0 +1,41 @@
+from builtins import all, bool, bytearray, int, len, max, range, round, str
+import hashlib
+import math
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings.
+
+    `contains` never returns a false negative; false positives occur at roughly `error_rate`
+    while no more than `capacity` items have been added. Bit positions come from double
+    hashing one BLAKE2b digest, so each check costs a single hash.
+    """
+    __slots__ = ("capacity", "error_rate", "size", "hash_count", "count", "_bits")
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(8, int(math.ceil(-self.capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.hash_count = max(1, int(round(self.size / self.capacity * math.log(2))))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def contains(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    __contains__ = contains
+
+    def __len__(self) -> int:
+        return self.count
@@ -1,11 +1,13 @@
-from builtins import dict, int, max, str
-from typing import List, Callable
+from builtins import dict, int, max, str, tuple
+from functools import lru_cache
+from typing import List, Callable, Optional
 from urllib.parse import urlencode
 from uuid import UUID
 
-from fastapi import Request
+from fastapi import FastAPI, Request
 from app.schemas.link_schema import Link
 from app.schemas.pagination_schema import PaginationLink
+from app.utils.pagination import encode_cursor
 
 # Utility function to create a link
 def create_link(rel: str, href: str, method: str = "GET", action: str = None) -> Link:
@@ -16,22 +18,71 @@ def create_pagination_link(rel: str, base_url: str, params: dict) -> PaginationL
     query_string = f"skip={params['skip']}&limit={params['limit']}"
     return PaginationLink(rel=rel, href=f"{base_url}?{query_string}")
 
-def create_user_links(user_id: UUID, request: Request) -> List[Link]:
+def create_cursor_pagination_link(rel: str, base_url: str, limit: int, cursor: Optional[str] = None) -> PaginationLink:
+    query_string = f"limit={limit}" if cursor is None else f"cursor={cursor}&limit={limit}"
+    return PaginationLink(rel=rel, href=f"{base_url}?{query_string}")
+
+def _base_url(request: Request) -> str:
+    """The request URL without its query string, which the pagination links replace."""
+    return str(request.url).split("?", 1)[0]
+
+# Placeholder reversed into the route paths; a UUID never contains braces
+USER_ID_PLACEHOLDER = "{user_id}"
+
+class UserLinkTemplates:
     """
-    Generate navigation links for user actions.
+    Per-user action URLs, reversed once per app and base URL.
+
+    Filling a template is plain string concatenation, so a page of users costs no route
+    reversals and no URL validation.
     """
-    actions = [
+    ACTIONS = (
         ("self", "get_user", "GET", "view"),
         ("update", "update_user", "PUT", "update"),
         ("delete", "delete_user", "DELETE", "delete")
-    ]
-    return [
-        create_link(rel, str(request.url_for(action, user_id=str(user_id))), method, action_desc)
-        for rel, action, method, action_desc in actions
-    ]
+    )
+    __slots__ = ("_templates",)
+
+    def __init__(self, app: FastAPI, base_url: str):
+        root = base_url.rstrip("/")
+        templates = []
+        for rel, route_name, method, action in self.ACTIONS:
+            href = root + app.url_path_for(route_name, user_id=USER_ID_PLACEHOLDER)
+            prefix, _, suffix = href.partition(USER_ID_PLACEHOLDER)
+            templates.append((rel, href, prefix, suffix, method, action))
+        self._templates = tuple(templates)
+
+    def links(self, user_id) -> List[dict]:
+        """Links for one user, shaped like `Link`."""
+        user_id = str(user_id)
+        return [
+            {"rel": rel, "href": prefix + user_id + suffix, "action": action, "type": "application/json"}
+            for rel, _, prefix, suffix, _, action in self._templates
+        ]
+
+    def templates(self) -> List[dict]:
+        """The same links as RFC 6570 URI templates, shaped like `LinkTemplate`."""
+        return [
+            {"rel": rel, "href": href, "method": method, "templated": True}
+            for rel, href, _, _, method, _ in self._templates
+        ]
+
+@lru_cache(maxsize=32)
+def _compile_user_link_templates(app: FastAPI, base_url: str) -> UserLinkTemplates:
+    return UserLinkTemplates(app, base_url)
+
+def get_user_link_templates(request: Request) -> UserLinkTemplates:
+    """Return the compiled user link templates for the request's app and base URL."""
+    return _compile_user_link_templates(request.app, str(request.base_url))
+
+def create_user_links(user_id: UUID, request: Request) -> List[dict]:
+    """
+    Generate navigation links for user actions.
+    """
+    return get_user_link_templates(request).links(user_id)
 
 def generate_pagination_links(request: Request, skip: int, limit: int, total_items: int) -> List[PaginationLink]:
-    base_url = str(request.url)
+    base_url = _base_url(request)
     total_pages = (total_items + limit - 1) // limit
     links = [
         create_pagination_link("self", base_url, {'skip': skip, 'limit': limit}),
@@ -46,3 +97,24 @@ def generate_pagination_links(request: Request, skip: int, limit: int, total_ite
         links.append(create_pagination_link("prev", base_url, {'skip': max(skip - limit, 0), 'limit': limit}))
 
     return links
+
+def generate_cursor_pagination_links(request: Request, limit: int, cursor: Optional[str] = None,
+                                     next_cursor: Optional[str] = None, prev_cursor: Optional[str] = None) -> List[PaginationLink]:
+    """
+    Generate keyset pagination links. Cursors are opaque; `first` has no cursor and `last`
+    starts from the end of the listing.
+    """
+    base_url = _base_url(request)
+    links = [
+        create_cursor_pagination_link("self", base_url, limit, cursor),
+        create_cursor_pagination_link("first", base_url, limit),
+        create_cursor_pagination_link("last", base_url, limit, encode_cursor(None, backward=True))
+    ]
+
+    if next_cursor is not None:
+        links.append(create_cursor_pagination_link("next", base_url, limit, next_cursor))
+
+    if prev_cursor is not None:
+        links.append(create_cursor_pagination_link("prev", base_url, limit, prev_cursor))
+
+    return links
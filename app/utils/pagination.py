@@ -0,0 +1,45 @@
+from builtins import Exception, ValueError, bool, dict, len, str
+import base64
+import json
+from datetime import datetime
+from typing import NamedTuple, Optional, Tuple
+from uuid import UUID
+
+# Keyset position of a user row: the (created_at, id) pair the listing is ordered by
+UserKey = Tuple[datetime, UUID]
+
+class Cursor(NamedTuple):
+    """
+    Decoded pagination cursor.
+
+    `key` is the (created_at, id) of the row to continue from. `backward` cursors walk towards
+    older rows; a backward cursor without a key starts at the very end of the listing.
+    """
+    key: Optional[UserKey]
+    backward: bool = False
+
+def encode_cursor(key: Optional[UserKey], backward: bool = False) -> str:
+    """Encode a keyset position into an opaque, URL-safe cursor string."""
+    payload: dict = {"d": "prev" if backward else "next"}
+    if key is not None:
+        payload["k"] = [key[0].isoformat(), str(key[1])]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Cursor:
+    """
+    Decode a cursor produced by `encode_cursor`.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        key = None
+        if "k" in payload:
+            created_at, user_id = payload["k"]
+            key = (datetime.fromisoformat(created_at), UUID(user_id))
+        return Cursor(key=key, backward=payload.get("d") == "prev")
+    except Exception as e:
+        raise ValueError("Invalid pagination cursor") from e
@@ -0,0 +1,62 @@
+from builtins import dict, float, int, iter, len, max, min, next
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Tuple
+
+class TokenBucketLimiter:
+    """
+    In-memory token buckets, one per key.
+
+    Each bucket holds up to `capacity` tokens and refills at `refill_per_second`. Keys are
+    kept in LRU order and the least recently used are dropped beyond `max_keys`; a dropped
+    key simply starts again with a full bucket.
+    """
+
+    def __init__(self, capacity: int, refill_per_second: float, max_keys: int = 100000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.max_keys = max_keys
+        self._clock = clock
+        # key -> (tokens, as of this clock reading)
+        self._buckets: "OrderedDict[Hashable, Tuple[float, float]]" = OrderedDict()
+
+    def _tokens(self, key: Hashable, now: float) -> float:
+        tokens, updated_at = self._buckets.get(key, (self.capacity, now))
+        return min(self.capacity, tokens + (now - updated_at) * self.refill_per_second)
+
+    def acquire(self, key: Hashable) -> float:
+        """
+        Take one token for `key`.
+
+        :return: 0.0 if the request may proceed, otherwise the seconds until a token is available.
+        """
+        now = self._clock()
+        tokens = self._tokens(key, now)
+        if tokens >= 1:
+            self._buckets[key] = (tokens - 1, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                del self._buckets[next(iter(self._buckets))]
+            return 0.0
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        return (1 - tokens) / self.refill_per_second
+
+    def wait(self, key: Hashable) -> float:
+        """Seconds until `key` has a token, without taking one. Unknown keys have a full bucket."""
+        tokens = self._tokens(key, self._clock())
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.refill_per_second
+
+    def block(self, key: Hashable, seconds: float):
+        """Empty `key`'s bucket so its next token arrives in `seconds`, e.g. when another worker says so."""
+        now = self._clock()
+        # A bucket "as of" the future holds 0 tokens then and 1 after `seconds`
+        self._buckets[key] = (0.0, now + max(0.0, seconds) - 1 / self.refill_per_second)
+        self._buckets.move_to_end(key)
+
+    def clear(self):
+        self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
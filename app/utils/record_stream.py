@@ -0,0 +1,116 @@
+from builtins import Exception, ValueError, bool, dict, int, isinstance, len, next, str, zip
+import codecs
+import csv
+import io
+from datetime import datetime
+from enum import Enum
+from typing import Any, AsyncIterator, Iterable, List, Sequence, Tuple, Union
+import orjson
+
+# (record number, parsed record or the error that made it unreadable); numbering starts at 1
+Record = Tuple[int, Union[dict, Exception]]
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a byte stream into text lines without buffering more than one chunk."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+async def iter_ndjson_batches(chunks: AsyncIterator[bytes], batch_size: int) -> AsyncIterator[List[Record]]:
+    """Parse newline-delimited JSON objects, `batch_size` records at a time. Blank lines are skipped."""
+    batch: List[Record] = []
+    number = 0
+    async for line in iter_lines(chunks):
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            record = orjson.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("Each line must be a JSON object")
+        except (orjson.JSONDecodeError, ValueError) as e:
+            record = e
+        batch.append((number, record))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+async def iter_csv_batches(chunks: AsyncIterator[bytes], batch_size: int) -> AsyncIterator[List[Record]]:
+    """
+    Parse CSV with a header row, `batch_size` records at a time.
+
+    Lines are joined into one record while a quoted field is still open (an odd number of
+    quote characters so far), so quoted fields may span lines. Empty fields are left out of
+    the record, so they fall back to the model's defaults.
+    """
+    header = None
+    texts: List[str] = []
+    current: List[str] = []
+    quotes = 0
+    number = 0
+
+    def parse(texts: List[str]) -> List[Record]:
+        nonlocal number
+        records = []
+        for values in csv.reader(texts):
+            number += 1
+            if len(values) != len(header):
+                records.append((number, ValueError(f"Expected {len(header)} columns, got {len(values)}")))
+            else:
+                records.append((number, {name: value for name, value in zip(header, values) if value != ""}))
+        return records
+
+    async for line in iter_lines(chunks):
+        current.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            continue  # inside a quoted field that continues on the next line
+        text = "\n".join(current)
+        current, quotes = [], 0
+        if not text.strip():
+            continue
+        if header is None:
+            header = [name.strip() for name in next(csv.reader([text]))]
+            continue
+        texts.append(text)
+        if len(texts) >= batch_size:
+            yield parse(texts)
+            texts = []
+    if current:
+        texts.append("\n".join(current))
+    if texts and header is not None:
+        yield parse(texts)
+
+def encode_ndjson(fields: Sequence[str], rows: Iterable) -> bytes:
+    """Encode rows (tuples in `fields` order) as newline-delimited JSON objects."""
+    # default=str covers asyncpg's own UUID type, which orjson doesn't recognise
+    return b"".join(orjson.dumps(dict(zip(fields, row)), default=str, option=orjson.OPT_UTC_Z | orjson.OPT_APPEND_NEWLINE)
+                    for row in rows)
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def encode_csv(rows: Iterable) -> bytes:
+    """Encode rows as CSV lines; None becomes an empty field, which the CSV parser reads back as missing."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for row in rows:
+        writer.writerow([_csv_value(value) for value in row])
+    return buffer.getvalue().encode("utf-8")
@@ -1,12 +1,26 @@
 # app/security.py
-from builtins import Exception, ValueError, bool, int, str
+from builtins import Exception, ImportError, IndexError, ValueError, bool, dict, float, int, max, min, range, str
+import asyncio
 import secrets
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
 import bcrypt
 from logging import getLogger
+from settings.config import settings
+
+try:  # argon2id is an optional backend
+    import argon2
+except ImportError:  # pragma: no cover - depends on the environment
+    argon2 = None
 
 # Set up logging
 logger = getLogger(__name__)
 
+BCRYPT_MIN_ROUNDS = 4
+BCRYPT_MAX_ROUNDS = 31
+ARGON2_PREFIX = "$argon2"
+
 def hash_password(password: str, rounds: int = 12) -> str:
     """
     Hashes a password using bcrypt with a specified cost factor.
@@ -29,13 +43,41 @@ def hash_password(password: str, rounds: int = 12) -> str:
         logger.error("Failed to hash password: %s", e)
         raise ValueError("Failed to hash password") from e
 
+def _require_argon2():
+    if argon2 is None:
+        raise ValueError("argon2id password hashing requires the 'argon2-cffi' package")
+
+def hash_password_argon2(password: str, time_cost: int = 3, memory_cost: int = 65536, parallelism: int = 1) -> str:
+    """
+    Hashes a password using argon2id.
+
+    Args:
+        password (str): The plain text password to hash.
+        time_cost (int): Number of iterations.
+        memory_cost (int): Memory usage in KiB.
+        parallelism (int): Number of parallel lanes.
+
+    Returns:
+        str: The encoded argon2id hash.
+
+    Raises:
+        ValueError: If argon2 is not installed or hashing the password fails.
+    """
+    _require_argon2()
+    try:
+        hasher = argon2.PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism, type=argon2.Type.ID)
+        return hasher.hash(password)
+    except Exception as e:
+        logger.error("Failed to hash password: %s", e)
+        raise ValueError("Failed to hash password") from e
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verifies a plain text password against a hashed password.
     
     Args:
         plain_password (str): The plain text password to verify.
-        hashed_password (str): The bcrypt hashed password.
+        hashed_password (str): The bcrypt or argon2id hashed password.
 
     Returns:
         bool: True if the password is correct, False otherwise.
@@ -44,10 +86,233 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         ValueError: If the hashed password format is incorrect or the function fails to verify.
     """
     try:
+        if hashed_password.startswith(ARGON2_PREFIX):
+            _require_argon2()
+            try:
+                return argon2.PasswordHasher().verify(hashed_password, plain_password)
+            except argon2.exceptions.VerifyMismatchError:
+                return False
         return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
     except Exception as e:
         logger.error("Error verifying password: %s", e)
         raise ValueError("Authentication process encountered an unexpected error") from e
 
+def _time_call(func, *args) -> float:
+    """Return the wall time of one call in milliseconds."""
+    started = time.perf_counter()
+    func(*args)
+    return (time.perf_counter() - started) * 1000
+
+def calibrate_bcrypt_rounds(target_ms: float, min_rounds: int = 10, max_rounds: int = 16) -> int:
+    """
+    Picks the highest bcrypt cost whose hash time stays within `target_ms` on this machine.
+
+    Each extra round doubles the work, so a single measurement at `min_rounds` is extrapolated.
+    The result never drops below `min_rounds`, even if that already exceeds the budget.
+    """
+    min_rounds = max(min_rounds, BCRYPT_MIN_ROUNDS)
+    max_rounds = min(max_rounds, BCRYPT_MAX_ROUNDS)
+    elapsed = min(_time_call(hash_password, "calibration", min_rounds) for _ in range(3))
+    rounds = min_rounds
+    while rounds < max_rounds and elapsed * 2 <= target_ms:
+        rounds += 1
+        elapsed *= 2
+    return rounds
+
+def calibrate_argon2_time_cost(target_ms: float, memory_cost: int = 65536, parallelism: int = 1, max_time_cost: int = 10) -> int:
+    """Picks the highest argon2id time cost (iterations) whose hash time stays within `target_ms`."""
+    elapsed = min(_time_call(hash_password_argon2, "calibration", 1, memory_cost, parallelism) for _ in range(3))
+    time_cost = 1
+    while time_cost < max_time_cost and elapsed * (time_cost + 1) / time_cost <= target_ms:
+        elapsed = elapsed * (time_cost + 1) / time_cost
+        time_cost += 1
+    return time_cost
+
 def generate_verification_token():
-    return secrets.token_urlsafe(16)  # Generates a secure 16-byte URL-safe token
\ No newline at end of file
+    return secrets.token_urlsafe(16)  # Generates a secure 16-byte URL-safe token
+
+class PasswordHasher:
+    """
+    Runs password hashing and verification on a bounded worker pool so the event loop is never
+    blocked by key derivation.
+
+    At most `max_workers` operations run at once; further callers wait on a semaphore, which is
+    what `queue_depth` and the wait-time counters in `stats()` measure. Bulk hashes (imports)
+    first wait on a second semaphore one slot narrower, so they never fill every worker and
+    logins always have one to queue for.
+
+    The hasher also owns the current hashing policy (scheme and cost). `calibrate()` tunes the
+    cost to a latency budget and `needs_rehash()` reports stored hashes made under another policy,
+    so the policy must be the same in every worker (see `PasswordPolicyService`).
+
+    Args:
+        max_workers (int): Maximum number of concurrent hash operations.
+        executor (str): 'thread' (bcrypt and argon2 release the GIL) or 'process'.
+        scheme (str): 'bcrypt' or 'argon2id'.
+        rounds (int): bcrypt cost factor.
+        argon2_time_cost (int): argon2id iterations.
+        argon2_memory_cost (int): argon2id memory usage in KiB.
+        argon2_parallelism (int): argon2id parallel lanes.
+    """
+    EXECUTOR_TYPES = ("thread", "process")
+    SCHEMES = ("bcrypt", "argon2id")
+
+    def __init__(self, max_workers: int = 4, executor: str = "thread", scheme: str = "bcrypt", rounds: int = 12,
+                 argon2_time_cost: int = 3, argon2_memory_cost: int = 65536, argon2_parallelism: int = 1):
+        if executor not in self.EXECUTOR_TYPES:
+            raise ValueError(f"Unsupported password hash executor: {executor}")
+        if scheme not in self.SCHEMES:
+            raise ValueError(f"Unsupported password hash scheme: {scheme}")
+        if scheme == "argon2id":
+            _require_argon2()
+        if max_workers < 1:
+            raise ValueError("Password hasher needs at least one worker")
+        self.max_workers = max_workers
+        self.executor_type = executor
+        self.scheme = scheme
+        self.rounds = rounds
+        self.argon2_time_cost = argon2_time_cost
+        self.argon2_memory_cost = argon2_memory_cost
+        self.argon2_parallelism = argon2_parallelism
+        self._executor: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._bulk_semaphore: Optional[asyncio.Semaphore] = None
+        self._loop = None
+        self._waiting = 0
+        self._in_flight = 0
+        self._completed = 0
+        self._wait_seconds_total = 0.0
+        self._wait_seconds_max = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hasher")
+        return self._executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # asyncio primitives are bound to the loop they first wait on, so rebuild per loop.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+            self._bulk_semaphore = asyncio.Semaphore(max(1, self.max_workers - 1))
+        return self._semaphore
+
+    def _get_bulk_semaphore(self) -> asyncio.Semaphore:
+        self._get_semaphore()
+        return self._bulk_semaphore
+
+    async def _run(self, func, *args):
+        semaphore = self._get_semaphore()
+        started = time.perf_counter()
+        self._waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        waited = time.perf_counter() - started
+        self._wait_seconds_total += waited
+        self._wait_seconds_max = max(self._wait_seconds_max, waited)
+        self._in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self._in_flight -= 1
+            self._completed += 1
+            semaphore.release()
+
+    async def hash(self, password: str, bulk: bool = False) -> str:
+        """
+        Hash a password under the current policy on the worker pool. Raises ValueError like `hash_password`.
+
+        With `bulk`, the hash leaves at least one worker to interactive callers.
+        """
+        if bulk:
+            async with self._get_bulk_semaphore():
+                return await self._hash(password)
+        return await self._hash(password)
+
+    async def _hash(self, password: str) -> str:
+        if self.scheme == "argon2id":
+            return await self._run(hash_password_argon2, password, self.argon2_time_cost, self.argon2_memory_cost, self.argon2_parallelism)
+        return await self._run(hash_password, password, self.rounds)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password on the worker pool. Raises ValueError like `verify_password`."""
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    @property
+    def cost(self) -> int:
+        """The work factor of the current scheme: bcrypt rounds or argon2id time cost."""
+        return self.argon2_time_cost if self.scheme == "argon2id" else self.rounds
+
+    @cost.setter
+    def cost(self, value: int):
+        if self.scheme == "argon2id":
+            self.argon2_time_cost = value
+        else:
+            self.rounds = value
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """Return True if the stored hash uses another scheme or cost than the current policy, higher or lower."""
+        if hashed_password.startswith(ARGON2_PREFIX):
+            if self.scheme != "argon2id":
+                return True
+            try:
+                parameters = argon2.extract_parameters(hashed_password)
+            except Exception:
+                return True
+            return ((parameters.time_cost, parameters.memory_cost, parameters.parallelism)
+                    != (self.argon2_time_cost, self.argon2_memory_cost, self.argon2_parallelism))
+        if self.scheme != "bcrypt":
+            return True
+        # bcrypt hashes look like $2b$<cost>$<salt+digest>
+        parts = hashed_password.split("$")
+        try:
+            return int(parts[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    async def calibrate(self, target_ms: float, min_rounds: int = 10, max_rounds: int = 16) -> int:
+        """Benchmark on the worker pool, set the cost of the current scheme to fit `target_ms` and return it."""
+        if self.scheme == "argon2id":
+            self.argon2_time_cost = await self._run(calibrate_argon2_time_cost, target_ms, self.argon2_memory_cost, self.argon2_parallelism)
+            logger.info("Calibrated argon2id time cost to %s for a %sms budget", self.argon2_time_cost, target_ms)
+        else:
+            self.rounds = await self._run(calibrate_bcrypt_rounds, target_ms, min_rounds, max_rounds)
+            logger.info("Calibrated bcrypt cost to %s for a %sms budget", self.rounds, target_ms)
+        return self.cost
+
+    def stats(self) -> dict:
+        """Return queue depth, concurrency and wait-time metrics for the pool."""
+        return {
+            "scheme": self.scheme,
+            "rounds": self.rounds if self.scheme == "bcrypt" else self.argon2_time_cost,
+            "executor": self.executor_type,
+            "max_workers": self.max_workers,
+            "queue_depth": self._waiting,
+            "in_flight": self._in_flight,
+            "completed": self._completed,
+            "wait_seconds_total": self._wait_seconds_total,
+            "wait_seconds_max": self._wait_seconds_max,
+            "wait_seconds_avg": self._wait_seconds_total / self._completed if self._completed else 0.0,
+        }
+
+    def shutdown(self):
+        """Stop the worker pool; it is recreated lazily if the hasher is used again."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+password_hasher = PasswordHasher(
+    max_workers=settings.password_hash_workers,
+    executor=settings.password_hash_executor,
+    scheme=settings.password_hash_scheme,
+    rounds=settings.password_hash_rounds,
+    argon2_time_cost=settings.argon2_time_cost,
+    argon2_memory_cost=settings.argon2_memory_cost,
+    argon2_parallelism=settings.argon2_parallelism
+)
\ No newline at end of file
@@ -0,0 +1,73 @@
+from builtins import dict, int, isinstance, len, str, zip
+from operator import attrgetter
+from typing import Any, Iterable, List, Optional, Sequence
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from app.schemas.pagination_schema import PaginationLink
+from app.schemas.user_schemas import USER_RESPONSE_FIELDS
+from app.utils.link_generation import UserLinkTemplates
+
+def _orjson_default(value: Any) -> Any:
+    """Encode the values orjson has no native support for, such as pydantic models and URL types."""
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    return str(value)
+
+class FastJSONResponse(ORJSONResponse):
+    """
+    orjson-encoded response that also accepts pydantic models.
+
+    Routes return it directly, so FastAPI neither re-validates the payload against the
+    `response_model` nor runs it through `jsonable_encoder`.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            content = content.model_dump()
+        return orjson.dumps(content, default=_orjson_default, option=orjson.OPT_UTC_Z)
+
+def user_payloads(users: Iterable, fields: Sequence[str] = USER_RESPONSE_FIELDS,
+                  link_templates: Optional[UserLinkTemplates] = None) -> List[dict]:
+    """
+    Turn ORM users (or projected rows) into UserResponse-shaped dicts.
+
+    The rows were validated when they were written, so no pydantic validation runs here; that
+    step was dominated by re-checking every email address. With `link_templates`, each payload
+    also gets its HATEOAS links.
+    """
+    getter = attrgetter(*fields)
+    if len(fields) == 1:
+        payloads = [{fields[0]: getter(user)} for user in users]
+    else:
+        payloads = [dict(zip(fields, getter(user))) for user in users]
+    if link_templates is not None:
+        for user, payload in zip(users, payloads):
+            payload["links"] = link_templates.links(user.id)
+    return payloads
+
+def user_response(user, status_code: int = 200, fields: Sequence[str] = USER_RESPONSE_FIELDS,
+                  link_templates: Optional[UserLinkTemplates] = None) -> FastJSONResponse:
+    """Serialize a single ORM user."""
+    return FastJSONResponse(user_payloads([user], fields, link_templates)[0], status_code=status_code)
+
+def user_list_response(users: List, total: int, total_kind: str, page: Optional[int], links: List[PaginationLink],
+                       fields: Sequence[str] = USER_RESPONSE_FIELDS, link_templates: Optional[UserLinkTemplates] = None,
+                       templates_only: bool = False) -> FastJSONResponse:
+    """
+    Serialize a page of ORM users in the UserListResponse envelope.
+
+    With `templates_only`, the user links are sent once as `link_templates` on the envelope
+    instead of on every item.
+    """
+    envelope = {
+        "items": user_payloads(users, fields, None if templates_only else link_templates),
+        "total": total,
+        "total_kind": total_kind,
+        "page": page,
+        "size": len(users),
+        "links": [link.model_dump() for link in links],
+    }
+    if templates_only and link_templates is not None:
+        envelope["link_templates"] = link_templates.templates()
+    return FastJSONResponse(envelope)
@@ -1,31 +1,296 @@
 # smtp_client.py
-from builtins import Exception, int, str
+from builtins import Exception, OSError, ValueError, dict, float, int, isinstance, len, max, min, range, str
+import asyncio
 import smtplib
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from settings.config import settings
+from typing import Optional
+from settings.config import Settings
 import logging
 
+# Errors that mean the SMTP session is gone, as opposed to the server refusing one message
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError)
+
+class _PooledConnection:
+    __slots__ = ("smtp", "sent", "last_used")
+
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.sent = 0
+        self.last_used = time.monotonic()
+
 class SMTPClient:
-    def __init__(self, server: str, port: int, username: str, password: str):
+    """
+    Sends mail over a pool of persistent, authenticated SMTP sessions.
+
+    smtplib is blocking, so connecting and sending run on a small thread pool and never on the
+    event loop. At most `pool_size` messages are in flight; further senders wait on a semaphore.
+    Sessions are reused until they have sent `max_messages_per_connection` messages or sat idle
+    for `idle_timeout` seconds. A send that fails because a reused session was dropped by the
+    server is retried once on a fresh session.
+
+    Args:
+        server (str): SMTP host.
+        port (int): SMTP port.
+        username (str): Login user, also used as the From address.
+        password (str): Login password.
+        pool_size (int): Maximum number of open sessions and concurrent sends.
+        max_messages_per_connection (int): Messages sent before a session is replaced.
+        idle_timeout (float): Seconds an idle session is kept before it is replaced.
+        timeout (float): Socket timeout for SMTP commands.
+        use_tls (bool): Upgrade sessions with STARTTLS.
+    """
+    def __init__(self, server: str, port: int, username: str, password: str, pool_size: int = 4,
+                 max_messages_per_connection: int = 100, idle_timeout: float = 60.0, timeout: float = 30.0,
+                 use_tls: bool = True):
+        if pool_size < 1:
+            raise ValueError("SMTP client needs at least one connection")
         self.server = server
         self.port = port
         self.username = username
         self.password = password
+        self.pool_size = pool_size
+        self.max_messages_per_connection = max_messages_per_connection
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.use_tls = use_tls
+        self._idle = deque()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop = None
+        self._open = 0
+        self._in_flight = 0
+        # Set once a replacement client has taken over; see `retire`
+        self._retired = False
+        self._sent = 0
+        self._failed = 0
+        self._connects = 0
+        self._reconnects = 0
+        self._wait_seconds_total = 0.0
+        self._wait_seconds_max = 0.0
+
+    @staticmethod
+    def settings_options(settings: Settings) -> dict:
+        return {
+            "server": settings.smtp_server,
+            "port": settings.smtp_port,
+            "username": settings.smtp_username,
+            "password": settings.smtp_password,
+            "pool_size": settings.smtp_pool_size,
+            "max_messages_per_connection": settings.smtp_max_messages_per_connection,
+            "idle_timeout": settings.smtp_idle_timeout_seconds,
+            "timeout": settings.smtp_timeout_seconds,
+            "use_tls": settings.smtp_use_tls,
+        }
+
+    def options(self) -> dict:
+        return {
+            "server": self.server,
+            "port": self.port,
+            "username": self.username,
+            "password": self.password,
+            "pool_size": self.pool_size,
+            "max_messages_per_connection": self.max_messages_per_connection,
+            "idle_timeout": self.idle_timeout,
+            "timeout": self.timeout,
+            "use_tls": self.use_tls,
+        }
+
+    def build_message(self, subject: str, html_content: str, recipient: str) -> str:
+        message = MIMEMultipart('alternative')
+        message['Subject'] = subject
+        message['From'] = self.username
+        message['To'] = recipient
+        message.attach(MIMEText(html_content, 'html'))
+        return message.as_string()
 
-    def send_email(self, subject: str, html_content: str, recipient: str):
+    async def send_email(self, subject: str, html_content: str, recipient: str):
         try:
-            message = MIMEMultipart('alternative')
-            message['Subject'] = subject
-            message['From'] = self.username
-            message['To'] = recipient
-            message.attach(MIMEText(html_content, 'html'))
-
-            with smtplib.SMTP(self.server, self.port) as server:
-                server.starttls()  # Use TLS
-                server.login(self.username, self.password)
-                server.sendmail(self.username, recipient, message.as_string())
+            await self.send_message(self.build_message(subject, html_content, recipient), recipient)
             logging.info(f"Email sent to {recipient}")
         except Exception as e:
             logging.error(f"Failed to send email: {str(e)}")
             raise
+
+    async def send_message(self, message: str, recipient: str):
+        """Send an already rendered message on a pooled session."""
+        semaphore = self._get_semaphore()
+        started = time.perf_counter()
+        await semaphore.acquire()
+        waited = time.perf_counter() - started
+        self._wait_seconds_total += waited
+        self._wait_seconds_max = max(self._wait_seconds_max, waited)
+        self._in_flight += 1
+        try:
+            connection = self._checkout()
+            reused = connection is not None
+            while True:
+                if connection is None:
+                    connection = await self._run(self._connect)
+                    self._open += 1
+                    self._connects += 1
+                try:
+                    await self._run(self._deliver, connection, message, recipient)
+                    break
+                except CONNECTION_ERRORS:
+                    self._discard(connection)
+                    connection = None
+                    if not reused:
+                        raise
+                    # The server dropped a session we had kept open; try once more on a new one
+                    reused = False
+                    self._reconnects += 1
+                except Exception:
+                    self._checkin(connection)  # the session is fine; smtplib already sent RSET
+                    raise
+            self._sent += 1
+            connection.sent += 1
+            if connection.sent >= self.max_messages_per_connection:
+                await self._run(self._quit, connection)
+                self._open -= 1
+            else:
+                self._checkin(connection)
+        except Exception:
+            self._failed += 1
+            raise
+        finally:
+            self._in_flight -= 1
+            semaphore.release()
+            if self._retired and self._in_flight == 0:
+                self._shutdown_executor()
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # asyncio primitives are bound to the loop they first wait on, so rebuild per loop.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.pool_size)
+        return self._semaphore
+
+    async def _run(self, func, *args):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="smtp")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def _checkout(self) -> Optional[_PooledConnection]:
+        now = time.monotonic()
+        while self._idle:
+            connection = self._idle.pop()
+            if now - connection.last_used < self.idle_timeout:
+                return connection
+            # Servers close idle sessions on their own, so don't bother with QUIT
+            self._discard(connection)
+        return None
+
+    def _checkin(self, connection: _PooledConnection):
+        if self._retired:
+            self._discard(connection)
+            return
+        connection.last_used = time.monotonic()
+        self._idle.append(connection)
+
+    def _connect(self) -> _PooledConnection:
+        smtp = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                smtp.starttls()
+            smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        return _PooledConnection(smtp)
+
+    def _deliver(self, connection: _PooledConnection, message: str, recipient: str):
+        connection.smtp.sendmail(self.username, recipient, message)
+
+    def _quit(self, connection: _PooledConnection):
+        try:
+            connection.smtp.quit()
+        except Exception:
+            connection.smtp.close()
+
+    def _discard(self, connection: _PooledConnection):
+        connection.smtp.close()
+        self._open -= 1
+
+    async def warm(self, connections: int) -> int:
+        """Open up to `connections` sessions ahead of the first send. Returns how many opened."""
+        connections = min(connections, self.pool_size) - self._open
+        results = await asyncio.gather(*(self._run(self._connect) for _ in range(max(connections, 0))),
+                                       return_exceptions=True)
+        opened = 0
+        for result in results:
+            if isinstance(result, Exception):
+                logging.warning(f"Could not open SMTP session: {result}")
+                continue
+            self._open += 1
+            self._connects += 1
+            self._checkin(result)
+            opened += 1
+        return opened
+
+    def close_idle(self):
+        """Drop idle sessions without waiting on the server."""
+        while self._idle:
+            self._discard(self._idle.pop())
+
+    def retire(self):
+        """
+        Stop using this client once another has replaced it: drop idle sessions now, close
+        the ones still sending as their sends finish, then stop the worker threads.
+        """
+        self._retired = True
+        self.close_idle()
+        if self._in_flight == 0:
+            self._shutdown_executor()
+
+    def _shutdown_executor(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def close(self):
+        """Say QUIT on idle sessions and stop the worker threads."""
+        while self._idle:
+            await self._run(self._quit, self._idle.pop())
+            self._open -= 1
+        self._shutdown_executor()
+
+    def stats(self) -> dict:
+        return {
+            "pool_size": self.pool_size,
+            "open_connections": self._open,
+            "idle_connections": len(self._idle),
+            "in_flight": self._in_flight,
+            "sent": self._sent,
+            "failed": self._failed,
+            "connects": self._connects,
+            "reconnects": self._reconnects,
+            "wait_seconds_total": self._wait_seconds_total,
+            "wait_seconds_max": self._wait_seconds_max,
+        }
+
+# One pool per process, shared by every EmailService instance
+_shared_client: Optional[SMTPClient] = None
+
+def get_smtp_client(settings: Settings) -> SMTPClient:
+    """Return the process-wide SMTP client, replacing it when the SMTP settings change."""
+    global _shared_client
+    options = SMTPClient.settings_options(settings)
+    if _shared_client is None or _shared_client.options() != options:
+        if _shared_client is not None:
+            _shared_client.retire()
+        _shared_client = SMTPClient(**options)
+    return _shared_client
+
+async def close_smtp_client():
+    global _shared_client
+    if _shared_client is not None:
+        await _shared_client.close()
+        _shared_client = None
+
+def smtp_stats() -> dict:
+    return _shared_client.stats() if _shared_client is not None else {}
@@ -1,6 +1,42 @@
+import html
+import string
 import markdown2
 from pathlib import Path
 
+class CompiledTemplate:
+    """
+    A body template converted to styled HTML once, split around its `{placeholders}`.
+
+    `chunks` is the literal HTML around the placeholders: chunks[i] comes before fields[i], and
+    the last chunk follows the last field.
+    """
+    __slots__ = ("chunks", "fields", "mtime_ns")
+
+    def __init__(self, chunks: list, fields: list, mtime_ns: int):
+        self.chunks = chunks
+        self.fields = fields
+        self.mtime_ns = mtime_ns
+
+    def render(self, context: dict) -> str:
+        parts = [self.chunks[0]]
+        for field, chunk in zip(self.fields, self.chunks[1:]):
+            parts.append(html.escape(str(context[field])))
+            parts.append(chunk)
+        return "".join(parts)
+
+EMAIL_STYLES = {
+    'body': 'font-family: Arial, sans-serif; font-size: 16px; color: #333333; background-color: #ffffff; line-height: 1.5;',
+    'h1': 'font-size: 24px; color: #333333; font-weight: bold; margin-top: 20px; margin-bottom: 10px;',
+    'p': 'font-size: 16px; color: #666666; margin: 10px 0; line-height: 1.6;',
+    'a': 'color: #0056b3; text-decoration: none; font-weight: bold;',
+    'footer': 'font-size: 12px; color: #777777; padding: 20px 0;',
+    'ul': 'list-style-type: none; padding: 0;',
+    'li': 'margin-bottom: 10px;'
+}
+
+# Compiled templates by path, shared by every TemplateManager in the process
+_compiled: dict = {}
+
 class TemplateManager:
     def __init__(self):
         # Dynamically determine the root path of the project
@@ -13,34 +49,58 @@ class TemplateManager:
         with open(template_path, 'r', encoding='utf-8') as file:
             return file.read()
 
-    def _apply_email_styles(self, html: str) -> str:
-        """Apply advanced CSS styles inline for email compatibility with excellent typography."""
-        styles = {
-            'body': 'font-family: Arial, sans-serif; font-size: 16px; color: #333333; background-color: #ffffff; line-height: 1.5;',
-            'h1': 'font-size: 24px; color: #333333; font-weight: bold; margin-top: 20px; margin-bottom: 10px;',
-            'p': 'font-size: 16px; color: #666666; margin: 10px 0; line-height: 1.6;',
-            'a': 'color: #0056b3; text-decoration: none; font-weight: bold;',
-            'footer': 'font-size: 12px; color: #777777; padding: 20px 0;',
-            'ul': 'list-style-type: none; padding: 0;',
-            'li': 'margin-bottom: 10px;'
-        }
-        # Wrap entire HTML content in <div> with body style
-        styled_html = f'<div style="{styles["body"]}">{html}</div>'
-        # Apply styles to each HTML element
-        for tag, style in styles.items():
-            if tag != 'body':  # Skip the body style since it's already applied to the <div>
-                styled_html = styled_html.replace(f'<{tag}>', f'<{tag} style="{style}">')
-        return styled_html
+    def _style_tags(self, html: str) -> str:
+        """Apply advanced CSS styles inline for email compatibility, except the body wrapper."""
+        for tag, style in EMAIL_STYLES.items():
+            if tag != 'body':  # Skip the body style since it's applied to the wrapping <div>
+                html = html.replace(f'<{tag}>', f'<{tag} style="{style}">')
+        return html
+
+    def compile_markdown(self, source: str, mtime_ns: int = 0) -> CompiledTemplate:
+        """Convert a markdown template to styled HTML, keeping its placeholders as split points."""
+        fields, pieces = [], []
+        for literal, field, _, _ in string.Formatter().parse(source):
+            pieces.append(literal)
+            if field is not None:
+                # A bare word survives markdown untouched, unlike braces inside some constructs
+                pieces.append(f"TEMPLATEFIELD{len(fields)}X")
+                fields.append(field)
+        styled = self._style_tags(markdown2.markdown("".join(pieces)))
+        chunks = []
+        for index in range(len(fields)):
+            chunk, styled = styled.split(f"TEMPLATEFIELD{index}X", 1)
+            chunks.append(chunk)
+        chunks.append(styled)
+        return CompiledTemplate(chunks, fields, mtime_ns)
+
+    def get_compiled(self, filename: str) -> CompiledTemplate:
+        """Return the compiled template, recompiling it when the file has changed on disk."""
+        path = self.templates_dir / filename
+        mtime_ns = path.stat().st_mtime_ns
+        compiled = _compiled.get(path)
+        if compiled is None or compiled.mtime_ns != mtime_ns:
+            compiled = _compiled[path] = self.compile_markdown(self._read_template(filename), mtime_ns)
+        return compiled
+
+    def precompile(self) -> int:
+        """Compile every template in the templates directory. Returns how many there are."""
+        filenames = sorted(path.name for path in self.templates_dir.glob('*.md'))
+        for filename in filenames:
+            self.get_compiled(filename)
+        return len(filenames)
 
     def render_template(self, template_name: str, **context) -> str:
-        """Render a markdown template with given context, applying advanced email styles."""
-        header = self._read_template('header.md')
-        footer = self._read_template('footer.md')
+        """
+        Render a markdown template with given context, applying advanced email styles.
 
-        # Read main template and format it with provided context
-        main_template = self._read_template(f'{template_name}.md')
-        main_content = main_template.format(**context)
+        Header, footer and body are compiled to styled HTML once, so a render only substitutes
+        the HTML-escaped context values.
+        """
+        return self.render_compiled(self.get_compiled(f'{template_name}.md'), context)
 
-        full_markdown = f"{header}\n{main_content}\n{footer}"
-        html_content = markdown2.markdown(full_markdown)
-        return self._apply_email_styles(html_content)
+    def render_compiled(self, body: CompiledTemplate, context: dict) -> str:
+        """Render a compiled body between the standard header and footer."""
+        header = self.get_compiled('header.md').render(context)
+        main_content = body.render(context)
+        footer = self.get_compiled('footer.md').render(context)
+        return f'<div style="{EMAIL_STYLES["body"]}">{header}\n{main_content}\n{footer}</div>'
@@ -0,0 +1,106 @@
+"""
+Benchmark: database round-trips per successful login.
+
+Compares the previous login flow (UserService.is_account_locked, then a second ORM fetch in
+login_user, mutation in Python, flush and COMMIT) with UserService.authenticate, which runs one
+SELECT and one UPDATE ... RETURNING in autocommit.
+
+Round-trips are counted as SQL statements plus the BEGIN/COMMIT/ROLLBACK asyncpg sends. bcrypt
+runs at 4 rounds so that database time dominates. Needs the database from settings.
+
+Run from the project root:
+    python -m benchmarks.bench_login_round_trips
+"""
+from builtins import len, print, range
+import asyncio
+import time
+from datetime import datetime, timezone
+from uuid import uuid4
+import asyncpg.transaction
+from sqlalchemy import delete, event, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models.user_model import User, UserRole
+from app.services.user_service import LOGIN_OK, UserService
+from app.utils.security import hash_password, password_hasher
+from settings.config import get_settings
+
+LOGINS = 200
+PASSWORD = "MySuperPassword$1234"
+
+class RoundTrips:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._statement)
+        for name in ("start", "commit", "rollback"):
+            self._wrap(name)
+
+    def _statement(self, *args):
+        self.count += 1
+
+    def _wrap(self, name):
+        original = getattr(asyncpg.transaction.Transaction, name)
+
+        async def counted(transaction, *args, **kwargs):
+            self.count += 1
+            return await original(transaction, *args, **kwargs)
+
+        setattr(asyncpg.transaction.Transaction, name, counted)
+
+async def legacy_login(session: AsyncSession, email: str, password: str):
+    """The flow before the pipeline: lock check, second fetch, mutate in Python, commit."""
+    locked = (await session.execute(select(User).filter_by(email=email))).scalars().first()
+    if locked is not None and locked.is_locked:
+        return None
+    user = (await session.execute(select(User).filter_by(email=email))).scalars().first()
+    if user is None or not user.email_verified or user.is_locked:
+        return None
+    if await password_hasher.verify(password, user.hashed_password):
+        user.failed_login_attempts = 0
+        user.last_login_at = datetime.now(timezone.utc)
+        session.add(user)
+        await session.commit()
+        return user
+    return None
+
+async def pipeline_login(session: AsyncSession, email: str, password: str):
+    outcome, user = await UserService.authenticate(session, email, password)
+    return user if outcome == LOGIN_OK else None
+
+async def measure(name, login, session_factory, email, counter):
+    async with session_factory() as session:  # warm up prepared statements
+        await login(session, email, PASSWORD)
+    counter.count = 0
+    started = time.perf_counter()
+    for _ in range(LOGINS):
+        async with session_factory() as session:
+            assert await login(session, email, PASSWORD) is not None
+    elapsed_ms = (time.perf_counter() - started) * 1000 / LOGINS
+    print(f"{name:>10} {counter.count / LOGINS:>12.1f} {elapsed_ms:>10.3f}")
+
+async def main():
+    engine = create_async_engine(get_settings().database_url)
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    password_hasher.rounds = 4
+    email = f"bench_{uuid4().hex}@example.com"
+    async with session_factory() as session:
+        session.add(User(nickname=f"bench_{uuid4().hex[:12]}", email=email, hashed_password=hash_password(PASSWORD, rounds=4),
+                         role=UserRole.AUTHENTICATED, email_verified=True, is_locked=False))
+        await session.commit()
+    counter = RoundTrips(engine)
+    try:
+        print(f"{'flow':>10} {'round-trips':>12} {'ms/login':>10}")
+        await measure("legacy", legacy_login, session_factory, email, counter)
+        await measure("pipeline", pipeline_login, session_factory, email, counter)
+    finally:
+        async with session_factory() as session:
+            await session.execute(delete(User).where(User.email == email))
+            await session.commit()
+        password_hasher.shutdown()
+        await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+"""
+Benchmark: extracting the user directory.
+
+Compares paging GET /users/ style with skip/limit (UserService.list_users, ORM objects,
+serialized page by page) with UserExportService.stream, which reads column tuples from a
+server-side cursor and encodes NDJSON one partition at a time.
+
+Reports wall time and the peak Python heap (tracemalloc) while consuming each output without
+keeping it. Seeds USERS throwaway users and removes them afterwards. Needs the database from
+settings.
+
+Run from the project root:
+    python -m benchmarks.bench_user_export
+"""
+from builtins import len, min, print, range
+import asyncio
+import time
+import tracemalloc
+from uuid import uuid4
+from sqlalchemy import delete, insert
+from app.database import Base, Database
+from app.models.user_model import User, UserRole
+from app.schemas.user_schemas import USER_RESPONSE_FIELDS, RecordFormat
+from app.services.user_export_service import UserExportService
+from app.services.user_service import UserService
+from app.utils.serialization import FastJSONResponse, user_payloads
+from settings.config import get_settings
+
+USERS = 50000
+PAGE_SIZE = 1000
+
+async def offset_pages() -> int:
+    size = 0
+    skip = 0
+    while True:
+        async with Database.get_read_session_factory()() as session:
+            users = await UserService.list_users(session, skip, PAGE_SIZE)
+        if not users:
+            return size
+        size += len(FastJSONResponse({"items": user_payloads(users)}).body)
+        skip += PAGE_SIZE
+
+async def streamed_export() -> int:
+    size = 0
+    async for chunk in UserExportService.stream(USER_RESPONSE_FIELDS, RecordFormat.NDJSON):
+        size += len(chunk)
+    return size
+
+async def main():
+    settings = get_settings()
+    Database.initialize(settings.database_url)
+    engine = Database.get_engines()[0]
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    prefix = f"bench{uuid4().hex[:8]}_"
+    async with Database.get_session_factory()() as session:
+        for start in range(0, USERS, 5000):
+            await session.execute(insert(User), [
+                {"id": uuid4(), "email": f"{prefix}{i}@example.com", "nickname": f"{prefix}{i}", "first_name": "Bench",
+                 "role": UserRole.AUTHENTICATED, "hashed_password": "x", "email_verified": True, "is_locked": False}
+                for i in range(start, min(start + 5000, USERS))
+            ])
+        await session.commit()
+    try:
+        print(f"{'path':>10} {'seconds':>9} {'MB out':>8} {'peak MB':>9}")
+        for name, run in (("offset", offset_pages), ("export", streamed_export)):
+            tracemalloc.start()
+            started = time.perf_counter()
+            size = await run()
+            seconds = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{name:>10} {seconds:>9.2f} {size / 1e6:>8.1f} {peak / 1e6:>9.1f}")
+    finally:
+        async with Database.get_session_factory()() as session:
+            await session.execute(delete(User).where(User.email.like(f"{prefix}%")))
+            await session.commit()
+        await Database.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+"""
+Benchmark: creating users one at a time vs the bulk import.
+
+The per-user path is what a client importing users had to do before: one UserService.create
+per user, which checks the email, hashes, inserts, queues the verification email and commits
+on its own. The import parses NDJSON from a chunked byte stream and, per batch, runs one
+duplicate query, hashes in parallel and writes one multi-row INSERT and one outbox INSERT.
+
+bcrypt runs at 4 rounds so that database work dominates. Needs the database from settings.
+
+Run from the project root:
+    python -m benchmarks.bench_user_import
+"""
+from builtins import len, print, range
+import asyncio
+import time
+from uuid import uuid4
+import orjson
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models.email_outbox_model import OutboxEmail
+from app.models.user_model import User
+from app.services.email_service import EmailService
+from app.services.user_import_service import UserImportService
+from app.services.user_service import UserService
+from app.utils.record_stream import iter_ndjson_batches
+from app.utils.security import password_hasher
+from app.utils.template_manager import TemplateManager
+from settings.config import get_settings
+
+USERS = 1000
+PASSWORD = "MySuperPassword$1234"
+
+def make_records(prefix: str) -> list:
+    return [{"email": f"{prefix}{i}@example.com", "nickname": f"{prefix}{i}", "password": PASSWORD,
+             "first_name": "Bench", "role": "AUTHENTICATED"} for i in range(USERS)]
+
+async def per_user(session_factory, records: list):
+    email_service = EmailService(TemplateManager())
+    for record in records:
+        async with session_factory() as session:
+            assert await UserService.create(session, record, email_service) is not None
+
+async def bulk_import(session_factory, records: list):
+    body = b"".join(orjson.dumps(record) + b"\n" for record in records)
+
+    async def chunks():
+        for start in range(0, len(body), 64 * 1024):
+            yield body[start:start + 64 * 1024]
+
+    async with session_factory() as session:
+        report = await UserImportService.import_users(
+            session, iter_ndjson_batches(chunks(), get_settings().user_import_batch_size))
+    assert report.created == USERS, report.errors[:3]
+
+async def main():
+    engine = create_async_engine(get_settings().database_url)
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    password_hasher.rounds = 4
+    prefix = f"bench{uuid4().hex[:8]}_"
+    try:
+        print(f"{'path':>10} {'users':>7} {'seconds':>9} {'rows/s':>9}")
+        for name, run, tag in (("per-user", per_user, "a"), ("import", bulk_import, "b")):
+            records = make_records(f"{prefix}{tag}")
+            started = time.perf_counter()
+            await run(session_factory, records)
+            seconds = time.perf_counter() - started
+            print(f"{name:>10} {USERS:>7} {seconds:>9.2f} {USERS / seconds:>9.0f}")
+    finally:
+        async with session_factory() as session:
+            await session.execute(delete(OutboxEmail).where(OutboxEmail.recipient.like(f"{prefix}%")))
+            await session.execute(delete(User).where(User.email.like(f"{prefix}%")))
+            await session.commit()
+        password_hasher.shutdown()
+        await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,45 @@
+"""
+Benchmark: building HATEOAS links for a page of users.
+
+Compares the previous path (three request.url_for reversals per user, each validated into a `Link`
+with an HttpUrl) with the link templates compiled once per app and base URL.
+
+Run from the project root:
+    python -m benchmarks.bench_user_links
+"""
+from builtins import max, min, print, range, str
+import timeit
+from uuid import uuid4
+from fastapi import Request
+from app.main import app
+from app.utils.link_generation import UserLinkTemplates, create_link, get_user_link_templates
+
+PAGE_SIZES = (10, 100, 1000)
+
+def make_request() -> Request:
+    return Request({"type": "http", "app": app, "router": app.router, "scheme": "http", "server": ("testserver", 80),
+                    "path": "/users/", "root_path": "", "query_string": b"", "headers": []})
+
+def legacy(user_ids, request):
+    return [
+        [create_link(rel, str(request.url_for(route_name, user_id=str(user_id))), method, action)
+         for rel, route_name, method, action in UserLinkTemplates.ACTIONS]
+        for user_id in user_ids
+    ]
+
+def templated(user_ids, request):
+    templates = get_user_link_templates(request)
+    return [templates.links(user_id) for user_id in user_ids]
+
+def main():
+    request = make_request()
+    print(f"{'page size':>10} {'legacy ms':>12} {'template ms':>12} {'speedup':>8}")
+    for size in PAGE_SIZES:
+        user_ids = [uuid4() for _ in range(size)]
+        number = max(1, 2000 // size)
+        legacy_ms = min(timeit.repeat(lambda: legacy(user_ids, request), number=number, repeat=5)) / number * 1000
+        templated_ms = min(timeit.repeat(lambda: templated(user_ids, request), number=number, repeat=5)) / number * 1000
+        print(f"{size:>10} {legacy_ms:>12.3f} {templated_ms:>12.3f} {legacy_ms / templated_ms:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
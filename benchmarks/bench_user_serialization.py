@@ -0,0 +1,56 @@
+"""
+Benchmark: serializing a page of users for GET /users/.
+
+Compares the previous path (one UserResponse.model_validate per row, then FastAPI re-validating the
+envelope against the response_model, jsonable_encoder and json.dumps) with the
+trusted-row + orjson path in app.utils.serialization.
+
+Run from the project root:
+    python -m benchmarks.bench_user_serialization
+"""
+from builtins import len, max, min, print, range
+import timeit
+from datetime import datetime, timezone
+from uuid import uuid4
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.models.user_model import User, UserRole
+from app.schemas.pagination_schema import PaginationLink
+from app.schemas.user_schemas import UserListResponse, UserResponse
+from app.utils.serialization import user_list_response
+
+PAGE_SIZES = (10, 100, 1000)
+LINKS = [PaginationLink(rel="self", href="http://localhost/users/?limit=10")]
+
+def make_users(count: int):
+    created_at = datetime(2024, 4, 21, 9, 51, 44, tzinfo=timezone.utc)
+    return [
+        User(id=uuid4(), nickname=f"user_{i}", email=f"user_{i}@example.com", first_name="John", last_name="Doe",
+             bio="Experienced software developer specializing in web applications.",
+             profile_picture_url="https://example.com/profiles/john.jpg",
+             linkedin_profile_url="https://linkedin.com/in/johndoe", github_profile_url="https://github.com/johndoe",
+             role=UserRole.AUTHENTICATED, is_professional=False, hashed_password="x", created_at=created_at)
+        for i in range(count)
+    ]
+
+def legacy(users):
+    items = [UserResponse.model_validate(user) for user in users]
+    envelope = UserListResponse(items=items, total=len(users), page=1, size=len(items), links=LINKS)
+    # What FastAPI does with a returned model and response_model=UserListResponse
+    validated = UserListResponse.model_validate(envelope.model_dump(by_alias=True, exclude_unset=False))
+    return JSONResponse(jsonable_encoder(validated)).body
+
+def fast(users):
+    return user_list_response(users, len(users), "exact", 1, LINKS).body
+
+def main():
+    print(f"{'page size':>10} {'legacy ms':>12} {'fast ms':>12} {'speedup':>8}")
+    for size in PAGE_SIZES:
+        users = make_users(size)
+        number = max(1, 2000 // size)
+        legacy_ms = min(timeit.repeat(lambda: legacy(users), number=number, repeat=5)) / number * 1000
+        fast_ms = min(timeit.repeat(lambda: fast(users), number=number, repeat=5)) / number * 1000
+        print(f"{size:>10} {legacy_ms:>12.3f} {fast_ms:>12.3f} {legacy_ms / fast_ms:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
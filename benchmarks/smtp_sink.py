@@ -0,0 +1,99 @@
+"""
+A local SMTP sink for benchmarks and tests.
+
+Accepts EHLO, AUTH PLAIN, MAIL, RCPT, DATA, RSET, NOOP and QUIT, keeps the delivered messages
+in memory and never relays anything. It runs its own event loop on a background thread, so it
+also serves clients that block the caller's loop. `greeting_delay` and `message_delay` simulate
+the latency of a remote server's session setup (TCP, STARTTLS and login) and of each delivery.
+"""
+from builtins import ConnectionError, bytes, float, int, len, list, set, str
+import asyncio
+import threading
+from typing import Optional
+
+class SMTPSink:
+    def __init__(self, host: str = "127.0.0.1", greeting_delay: float = 0.0, message_delay: float = 0.0):
+        self.host = host
+        self.port: Optional[int] = None
+        self.greeting_delay = greeting_delay
+        self.message_delay = message_delay
+        self.messages: list = []
+        self.connections = 0
+        self._loop = asyncio.new_event_loop()
+        self._server = None
+        self._writers = set()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="smtp-sink", daemon=True)
+
+    def start(self) -> "SMTPSink":
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return self
+
+    async def _start(self):
+        self._server = await asyncio.start_server(self._session, self.host, 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    def drop_connections(self):
+        """Close every open session, as a server restart would."""
+        asyncio.run_coroutine_threadsafe(self._drop(), self._loop).result()
+
+    async def _drop(self):
+        for writer in list(self._writers):
+            writer.close()
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    async def _stop(self):
+        await self._drop()
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _session(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self._writers.add(writer)
+        recipients: list = []
+        try:
+            await asyncio.sleep(self.greeting_delay)
+            writer.write(b"220 sink ESMTP\r\n")
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line[:4].upper()
+                if command == b"EHLO":
+                    writer.write(b"250-sink\r\n250-AUTH PLAIN\r\n250 8BITMIME\r\n")
+                elif command == b"HELO":
+                    writer.write(b"250 sink\r\n")
+                elif command == b"AUTH":
+                    writer.write(b"235 2.7.0 Authentication successful\r\n")
+                elif command == b"MAIL":
+                    recipients = []
+                    writer.write(b"250 OK\r\n")
+                elif command == b"RCPT":
+                    recipients.append(line[8:].strip().strip(b"<>").decode())
+                    writer.write(b"250 OK\r\n")
+                elif command == b"DATA":
+                    writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                    await writer.drain()
+                    data = await reader.readuntil(b"\r\n.\r\n")
+                    await asyncio.sleep(self.message_delay)
+                    self.messages.append((recipients, bytes(data[:-5])))
+                    writer.write(b"250 OK: queued\r\n")
+                elif command in (b"RSET", b"NOOP"):
+                    writer.write(b"250 OK\r\n")
+                elif command == b"QUIT":
+                    writer.write(b"221 Bye\r\n")
+                    await writer.drain()
+                    break
+                else:
+                    writer.write(b"502 Command not implemented\r\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
@@ -31,11 +31,14 @@ from faker import Faker
 from app.main import app
 from app.database import Base, Database
 from app.models.user_model import User, UserRole
-from app.dependencies import get_db, get_settings
+from app.dependencies import get_db, get_read_db, get_settings
 from app.utils.security import hash_password
 from app.utils.template_manager import TemplateManager
 from app.services.email_service import EmailService
 from app.services.jwt_service import create_access_token
+from app.services.login_throttle import login_throttle
+from app.services.token_revocation_service import token_revocation
+from app.services.user_cache import user_cache
 
 fake = Faker()
 
@@ -59,6 +62,7 @@ def email_service():
 async def async_client(db_session):
     async with AsyncClient(app=app, base_url="http://testserver") as client:
         app.dependency_overrides[get_db] = lambda: db_session
+        app.dependency_overrides[get_read_db] = lambda: db_session
         try:
             yield client
         finally:
@@ -76,11 +80,17 @@ def initialize_database():
 async def setup_database():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    # Rows are recreated for every test, so snapshots from a previous one must not leak in
+    user_cache.clear()
+    token_revocation.reset()
+    login_throttle.reset()
     yield
     async with engine.begin() as conn:
         # you can comment out this line during development if you are debugging a single test
          await conn.run_sync(Base.metadata.drop_all)
     await engine.dispose()
+    # Pooled connections are bound to this test's event loop
+    await Database.get_engine().dispose()
 
 @pytest.fixture(scope="function")
 async def db_session(setup_database):
@@ -165,10 +175,10 @@ async def users_with_same_role_50_users(db_session):
     users = []
     for _ in range(50):
         user_data = {
-            "nickname": fake.user_name(),
+            "nickname": fake.unique.user_name(),
             "first_name": fake.first_name(),
             "last_name": fake.last_name(),
-            "email": fake.email(),
+            "email": fake.unique.email(),
             "hashed_password": fake.password(),
             "role": UserRole.AUTHENTICATED,
             "email_verified": False,
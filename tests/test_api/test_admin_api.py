@@ -0,0 +1,80 @@
+import pytest
+from settings.config import reload_settings
+
+@pytest.mark.asyncio
+async def test_admin_metrics_as_admin(async_client, admin_token):
+    response = await async_client.get("/admin/metrics", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    hasher_stats = response.json()["password_hasher"]
+    assert "queue_depth" in hasher_stats
+    assert "wait_seconds_avg" in hasher_stats
+    assert "hit_rate" in response.json()["user_cache"]
+    assert "hit_rate" in response.json()["jwt_claims_cache"]
+
+@pytest.mark.asyncio
+async def test_admin_metrics_as_manager(async_client, manager_token):
+    response = await async_client.get("/admin/metrics", headers={"Authorization": f"Bearer {manager_token}"})
+    assert response.status_code == 403
+
+@pytest.mark.asyncio
+async def test_reload_settings_as_admin(async_client, admin_token, monkeypatch):
+    monkeypatch.setenv("MAX_LOGIN_ATTEMPTS", "5")
+    try:
+        response = await async_client.post("/admin/settings/reload", headers={"Authorization": f"Bearer {admin_token}"})
+        assert response.status_code == 200
+        assert response.json()["max_login_attempts"] == 5
+    finally:
+        monkeypatch.undo()
+        reload_settings()
+
+@pytest.mark.asyncio
+async def test_reload_settings_rejects_invalid_values(async_client, admin_token, monkeypatch):
+    monkeypatch.setenv("MAX_LOGIN_ATTEMPTS", "not-a-number")
+    try:
+        response = await async_client.post("/admin/settings/reload", headers={"Authorization": f"Bearer {admin_token}"})
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid settings: max_login_attempts"
+    finally:
+        monkeypatch.undo()
+        reload_settings()
+
+@pytest.mark.asyncio
+async def test_reload_settings_as_manager(async_client, manager_token):
+    response = await async_client.post("/admin/settings/reload", headers={"Authorization": f"Bearer {manager_token}"})
+    assert response.status_code == 403
+
+@pytest.mark.asyncio
+async def test_admin_revokes_compromised_token(async_client, admin_token, manager_token, manager_user):
+    manager_headers = {"Authorization": f"Bearer {manager_token}"}
+    assert (await async_client.get(f"/users/{manager_user.id}", headers=manager_headers)).status_code == 200
+    response = await async_client.post("/admin/tokens/revoke", json={"token": manager_token},
+                                       headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 204
+    assert (await async_client.get(f"/users/{manager_user.id}", headers=manager_headers)).status_code == 401
+
+@pytest.mark.asyncio
+async def test_admin_revoke_rejects_invalid_token(async_client, admin_token):
+    response = await async_client.post("/admin/tokens/revoke", json={"token": "not-a-token"},
+                                       headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_create_broadcast_validation(async_client, admin_token, manager_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    missing_role = {"subject": "Hi", "body": "Hello {name}", "audience": "role"}
+    assert (await async_client.post("/admin/broadcasts", json=missing_role, headers=headers)).status_code == 422
+    bad_placeholder = {"subject": "Hi", "body": "Hello {hashed_password}", "audience": "all"}
+    response = await async_client.post("/admin/broadcasts", json=bad_placeholder, headers=headers)
+    assert response.status_code == 400
+    assert "hashed_password" in response.json()["detail"]
+    valid = {"subject": "Hi", "body": "Hello {name}", "audience": "all"}
+    response = await async_client.post("/admin/broadcasts", json=valid, headers={"Authorization": f"Bearer {manager_token}"})
+    assert response.status_code == 403
+
+@pytest.mark.asyncio
+async def test_unknown_broadcast(async_client, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    broadcast_id = "00000000-0000-0000-0000-000000000000"
+    assert (await async_client.get(f"/admin/broadcasts/{broadcast_id}", headers=headers)).status_code == 404
+    assert (await async_client.post(f"/admin/broadcasts/{broadcast_id}/pause", headers=headers)).status_code == 409
+    assert (await async_client.post(f"/admin/broadcasts/{broadcast_id}/resume", headers=headers)).status_code == 409
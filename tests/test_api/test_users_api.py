@@ -6,6 +6,7 @@ from app.models.user_model import User, UserRole
 from app.utils.nickname_gen import generate_nickname
 from app.utils.security import hash_password
 from app.services.jwt_service import decode_token  # Import your FastAPI app
+from settings.config import get_settings
 
 # Example of a test function using the async_client fixture
 @pytest.mark.asyncio
@@ -190,3 +191,216 @@ async def test_list_users_unauthorized(async_client, user_token):
         headers={"Authorization": f"Bearer {user_token}"}
     )
     assert response.status_code == 403  # Forbidden, as expected for regular user
+
+@pytest.mark.asyncio
+async def test_write_sets_read_consistency_cookie_with_replicas(async_client, admin_user, admin_token, monkeypatch):
+    from app.database import Database
+    monkeypatch.setattr(Database, "has_replicas", classmethod(lambda cls: True))
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.put(f"/users/{admin_user.id}", json={"first_name": "Jane"}, headers=headers)
+    assert response.status_code == 200
+    assert "read_consistency" in response.cookies
+    response = await async_client.get(f"/users/{admin_user.id}", headers=headers)
+    assert "read_consistency" not in response.cookies
+
+@pytest.mark.asyncio
+async def test_list_users_follows_cursor_links(async_client, admin_user, admin_token, users_with_same_role_50_users):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get("/users/?limit=20", headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["page"] == 1
+    seen = [item["id"] for item in body["items"]]
+    while True:
+        next_links = [link["href"] for link in body["links"] if link["rel"] == "next"]
+        if not next_links:
+            break
+        response = await async_client.get(next_links[0], headers=headers)
+        body = response.json()
+        seen.extend(item["id"] for item in body["items"])
+    assert len(seen) == 51
+    assert len(set(seen)) == 51
+
+@pytest.mark.asyncio
+async def test_list_users_offset_mode_still_supported(async_client, admin_token, users_with_same_role_50_users):
+    response = await async_client.get("/users/?skip=10&limit=10", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    assert response.json()["page"] == 2
+    assert len(response.json()["items"]) == 10
+
+@pytest.mark.asyncio
+async def test_list_users_invalid_cursor(async_client, admin_token):
+    response = await async_client.get("/users/?cursor=garbage", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_list_users_reports_total_kind(async_client, admin_token, users_with_same_role_50_users):
+    response = await async_client.get("/users/", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    assert response.json()["total"] == 51
+    assert response.json()["total_kind"] == "exact"
+
+@pytest.mark.asyncio
+async def test_list_users_sparse_fields(async_client, admin_token, users_with_same_role_50_users):
+    response = await async_client.get("/users/?fields=id,email&limit=5", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body["items"]) == 5
+    assert all(set(item) == {"id", "email"} for item in body["items"])
+    assert any(link["rel"] == "next" for link in body["links"])
+
+@pytest.mark.asyncio
+async def test_get_user_sparse_fields(async_client, admin_user, admin_token):
+    response = await async_client.get(f"/users/{admin_user.id}?fields=nickname,role", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    assert response.json() == {"nickname": admin_user.nickname, "role": "ADMIN"}
+
+@pytest.mark.asyncio
+async def test_list_users_rejects_private_fields(async_client, admin_token):
+    response = await async_client.get("/users/?fields=id,hashed_password", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_create_user_as_admin(async_client, admin_token, email_service):
+    from app.dependencies import get_email_service
+    app.dependency_overrides[get_email_service] = lambda: email_service
+    user_data = {
+        "nickname": generate_nickname(),
+        "email": "created_by_admin@example.com",
+        "password": "sS#fdasrongPassword123!",
+        "role": UserRole.AUTHENTICATED.name
+    }
+    response = await async_client.post("/users/", json=user_data, headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 201
+    assert response.json()["email"] == user_data["email"]
+    assert "hashed_password" not in response.json()
+
+@pytest.mark.asyncio
+async def test_get_user_includes_links(async_client, admin_user, admin_token):
+    response = await async_client.get(f"/users/{admin_user.id}", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    links = {link["rel"]: link["href"] for link in response.json()["links"]}
+    assert links == {rel: f"http://testserver/users/{admin_user.id}" for rel in ("self", "update", "delete")}
+
+@pytest.mark.asyncio
+async def test_list_users_link_modes(async_client, admin_token, users_with_same_role_50_users):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    items = (await async_client.get("/users/?limit=3", headers=headers)).json()
+    assert all(len(item["links"]) == 3 for item in items["items"])
+    assert "link_templates" not in items
+
+    templates = (await async_client.get("/users/?limit=3&links=templates", headers=headers)).json()
+    assert all("links" not in item for item in templates["items"])
+    assert templates["link_templates"][0]["href"] == "http://testserver/users/{user_id}"
+
+    none = (await async_client.get("/users/?limit=3&links=none", headers=headers)).json()
+    assert all("links" not in item for item in none["items"])
+    assert "link_templates" not in none
+
+@pytest.mark.asyncio
+async def test_logout_revokes_token(async_client, admin_user, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    assert (await async_client.get(f"/users/{admin_user.id}", headers=headers)).status_code == 200
+    response = await async_client.post("/logout/", headers=headers)
+    assert response.status_code == 204
+    assert (await async_client.get(f"/users/{admin_user.id}", headers=headers)).status_code == 401
+
+@pytest.mark.asyncio
+async def test_refresh_token_flow(async_client, verified_user):
+    form_data = {"username": verified_user.email, "password": "MySuperPassword$1234"}
+    login = await async_client.post("/login/", data=urlencode(form_data), headers={"Content-Type": "application/x-www-form-urlencoded"})
+    assert login.status_code == 200
+    refresh_token = login.json()["refresh_token"]
+
+    refreshed = await async_client.post("/token/refresh", json={"refresh_token": refresh_token})
+    assert refreshed.status_code == 200
+    assert decode_token(refreshed.json()["access_token"])["sub"] == verified_user.email
+    assert refreshed.json()["refresh_token"] != refresh_token
+
+    reused = await async_client.post("/token/refresh", json={"refresh_token": refresh_token})
+    assert reused.status_code == 401
+
+@pytest.mark.asyncio
+async def test_logout_revokes_refresh_token(async_client, verified_user):
+    form_data = {"username": verified_user.email, "password": "MySuperPassword$1234"}
+    tokens = (await async_client.post("/login/", data=urlencode(form_data), headers={"Content-Type": "application/x-www-form-urlencoded"})).json()
+    response = await async_client.post("/logout/", json={"refresh_token": tokens["refresh_token"]},
+                                       headers={"Authorization": f"Bearer {tokens['access_token']}"})
+    assert response.status_code == 204
+    assert (await async_client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})).status_code == 401
+
+@pytest.mark.asyncio
+async def test_login_throttled_with_retry_after(async_client, verified_user):
+    form_data = urlencode({"username": verified_user.email, "password": "wrongpassword"})
+    headers = {"Content-Type": "application/x-www-form-urlencoded", "X-Real-IP": "203.0.113.7"}
+    for _ in range(get_settings().login_throttle_email_burst):
+        assert (await async_client.post("/login/", data=form_data, headers=headers)).status_code in (400, 401)
+    response = await async_client.post("/login/", data=form_data, headers=headers)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+
+@pytest.mark.asyncio
+async def test_import_users_csv(async_client, admin_token, verified_user):
+    headers = {"Authorization": f"Bearer {admin_token}", "Content-Type": "text/csv"}
+    body = (
+        "email,nickname,password,first_name\n"
+        "csv.one@example.com,csv_one,Secure*1234,Ann\n"
+        f"{verified_user.email},csv_two,Secure*1234,\n"
+        "csv.three@example.com,,Secure*1234,Bob\n"
+    )
+    response = await async_client.post("/users/import?send_verification=false", content=body, headers=headers)
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["total_rows"], report["created"], report["failed"]) == (3, 2, 1)
+    assert report["errors"] == [{"row": 2, "email": verified_user.email, "errors": ["Email already exists"]}]
+
+@pytest.mark.asyncio
+async def test_import_users_ndjson_by_format_param(async_client, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}", "Content-Type": "application/octet-stream"}
+    body = b'{"email": "nd.one@example.com", "password": "Secure*1234"}\n{"email": "nd.two@example.com", "password": "Secure*1234"}\n'
+    response = await async_client.post("/users/import?format=ndjson", content=body, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["created"] == 2
+
+@pytest.mark.asyncio
+async def test_import_users_rejects_unknown_content_type(async_client, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}", "Content-Type": "application/xml"}
+    response = await async_client.post("/users/import", content=b"<users/>", headers=headers)
+    assert response.status_code == 415
+
+@pytest.mark.asyncio
+async def test_import_users_access_denied(async_client, user_token):
+    headers = {"Authorization": f"Bearer {user_token}", "Content-Type": "text/csv"}
+    response = await async_client.post("/users/import", content=b"email,password\n", headers=headers)
+    assert response.status_code == 403
+
+@pytest.mark.asyncio
+async def test_export_users_streams_csv(async_client, admin_token, verified_user):
+    headers = {"Authorization": f"Bearer {admin_token}", "Accept-Encoding": "identity"}
+    response = await async_client.get("/users/export?format=csv&fields=email,role", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert "content-encoding" not in response.headers
+    lines = response.text.splitlines()
+    assert lines[0] == "email,role,id,created_at"
+    assert any(line.startswith(f"{verified_user.email},") for line in lines[1:])
+
+@pytest.mark.asyncio
+async def test_export_users_gzip_ndjson(async_client, admin_token, verified_user):
+    headers = {"Authorization": f"Bearer {admin_token}", "Accept-Encoding": "gzip"}
+    response = await async_client.get("/users/export", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    emails = [line for line in response.text.splitlines() if verified_user.email in line]
+    assert len(emails) == 1
+
+@pytest.mark.asyncio
+async def test_export_users_requires_complete_resume_key(async_client, admin_token, verified_user):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get(f"/users/export?after_id={verified_user.id}", headers=headers)
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+async def test_export_users_access_denied(async_client, user_token):
+    response = await async_client.get("/users/export", headers={"Authorization": f"Bearer {user_token}"})
+    assert response.status_code == 403
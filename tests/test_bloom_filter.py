@@ -0,0 +1,21 @@
+from uuid import uuid4
+from app.utils.bloom_filter import BloomFilter
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    items = [uuid4().hex for _ in range(1000)]
+    for item in items:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+    assert len(bloom) == 1000
+
+def test_bloom_filter_false_positive_rate_near_target():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for _ in range(1000):
+        bloom.add(uuid4().hex)
+    false_positives = sum(uuid4().hex in bloom for _ in range(10000))
+    assert false_positives < 300  # 1% target, with generous slack
+
+def test_empty_bloom_filter_contains_nothing():
+    bloom = BloomFilter(capacity=10)
+    assert "anything" not in bloom
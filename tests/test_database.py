@@ -0,0 +1,79 @@
+from builtins import object, range, str
+import itertools
+import time
+from unittest.mock import MagicMock
+import pytest
+from fastapi import Request
+from sqlalchemy import text
+from app.database import Database, InstrumentedAsyncQueuePool, create_pooled_engine
+from app.dependencies import READ_CONSISTENCY_COOKIE, get_settings, wrote_recently
+
+settings = get_settings()
+
+async def test_create_pooled_engine_uses_configured_pool():
+    engine = create_pooled_engine(settings.database_url, pool_size=3, max_overflow=2, pool_timeout=5)
+    try:
+        assert isinstance(engine.pool, InstrumentedAsyncQueuePool)
+        assert engine.pool.size() == 3
+        assert engine.pool._max_overflow == 2
+    finally:
+        await engine.dispose()
+
+async def test_pool_stats_track_checkouts():
+    engine = create_pooled_engine(settings.database_url, pool_size=1, max_overflow=0)
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            stats = engine.pool.stats()
+            assert stats["checked_out"] == 1
+        stats = engine.pool.stats()
+        assert stats["checked_out"] == 0
+        assert stats["checkouts"] == 1
+        assert stats["waiting"] == 0
+        assert stats["timeouts"] == 0
+    finally:
+        await engine.dispose()
+
+async def test_pgbouncer_mode_disables_prepared_statement_cache():
+    engine = create_pooled_engine(settings.database_url, pgbouncer=True)
+    try:
+        async with engine.connect() as conn:
+            assert (await conn.execute(text("SELECT 1"))).scalar() == 1
+            raw = await conn.get_raw_connection()
+            assert raw.driver_connection._stmt_cache.get_max_size() == 0
+    finally:
+        await engine.dispose()
+
+def test_database_pool_stats_after_initialize():
+    assert "checked_out" in Database.pool_stats()
+
+def test_replica_session_factories_round_robin(monkeypatch):
+    replicas = [object(), object()]
+    monkeypatch.setattr(Database, "_replica_session_factories", replicas)
+    monkeypatch.setattr(Database, "_replica_cycle", itertools.cycle(replicas))
+    assert Database.has_replicas()
+    assert [Database.get_replica_session_factory() for _ in range(3)] == [replicas[0], replicas[1], replicas[0]]
+
+def test_replica_session_factory_falls_back_to_primary(monkeypatch):
+    monkeypatch.setattr(Database, "_replica_session_factories", [])
+    monkeypatch.setattr(Database, "_replica_cycle", None)
+    assert not Database.has_replicas()
+    assert Database.get_replica_session_factory() is Database.get_read_session_factory()
+
+def _request_with_cookies(cookies):
+    request = MagicMock(spec=Request)
+    request.cookies = cookies
+    return request
+
+def test_wrote_recently_uses_consistency_cookie():
+    assert not wrote_recently(_request_with_cookies({}))
+    assert not wrote_recently(_request_with_cookies({READ_CONSISTENCY_COOKIE: "garbage"}))
+    assert wrote_recently(_request_with_cookies({READ_CONSISTENCY_COOKIE: str(time.time())}))
+    stale = time.time() - settings.replica_read_your_writes_seconds - 1
+    assert not wrote_recently(_request_with_cookies({READ_CONSISTENCY_COOKIE: str(stale)}))
+
+async def test_read_session_factory_is_read_only():
+    async with Database.get_read_session_factory()() as session:
+        assert (await session.execute(text("SHOW transaction_read_only"))).scalar() == "on"
+    async with Database.get_session_factory()() as session:
+        assert (await session.execute(text("SHOW transaction_read_only"))).scalar() == "off"
@@ -0,0 +1,140 @@
+import asyncio
+from uuid import uuid4
+import pytest
+from app.services.invalidation_bus import InvalidationBus
+from app.services.user_cache import user_cache
+from app.services.user_service import UserService
+from tests.conftest import AsyncTestingSessionLocal, engine
+
+pytestmark = pytest.mark.asyncio
+
+async def wait_for(predicate, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        if asyncio.get_running_loop().time() > deadline:
+            return False
+        await asyncio.sleep(0.01)
+    return True
+
+@pytest.fixture
+async def workers():
+    """Two buses on one channel, standing in for two uvicorn workers."""
+    channel = f"test_invalidation_{uuid4().hex}"
+    received = []
+    publisher, subscriber = InvalidationBus(channel), InvalidationBus(channel)
+    await publisher.start(engine, lambda *message: None)
+    await subscriber.start(engine, lambda *message: received.append(message))
+    try:
+        yield publisher, subscriber, received
+    finally:
+        await publisher.stop()
+        await subscriber.stop()
+
+async def test_notification_delivered_on_commit(workers):
+    publisher, subscriber, received = workers
+    user_id = uuid4()
+    async with AsyncTestingSessionLocal() as session:
+        await publisher.publish(session, user_id, "someone@example.com", count_changed=True)
+        await asyncio.sleep(0.05)
+        assert received == []  # NOTIFY waits for COMMIT
+        await session.commit()
+    assert await wait_for(lambda: received)
+    assert received == [(user_id, "someone@example.com", True)]
+    assert subscriber.stats()["received"] == 1
+
+async def test_notification_dropped_on_rollback(workers):
+    publisher, subscriber, received = workers
+    async with AsyncTestingSessionLocal() as session:
+        await publisher.publish(session, uuid4())
+        await session.rollback()
+    assert not await wait_for(lambda: received, timeout=0.2)
+
+async def test_own_notifications_are_skipped():
+    own = []
+    bus = InvalidationBus(f"test_invalidation_{uuid4().hex}")
+    await bus.start(engine, lambda *message: own.append(message))
+    try:
+        async with AsyncTestingSessionLocal() as session:
+            await bus.publish(session, uuid4())
+            await session.commit()
+        assert not await wait_for(lambda: own, timeout=0.2)
+    finally:
+        await bus.stop()
+    assert not bus.listening
+
+async def test_remote_invalidation_evicts_cached_user(db_session, verified_user):
+    await UserService.get_by_id(db_session, verified_user.id, cached=True)
+    channel = f"test_invalidation_{uuid4().hex}"
+    publisher, subscriber = InvalidationBus(channel), InvalidationBus(channel)
+    await publisher.start(engine, UserService.apply_invalidation)
+    await subscriber.start(engine, UserService.apply_invalidation)
+    try:
+        async with AsyncTestingSessionLocal() as session:
+            await publisher.publish(session, verified_user.id)
+            await session.commit()
+        assert await wait_for(lambda: user_cache.get("id", verified_user.id) is None)
+    finally:
+        await publisher.stop()
+        await subscriber.stop()
+
+async def test_lost_connection_resets_and_reconnects():
+    resets = []
+    bus = InvalidationBus(f"test_invalidation_{uuid4().hex}")
+    await bus.start(engine, lambda *message: None, on_reset=lambda: resets.append(True))
+    try:
+        bus._on_termination(bus._raw)
+        assert resets and not bus.listening
+        assert await wait_for(lambda: bus.listening)
+        assert bus.stats()["reconnects"] == 1
+    finally:
+        await bus.stop()
+
+async def test_writes_notify_while_the_listener_reconnects(workers):
+    publisher, subscriber, received = workers
+    publisher._raw = None  # as if publisher's listener had dropped
+    assert publisher.notify_expression(uuid4()) is not None
+    async with AsyncTestingSessionLocal() as session:
+        await publisher.publish(session, uuid4())
+        await session.commit()
+    assert await wait_for(lambda: received)
+    await publisher.stop()
+    assert publisher.notify_expression(uuid4()) is None
+
+async def test_pgbouncer_mode_needs_a_direct_listen_url():
+    bus = InvalidationBus(f"test_invalidation_{uuid4().hex}")
+    with pytest.raises(ValueError):
+        await bus.start(engine, lambda *message: None, pgbouncer=True)
+    assert not bus.listening and bus.notify_expression() is None
+    await bus.start(engine, lambda *message: None, listen_url=engine.url.render_as_string(hide_password=False),
+                    pgbouncer=True)
+    try:
+        assert bus.listening
+    finally:
+        await bus.stop()
+
+async def test_broadcast_reaches_other_workers(workers):
+    publisher, subscriber, _ = workers
+    received = []
+    subscriber.add_handler("test", received.append)
+    assert await publisher.broadcast("test", {"key": "value"})
+    assert await wait_for(lambda: received)
+    assert received == [{"key": "value"}]
+
+async def test_listener_does_not_hold_a_pooled_connection():
+    bus = InvalidationBus(f"test_invalidation_{uuid4().hex}")
+    checked_out = engine.pool.checkedout()
+    await bus.start(engine, lambda *message: None)
+    try:
+        assert bus.listening
+        assert engine.pool.checkedout() == checked_out
+    finally:
+        await bus.stop()
+    assert not bus.listening
+
+async def test_concurrent_broadcasts_share_the_connection(workers):
+    publisher, subscriber, _ = workers
+    seen = []
+    subscriber.add_handler("test", seen.append)
+    results = await asyncio.gather(*(publisher.broadcast("test", {"n": n}) for n in range(20)))
+    assert all(results)
+    assert await wait_for(lambda: len(seen) == 20)
@@ -1,4 +1,5 @@
-from builtins import len, max, sorted, str
+from builtins import ValueError, len, max, sorted, str
+from datetime import datetime, timezone
 from unittest.mock import MagicMock
 from urllib.parse import parse_qs, urlparse, parse_qsl, urlunparse, urlencode
 from uuid import uuid4
@@ -6,7 +7,10 @@ from uuid import uuid4
 import pytest
 from fastapi import Request
 
-from app.utils.link_generation import create_link, create_pagination_link, create_user_links, generate_pagination_links
+from app.main import app
+from app.schemas.link_schema import Link
+from app.utils.link_generation import create_link, create_pagination_link, create_user_links, generate_cursor_pagination_links, generate_pagination_links, get_user_link_templates
+from app.utils.pagination import Cursor, decode_cursor, encode_cursor
 
 from urllib.parse import urlparse, parse_qs, urlunparse, urlencode
 
@@ -22,6 +26,11 @@ def normalize_url(url):
     return normalized_url.rstrip('/')
 
 
+@pytest.fixture
+def app_request():
+    return Request({"type": "http", "app": app, "scheme": "http", "server": ("testserver", 80),
+                    "path": "/users/", "root_path": "", "query_string": b"", "headers": []})
+
 @pytest.fixture
 def mock_request():
     request = MagicMock(spec=Request)
@@ -33,13 +42,25 @@ def test_create_link():
     link = create_link("self", "http://example.com", "GET", "view")
     assert normalize_url(str(link.href)) == "http://example.com"
 
-def test_create_user_links(mock_request):
+def test_create_user_links(app_request):
     user_id = uuid4()
-    links = create_user_links(user_id, mock_request)
+    links = create_user_links(user_id, app_request)
     assert len(links) == 3
-    assert normalize_url(str(links[0].href)) == f"http://testserver/get_user/{user_id}"
-    assert normalize_url(str(links[1].href)) == f"http://testserver/update_user/{user_id}"
-    assert normalize_url(str(links[2].href)) == f"http://testserver/delete_user/{user_id}"
+    assert [link["href"] for link in links] == [f"http://testserver/users/{user_id}"] * 3
+    assert [(link["rel"], link["action"]) for link in links] == [("self", "view"), ("update", "update"), ("delete", "delete")]
+    assert all(Link(**link).href for link in links)
+
+def test_user_link_templates_compiled_once(app_request):
+    assert get_user_link_templates(app_request) is get_user_link_templates(app_request)
+    templates = get_user_link_templates(app_request).templates()
+    assert templates[0] == {"rel": "self", "href": "http://testserver/users/{user_id}", "method": "GET", "templated": True}
+    assert [t["method"] for t in templates] == ["GET", "PUT", "DELETE"]
+
+def test_user_link_templates_follow_base_url():
+    request = Request({"type": "http", "app": app, "scheme": "https", "server": ("api.example.com", 443),
+                       "path": "/users/", "root_path": "/v1", "query_string": b"", "headers": []})
+    user_id = uuid4()
+    assert create_user_links(user_id, request)[0]["href"] == f"https://api.example.com/v1/users/{user_id}"
 
 def test_generate_pagination_links(mock_request):
     skip = 10
@@ -49,3 +70,25 @@ def test_generate_pagination_links(mock_request):
     assert len(links) >= 4
     expected_self_url = "http://testserver/users?limit=5&skip=10"
     assert normalize_url(str(links[0].href)) == normalize_url(expected_self_url), "Self link should match expected URL"
+
+def test_generate_cursor_pagination_links(mock_request):
+    links = generate_cursor_pagination_links(mock_request, 5, cursor="abc", next_cursor="def", prev_cursor="ghi")
+    hrefs = {link.rel: normalize_url(str(link.href)) for link in links}
+    assert hrefs["self"] == normalize_url("http://testserver/users?cursor=abc&limit=5")
+    assert hrefs["first"] == normalize_url("http://testserver/users?limit=5")
+    assert hrefs["next"] == normalize_url("http://testserver/users?cursor=def&limit=5")
+    assert hrefs["prev"] == normalize_url("http://testserver/users?cursor=ghi&limit=5")
+    assert decode_cursor(parse_qs(urlparse(hrefs["last"]).query)["cursor"][0]) == Cursor(key=None, backward=True)
+
+def test_generate_cursor_pagination_links_first_page(mock_request):
+    links = generate_cursor_pagination_links(mock_request, 5, next_cursor="def")
+    assert {link.rel for link in links} == {"self", "first", "last", "next"}
+
+def test_cursor_round_trip():
+    key = (datetime(2024, 4, 21, 9, 51, 44, 977108, tzinfo=timezone.utc), uuid4())
+    assert decode_cursor(encode_cursor(key)) == Cursor(key=key, backward=False)
+    assert decode_cursor(encode_cursor(key, backward=True)) == Cursor(key=key, backward=True)
+
+def test_decode_invalid_cursor():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
@@ -0,0 +1,83 @@
+from ipaddress import ip_network
+import pytest
+from starlette.requests import Request
+from app.services.login_throttle import LoginThrottle, client_ip
+from app.utils.rate_limiter import TokenBucketLimiter
+from settings.config import get_settings
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_token_bucket_allows_burst_then_limits():
+    clock = FakeClock()
+    limiter = TokenBucketLimiter(capacity=3, refill_per_second=1.0, clock=clock)
+    assert [limiter.acquire("key") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.acquire("key") == pytest.approx(1.0)
+    clock.now = 1.0
+    assert limiter.acquire("key") == 0.0
+    assert limiter.acquire("other") == 0.0
+
+def test_token_bucket_block():
+    clock = FakeClock()
+    limiter = TokenBucketLimiter(capacity=3, refill_per_second=1.0, clock=clock)
+    limiter.block("key", 10)
+    assert limiter.acquire("key") == pytest.approx(10.0)
+    clock.now = 10.0
+    assert limiter.acquire("key") == 0.0
+
+def test_token_bucket_forgets_least_recently_used_keys():
+    limiter = TokenBucketLimiter(capacity=1, refill_per_second=0.001, max_keys=2)
+    limiter.acquire("a")
+    limiter.acquire("b")
+    limiter.acquire("c")
+    assert len(limiter) == 2
+    assert limiter.acquire("a") == 0.0  # forgotten, so it starts with a full bucket again
+
+def make_request(headers=(), client=("10.0.0.9", 1234)) -> Request:
+    return Request({"type": "http", "headers": [(k.encode(), v.encode()) for k, v in headers], "client": client})
+
+TRUSTED = [ip_network("10.0.0.0/8")]
+
+def test_client_ip_prefers_proxy_headers_from_trusted_proxies():
+    assert client_ip(make_request([("x-real-ip", "203.0.113.7")]), TRUSTED) == "203.0.113.7"
+    assert client_ip(make_request([("x-forwarded-for", "198.51.100.1, 10.0.0.2")]), TRUSTED) == "198.51.100.1"
+    # A spoofed leftmost entry is skipped: the nearest untrusted address is the client
+    assert client_ip(make_request([("x-forwarded-for", "1.2.3.4, 198.51.100.1, 10.0.0.2")]), TRUSTED) == "198.51.100.1"
+    assert client_ip(make_request(), TRUSTED) == "10.0.0.9"
+
+def test_client_ip_ignores_proxy_headers_from_other_peers():
+    headers = [("x-real-ip", "203.0.113.7"), ("x-forwarded-for", "198.51.100.1")]
+    assert client_ip(make_request(headers), []) == "10.0.0.9"
+    assert client_ip(make_request(headers, client=("192.0.2.5", 1234)), TRUSTED) == "192.0.2.5"
+    assert client_ip(make_request(headers)) == "10.0.0.9"  # default: only loopback is trusted
+
+def test_login_throttle_per_email_and_ip():
+    settings = get_settings().model_copy(update={"login_throttle_email_burst": 2, "login_throttle_ip_burst": 3})
+    throttle = LoginThrottle(settings)
+    assert throttle.check("Victim@example.com", "1.1.1.1") == 0.0
+    assert throttle.check("victim@example.com", "2.2.2.2") == 0.0
+    assert throttle.check("victim@example.com ", "3.3.3.3") > 0  # same email, normalized
+    assert throttle.check("a@example.com", "4.4.4.4") == 0.0
+    assert throttle.check("b@example.com", "4.4.4.4") == 0.0
+    assert throttle.check("c@example.com", "4.4.4.4") == 0.0
+    assert throttle.check("d@example.com", "4.4.4.4") > 0  # same IP
+    assert throttle.stats()["rejected"] == 2
+
+def test_login_throttle_shares_each_exhaustion_once(monkeypatch):
+    settings = get_settings().model_copy(update={"login_throttle_email_burst": 2, "login_throttle_ip_burst": 100})
+    throttle = LoginThrottle(settings)
+    shared = []
+    monkeypatch.setattr(throttle, "_share", lambda kind, key, seconds: shared.append((kind, key)))
+    for _ in range(20):
+        throttle.check("victim@example.com", "1.1.1.1")
+    assert shared == [("email", "victim@example.com")]
+
+def test_login_throttle_applies_remote_blocks():
+    throttle = LoginThrottle(get_settings())
+    throttle.apply_remote({"kind": "email", "key": "victim@example.com", "seconds": 30})
+    assert throttle.check("victim@example.com", "1.1.1.1") == pytest.approx(30, abs=1)
+    throttle.apply_remote({"kind": "bogus", "key": "x", "seconds": 1})  # ignored
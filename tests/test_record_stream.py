@@ -0,0 +1,39 @@
+import pytest
+from app.utils.record_stream import iter_csv_batches, iter_lines, iter_ndjson_batches
+
+pytestmark = pytest.mark.asyncio
+
+async def chunked(data: bytes, size: int = 7):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+async def collect(batches):
+    return [batch async for batch in batches]
+
+async def test_iter_lines_splits_across_chunks_and_decodes_multibyte():
+    data = "﻿name\r\nZoë\nlast".encode("utf-8")
+    lines = [line async for line in iter_lines(chunked(data, 1))]
+    assert lines == ["name", "Zoë", "last"]
+
+async def test_ndjson_batches_report_bad_lines_in_place():
+    data = b'{"email": "a@example.com"}\n\nnot json\n[1, 2]\n{"email": "b@example.com"}\n'
+    batches = await collect(iter_ndjson_batches(chunked(data), batch_size=2))
+    assert [len(batch) for batch in batches] == [2, 2]
+    records = [record for batch in batches for record in batch]
+    assert [number for number, _ in records] == [1, 2, 3, 4]
+    assert records[0][1] == {"email": "a@example.com"}
+    assert isinstance(records[1][1], Exception) and isinstance(records[2][1], Exception)
+    assert records[3][1] == {"email": "b@example.com"}
+
+async def test_csv_batches_handle_quoted_newlines_and_empty_fields():
+    data = (
+        b'email,nickname,bio\n'
+        b'a@example.com,alpha,"line one\nline two, with comma"\n'
+        b'b@example.com,,\n'
+        b'c@example.com,gamma\n'
+    )
+    batches = await collect(iter_csv_batches(chunked(data, 5), batch_size=10))
+    [records] = batches
+    assert records[0] == (1, {"email": "a@example.com", "nickname": "alpha", "bio": "line one\nline two, with comma"})
+    assert records[1] == (2, {"email": "b@example.com"})
+    assert records[2][0] == 3 and isinstance(records[2][1], ValueError)
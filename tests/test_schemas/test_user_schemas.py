@@ -2,7 +2,7 @@ import uuid
 import pytest
 from pydantic import ValidationError
 from datetime import datetime
-from app.schemas.user_schemas import UserBase, UserCreate, UserUpdate, UserResponse, UserListResponse, LoginRequest
+from app.schemas.user_schemas import UserBase, UserCreate, UserUpdate, UserResponse, UserListResponse, LoginRequest, parse_user_fields
 
 # Fixtures for common test data
 @pytest.fixture
@@ -108,3 +108,13 @@ def test_user_base_url_invalid(url, user_base_data):
     user_base_data["profile_picture_url"] = url
     with pytest.raises(ValidationError):
         UserBase(**user_base_data)
+
+# Tests for sparse fieldsets
+def test_parse_user_fields():
+    assert parse_user_fields(None) is None
+    assert parse_user_fields("id, email,id,role") == ("id", "email", "role")
+
+@pytest.mark.parametrize("fields", ["", "hashed_password", "id,verification_token"])
+def test_parse_user_fields_invalid(fields):
+    with pytest.raises(ValueError):
+        parse_user_fields(fields)
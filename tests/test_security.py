@@ -1,7 +1,9 @@
 # test_security.py
-from builtins import RuntimeError, ValueError, isinstance, str
+from builtins import RuntimeError, ValueError, isinstance, range, str
+import asyncio
+import time
 import pytest
-from app.utils.security import hash_password, verify_password
+from app.utils.security import PasswordHasher, calibrate_bcrypt_rounds, hash_password, verify_password
 
 def test_hash_password():
     """Test that hashing password returns a bcrypt hashed string."""
@@ -65,3 +67,112 @@ def test_hash_password_internal_error(monkeypatch):
     with pytest.raises(ValueError):
         hash_password("test")
 
+async def test_password_hasher_round_trip():
+    """Test hashing and verifying through the worker pool."""
+    hasher = PasswordHasher(max_workers=2)
+    try:
+        hashed = await hasher.hash("secure_password")
+        assert hashed.startswith('$2b$')
+        assert await hasher.verify("secure_password", hashed) is True
+        assert await hasher.verify("wrong_password", hashed) is False
+        assert hasher.stats()["completed"] == 3
+    finally:
+        hasher.shutdown()
+
+async def test_password_hasher_invalid_hash():
+    """Test that pool verification surfaces the same ValueError as verify_password."""
+    hasher = PasswordHasher(max_workers=1)
+    try:
+        with pytest.raises(ValueError):
+            await hasher.verify("secure_password", "invalid_hash_format")
+    finally:
+        hasher.shutdown()
+
+async def test_password_hasher_caps_concurrency(monkeypatch):
+    """Test that callers beyond max_workers queue up and are counted in the metrics."""
+    hasher = PasswordHasher(max_workers=1)
+    observed = []
+
+    def slow_hash(password, rounds=12):
+        time.sleep(0.05)
+        observed.append(hasher.stats()["queue_depth"])
+        return password
+
+    monkeypatch.setattr("app.utils.security.hash_password", slow_hash)
+    try:
+        results = await asyncio.gather(*(hasher.hash(str(i)) for i in range(3)))
+        assert results == ["0", "1", "2"]
+        assert observed[0] == 2
+        stats = hasher.stats()
+        assert stats["queue_depth"] == 0
+        assert stats["in_flight"] == 0
+        assert stats["wait_seconds_max"] > 0
+    finally:
+        hasher.shutdown()
+
+async def test_bulk_hashes_leave_a_worker_free(monkeypatch):
+    """Test that bulk hashes never occupy every worker, so an interactive hash starts right away."""
+    hasher = PasswordHasher(max_workers=2)
+    observed = []
+
+    def slow_hash(password, rounds=12):
+        observed.append(hasher.stats()["in_flight"])
+        time.sleep(0.05)
+        return password
+
+    monkeypatch.setattr("app.utils.security.hash_password", slow_hash)
+    try:
+        bulk = asyncio.gather(*(hasher.hash(str(i), bulk=True) for i in range(4)))
+        await asyncio.sleep(0.01)
+        assert await hasher.hash("login") == "login"
+        assert hasher.stats()["wait_seconds_max"] < 0.05
+        assert await bulk == ["0", "1", "2", "3"]
+        assert max(observed) == 2
+    finally:
+        hasher.shutdown()
+
+def test_password_hasher_rejects_unknown_executor():
+    with pytest.raises(ValueError):
+        PasswordHasher(executor="fiber")
+
+def test_needs_rehash_on_cost_change():
+    """Test that hashes made with any other bcrypt cost are flagged for rehashing."""
+    hasher = PasswordHasher(rounds=12)
+    assert hasher.needs_rehash(hash_password("secure_password", 12)) is False
+    assert hasher.needs_rehash(hash_password("secure_password", 13)) is True
+    assert hasher.needs_rehash(hash_password("secure_password", 10)) is True
+    assert hasher.needs_rehash("invalid_hash_format") is True
+
+def test_calibrate_bcrypt_rounds_bounds():
+    """Test that calibration stays within the configured cost range."""
+    assert calibrate_bcrypt_rounds(0, min_rounds=4, max_rounds=6) == 4
+    assert calibrate_bcrypt_rounds(60_000, min_rounds=4, max_rounds=6) == 6
+
+async def test_password_hasher_calibrate():
+    hasher = PasswordHasher(max_workers=1, rounds=12)
+    try:
+        assert await hasher.calibrate(60_000, min_rounds=4, max_rounds=5) == 5
+        assert hasher.rounds == hasher.cost == 5
+        assert hasher.needs_rehash(hash_password("secure_password", 12)) is True
+        assert hasher.needs_rehash(hash_password("secure_password", 5)) is False
+    finally:
+        hasher.shutdown()
+
+async def test_password_hasher_argon2id():
+    """Test the optional argon2id backend and migration away from bcrypt."""
+    pytest.importorskip("argon2")
+    hasher = PasswordHasher(max_workers=1, scheme="argon2id", argon2_time_cost=1, argon2_memory_cost=1024)
+    try:
+        hashed = await hasher.hash("secure_password")
+        assert hashed.startswith("$argon2id$")
+        assert await hasher.verify("secure_password", hashed) is True
+        assert await hasher.verify("wrong_password", hashed) is False
+        assert hasher.needs_rehash(hashed) is False
+        assert hasher.needs_rehash(hash_password("secure_password", 4)) is True
+        hasher.argon2_time_cost = 2
+        assert hasher.needs_rehash(hashed) is True
+        stronger = await hasher.hash("secure_password")
+        hasher.argon2_time_cost = 1
+        assert hasher.needs_rehash(stronger) is True
+    finally:
+        hasher.shutdown()
@@ -0,0 +1,51 @@
+import json
+from datetime import datetime, timezone
+from uuid import uuid4
+from fastapi.encoders import jsonable_encoder
+from app.models.user_model import User, UserRole
+from app.schemas.pagination_schema import PaginationLink
+from app.schemas.user_schemas import UserListResponse, UserResponse
+from app.utils.serialization import user_list_response, user_payloads, user_response
+
+def make_user(index: int) -> User:
+    return User(
+        id=uuid4(),
+        nickname=f"user_{index}",
+        email=f"user_{index}@example.com",
+        first_name="John",
+        last_name="Doe",
+        bio="Experienced developer",
+        github_profile_url="https://github.com/johndoe",
+        role=UserRole.AUTHENTICATED,
+        is_professional=False,
+        hashed_password="not-serialized",
+        created_at=datetime(2024, 4, 21, 9, 51, 44, tzinfo=timezone.utc),
+    )
+
+def legacy_payload(users, links):
+    """The previous path: per-row model_validate, then response_model validation and jsonable_encoder."""
+    envelope = UserListResponse(items=[UserResponse.model_validate(u) for u in users], total=len(users),
+                                page=1, size=len(users), links=links)
+    return jsonable_encoder(UserListResponse.model_validate(envelope.model_dump()), exclude={"link_templates": True, "items": {"__all__": {"links"}}})
+
+def test_user_payloads_match_user_response():
+    users = [make_user(i) for i in range(3)]
+    payloads = user_payloads(users)
+    assert [jsonable_encoder(p) for p in payloads] == [jsonable_encoder(UserResponse.model_validate(u), exclude={"links"}) for u in users]
+    assert "hashed_password" not in payloads[0]
+
+def test_user_payloads_projection():
+    assert user_payloads([make_user(0)], ("nickname",)) == [{"nickname": "user_0"}]
+    assert user_payloads([make_user(0)], ("nickname", "email")) == [{"nickname": "user_0", "email": "user_0@example.com"}]
+
+def test_user_list_response_matches_legacy_payload():
+    users = [make_user(i) for i in range(5)]
+    links = [PaginationLink(rel="self", href="http://testserver/users/?limit=5")]
+    response = user_list_response(users, len(users), "exact", 1, links)
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == legacy_payload(users, links)
+
+def test_user_response_status_code():
+    response = user_response(make_user(0), status_code=201)
+    assert response.status_code == 201
+    assert json.loads(response.body)["nickname"] == "user_0"
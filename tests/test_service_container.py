@@ -0,0 +1,32 @@
+import pytest
+from app.database import Database
+from app.dependencies import get_email_service
+from app.main import app
+from app.services.service_container import ServiceContainer, services
+from settings.config import get_settings, reload_settings
+
+def test_email_service_is_built_once_and_rebuilt_on_reload():
+    service = get_email_service()
+    assert get_email_service() is service
+    assert service.template_manager is services.template_manager
+    reload_settings()
+    assert get_email_service() is not service
+
+async def test_warm_up_opens_connections_and_compiles_templates():
+    settings = get_settings().model_copy(update={"db_warm_connections": 3})
+    await Database.get_engine().dispose()
+    report = await ServiceContainer().warm_up(settings)
+    assert report["database_connections"] == 3
+    assert report["templates"] >= 4
+    assert Database.get_engine().pool.checkedin() == 3
+
+async def test_lifespan_starts_and_drains_services():
+    settings = get_settings()
+    try:
+        async with app.router.lifespan_context(app):
+            assert services.stats()["warm_up"]["database_connections"] == min(settings.db_warm_connections, settings.db_pool_size)
+            assert Database.get_engine().pool.checkedin() >= 1
+        with pytest.raises(ValueError):
+            Database.get_engine()  # disposed on shutdown
+    finally:
+        Database.initialize(settings.database_url)
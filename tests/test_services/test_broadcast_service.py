@@ -0,0 +1,116 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import pytest
+from benchmarks.smtp_sink import SMTPSink
+from app.models.broadcast_model import BroadcastAudience, BroadcastStatus, EmailBroadcast
+from app.models.user_model import UserRole
+from app.services import broadcast_service
+from app.services.broadcast_service import BroadcastEngine, Pacer
+from app.utils.smtp_connection import SMTPClient
+from settings.config import get_settings
+
+pytestmark = pytest.mark.asyncio
+
+@pytest.fixture
+def smtp_sink():
+    sink = SMTPSink().start()
+    yield sink
+    sink.stop()
+
+@pytest.fixture
+async def engine(smtp_sink, monkeypatch):
+    settings = get_settings().model_copy(update={"broadcast_batch_size": 7, "broadcast_cursor_window": 20})
+    monkeypatch.setattr(broadcast_service, "get_settings", lambda: settings)
+    engine = BroadcastEngine()
+    client = SMTPClient(smtp_sink.host, smtp_sink.port, "sender@example.com", "secret", pool_size=2, use_tls=False)
+    monkeypatch.setattr(engine, "_get_smtp_client", lambda: client)
+    yield engine
+    await client.close()
+
+async def reload(session, broadcast_id) -> EmailBroadcast:
+    return await session.get(EmailBroadcast, broadcast_id, populate_existing=True)
+
+async def test_broadcast_reaches_whole_audience_in_batches(db_session, engine, smtp_sink, users_with_same_role_50_users, verified_user):
+    broadcast = await engine.create(db_session, "News", "Hello {name} ({email})", BroadcastAudience.UNVERIFIED, rate_per_minute=60000)
+    await engine.task(broadcast.id)
+    broadcast = await reload(db_session, broadcast.id)
+    assert (broadcast.status, broadcast.total, broadcast.sent, broadcast.failed) == ("completed", 50, 50, 0)
+    recipients = sorted(recipient for [recipient], _ in smtp_sink.messages)
+    assert recipients == sorted(user.email for user in users_with_same_role_50_users)
+    assert verified_user.email not in recipients
+    assert engine.stats()["batches"] == 8  # 50 recipients in batches of 7
+
+async def test_broadcast_to_role(db_session, engine, smtp_sink, admin_user, manager_user, users_with_same_role_50_users):
+    broadcast = await engine.create(db_session, "Managers", "Hi {nickname}", BroadcastAudience.ROLE, UserRole.MANAGER, 60000)
+    await engine.task(broadcast.id)
+    assert [recipients for recipients, _ in smtp_sink.messages] == [[manager_user.email]]
+    assert f"Hi {manager_user.nickname}".encode() in smtp_sink.messages[0][1]
+
+async def test_pause_and_resume_continue_where_it_stopped(db_session, engine, smtp_sink, users_with_same_role_50_users):
+    # 600/min spaces sends 0.1 s apart, so the first batch is still sending when we pause
+    broadcast = await engine.create(db_session, "News", "Hello {name}", BroadcastAudience.ALL, rate_per_minute=600)
+    await asyncio.sleep(0.2)
+    assert (await engine.pause(db_session, broadcast.id)).status == "paused"
+    await engine.task(broadcast.id)
+    paused = await reload(db_session, broadcast.id)
+    assert paused.sent == 7 and len(smtp_sink.messages) == 7
+    assert await engine.pause(db_session, broadcast.id) is None
+
+    await db_session.execute(EmailBroadcast.__table__.update().values(rate_per_minute=60000))
+    await db_session.commit()
+    assert (await engine.resume(db_session, broadcast.id)).status == "running"
+    await engine.task(broadcast.id)
+    finished = await reload(db_session, broadcast.id)
+    assert (finished.status, finished.sent) == ("completed", 50)
+    assert len({recipient for [recipient], _ in smtp_sink.messages}) == 50  # nobody mailed twice
+
+async def test_resume_waits_for_the_paused_runner_to_finish_its_batch(db_session, engine, users_with_same_role_50_users):
+    broadcast = await engine.create(db_session, "News", "Hello {name}", BroadcastAudience.ALL, rate_per_minute=600)
+    await asyncio.sleep(0.2)
+    await engine.pause(db_session, broadcast.id)
+    # The first runner still holds its lease, so a second one can't start alongside it
+    assert await engine.resume(db_session, broadcast.id) is None
+    await engine.task(broadcast.id)
+    assert (await reload(db_session, broadcast.id)).lease_expires_at is None
+    assert (await engine.resume(db_session, broadcast.id)).run_id == 2
+    await engine.pause(db_session, broadcast.id)
+    await engine.task(broadcast.id)
+
+async def test_stale_runner_stops_when_another_worker_takes_over(db_session, engine, smtp_sink, users_with_same_role_50_users,
+                                                                 monkeypatch):
+    broadcast = await engine.create(db_session, "News", "Hello {name}", BroadcastAudience.ALL, rate_per_minute=600)
+    await asyncio.sleep(0.2)
+    assert await engine.resume(db_session, broadcast.id) is None  # its lease is live
+    # The runner's worker looks dead: its lease ran out mid-batch
+    await db_session.execute(EmailBroadcast.__table__.update().values(
+        rate_per_minute=60000, lease_expires_at=datetime.now(timezone.utc) - timedelta(seconds=1)))
+    await db_session.commit()
+    other_worker = BroadcastEngine()
+    monkeypatch.setattr(other_worker, "_get_smtp_client", engine._get_smtp_client)
+    assert (await other_worker.resume(db_session, broadcast.id)).run_id == 2
+    await other_worker.task(broadcast.id)
+    await engine.task(broadcast.id)
+    finished = await reload(db_session, broadcast.id)
+    assert (finished.status, finished.sent, finished.run_id) == ("completed", 50, 2)
+    assert engine.stats()["batches"] == 1  # the superseded runner stopped after its batch
+    assert len(smtp_sink.messages) == 50 + 7
+
+async def test_relay_outage_pauses_broadcast_without_advancing(db_session, engine, smtp_sink, users_with_same_role_50_users, monkeypatch):
+    unreachable = SMTPClient("127.0.0.1", 1, "sender@example.com", "secret", use_tls=False, timeout=1)
+    monkeypatch.setattr(engine, "_get_smtp_client", lambda: unreachable)
+    broadcast = await engine.create(db_session, "News", "Hello", BroadcastAudience.ALL, rate_per_minute=60000)
+    await engine.task(broadcast.id)
+    broadcast = await reload(db_session, broadcast.id)
+    assert (broadcast.status, broadcast.sent, broadcast.last_user_id) == ("paused", 0, None)
+    assert broadcast.last_error
+
+async def test_unknown_placeholders_are_rejected(db_session, engine):
+    with pytest.raises(ValueError):
+        await engine.create(db_session, "News", "Hello {password}", BroadcastAudience.ALL)
+
+async def test_pacer_spaces_sends():
+    pacer = Pacer(per_minute=6000)  # one every 10 ms
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    await asyncio.gather(*(pacer.wait() for _ in range(11)))
+    assert loop.time() - started >= 0.09
@@ -0,0 +1,133 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import select, update
+from benchmarks.smtp_sink import SMTPSink
+from app.database import Database
+from app.models.email_outbox_model import OutboxEmail
+from app.services.email_outbox_service import PRIORITY_BULK, PRIORITY_HIGH, EmailOutbox
+from app.services.email_service import EmailService
+from app.services.user_service import UserService
+from app.utils.smtp_connection import SMTPClient
+from app.utils.template_manager import TemplateManager
+from settings.config import get_settings
+from tests.conftest import AsyncTestingSessionLocal
+
+pytestmark = pytest.mark.asyncio
+
+@pytest.fixture
+def smtp_sink():
+    sink = SMTPSink().start()
+    yield sink
+    sink.stop()
+
+def make_email_service(port: int) -> EmailService:
+    service = EmailService(TemplateManager())
+    service.smtp_client = SMTPClient("127.0.0.1", port, "sender@example.com", "secret", use_tls=False, timeout=1)
+    return service
+
+async def outbox_rows(session):
+    query = select(OutboxEmail).order_by(OutboxEmail.created_at).execution_options(populate_existing=True)
+    return (await session.execute(query)).scalars().all()
+
+async def test_create_user_queues_verification_email(db_session):
+    user = await UserService.create(db_session, {
+        "nickname": "outbox_user", "email": "outbox@example.com", "password": "AnotherPassword$1234", "role": "ADMIN"
+    }, EmailService(TemplateManager()))
+    [email] = await outbox_rows(db_session)
+    assert (email.email_type, email.recipient, email.priority) == ("email_verification", user.email, PRIORITY_HIGH)
+    assert email.context["verification_url"].endswith(f"verify-email/{user.id}/{user.verification_token}")
+
+async def test_claim_orders_by_priority_and_leases_rows(db_session):
+    outbox = EmailOutbox()
+    outbox.enqueue(db_session, "email_verification", "bulk@example.com", {}, PRIORITY_BULK)
+    outbox.enqueue(db_session, "email_verification", "urgent@example.com", {}, PRIORITY_HIGH)
+    await db_session.commit()
+    claimed = await outbox.claim(db_session, 1)
+    assert [email.recipient for email in claimed] == ["urgent@example.com"]
+    assert claimed[0].attempts == 1
+    assert [email.recipient for email in await outbox.claim(db_session, 10)] == ["bulk@example.com"]
+    assert await outbox.claim(db_session, 10) == []  # both leased
+
+async def test_claim_skips_rows_locked_by_another_worker(db_session):
+    outbox = EmailOutbox()
+    outbox.enqueue(db_session, "email_verification", "a@example.com", {})
+    outbox.enqueue(db_session, "email_verification", "b@example.com", {})
+    await db_session.commit()
+    async with Database.get_session_factory()() as other_worker:
+        locked = (await other_worker.execute(
+            select(OutboxEmail).where(OutboxEmail.recipient == "a@example.com").with_for_update()
+        )).scalar_one()
+        claimed = await outbox.claim(db_session, 10)
+        assert [email.recipient for email in claimed] == ["b@example.com"]
+        assert locked.attempts == 0
+        await other_worker.rollback()
+
+async def test_process_batch_sends_and_marks_sent(db_session, smtp_sink):
+    outbox = EmailOutbox()
+    EmailService.queue_user_email(db_session, {"name": "Ann", "email": "ann@example.com", "verification_url": "http://x/"}, "email_verification")
+    await db_session.commit()
+    assert await outbox.process_batch(make_email_service(smtp_sink.port)) == 1
+    assert smtp_sink.messages[0][0] == ["ann@example.com"]
+    [email] = await outbox_rows(db_session)
+    assert email.sent_at is not None
+    assert outbox.stats()["sent"] == 1
+
+async def test_failed_sends_back_off_then_give_up(db_session):
+    outbox = EmailOutbox()
+    outbox.enqueue(db_session, "email_verification", "ann@example.com", {"name": "Ann", "email": "ann@example.com", "verification_url": "http://x/"})
+    await db_session.commit()
+    unreachable = make_email_service(1)
+    assert await outbox.process_batch(unreachable) == 1
+    [email] = await outbox_rows(db_session)
+    assert email.sent_at is None and email.failed_at is None and email.last_error
+    assert email.available_at > datetime.now(timezone.utc) + timedelta(seconds=outbox.retry_delay(1) - 5)
+
+    await db_session.execute(update(OutboxEmail).values(available_at=datetime.now(timezone.utc),
+                                                        attempts=get_settings().email_outbox_max_attempts - 1))
+    await db_session.commit()
+    await outbox.process_batch(unreachable)
+    [email] = await outbox_rows(db_session)
+    assert email.failed_at is not None
+    assert outbox.stats()["retried"] == 1 and outbox.stats()["failed"] == 1
+
+async def test_retry_delay_doubles_up_to_the_cap():
+    settings = get_settings()
+    outbox = EmailOutbox()
+    assert outbox.retry_delay(1) == settings.email_outbox_retry_base_seconds
+    assert outbox.retry_delay(2) == 2 * settings.email_outbox_retry_base_seconds
+    assert outbox.retry_delay(50) == settings.email_outbox_retry_max_seconds
+
+async def test_lockout_queues_account_locked_email(db_session, verified_user):
+    for _ in range(get_settings().max_login_attempts):
+        await UserService.login_user(db_session, verified_user.email, "wrongpassword")
+    emails = await outbox_rows(db_session)
+    assert [(email.email_type, email.recipient) for email in emails] == [("account_locked", verified_user.email)]
+    assert emails[0].context == {"name": verified_user.first_name, "email": verified_user.email}
+
+async def test_concurrent_failed_logins_queue_one_lock_email(db_session, verified_user):
+    async def attempt():
+        async with AsyncTestingSessionLocal() as session:
+            return await UserService.authenticate(session, verified_user.email, "wrongpassword")
+
+    await asyncio.gather(*(attempt() for _ in range(get_settings().max_login_attempts + 5)))
+    emails = await outbox_rows(db_session)
+    assert [email.email_type for email in emails] == ["account_locked"]
+
+async def test_stop_waits_for_the_running_batch(monkeypatch):
+    outbox = EmailOutbox()
+    started, finished = asyncio.Event(), []
+
+    async def slow_batch(email_service=None):
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        finally:
+            finished.append(True)
+
+    monkeypatch.setattr(outbox, "process_batch", slow_batch)
+    await outbox.start(lambda: None)
+    await started.wait()
+    await outbox.stop()
+    assert finished == [True]
+    assert not outbox.stats()["running"]
@@ -0,0 +1,69 @@
+import time
+from datetime import timedelta
+import jwt
+import pytest
+from app.services import jwt_service
+from app.services.jwt_service import ClaimsCache, claims_cache, create_access_token, decode_token
+from settings.config import get_settings, reload_settings
+
+@pytest.fixture(autouse=True)
+def fresh_claims_cache():
+    claims_cache.clear()
+    yield
+    claims_cache.clear()
+
+@pytest.fixture
+def count_decodes(monkeypatch):
+    calls = []
+    real_decode = jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return real_decode(*args, **kwargs)
+
+    monkeypatch.setattr(jwt_service.jwt, "decode", counting_decode)
+    return calls
+
+def test_decode_token_verifies_once(count_decodes):
+    token = create_access_token(data={"sub": "someone@example.com", "role": "admin"})
+    first = decode_token(token)
+    second = decode_token(token)
+    assert first == second
+    assert first["role"] == "ADMIN"
+    assert len(count_decodes) == 1
+
+def test_decode_token_returns_copies():
+    token = create_access_token(data={"sub": "someone@example.com", "role": "ADMIN"})
+    decode_token(token)["role"] = "tampered"
+    assert decode_token(token)["role"] == "ADMIN"
+
+def test_invalid_tokens_are_not_cached(count_decodes):
+    token = create_access_token(data={"sub": "someone@example.com", "role": "ADMIN"})
+    tampered = token[:-2] + ("AA" if not token.endswith("AA") else "BB")
+    assert decode_token(tampered) is None
+    assert decode_token(tampered) is None
+    assert len(count_decodes) == 2
+    assert claims_cache.stats()["size"] == 0
+
+def test_expired_entries_are_not_served():
+    cache = ClaimsCache(max_entries=10)
+    settings = get_settings()
+    cache.put("token", {"sub": "someone", "exp": time.time() - 1}, settings)
+    assert cache.get("token", settings) is None
+    cache.put("token", {"sub": "someone", "exp": time.time() + 60}, settings)
+    assert cache.get("token", settings) == {"sub": "someone", "exp": pytest.approx(time.time() + 60, abs=5)}
+
+def test_settings_reload_drops_cached_claims(count_decodes):
+    token = create_access_token(data={"sub": "someone@example.com", "role": "ADMIN"}, expires_delta=timedelta(minutes=5))
+    decode_token(token)
+    reload_settings()
+    decode_token(token)
+    assert len(count_decodes) == 2
+
+def test_cache_is_bounded():
+    cache = ClaimsCache(max_entries=2)
+    settings = get_settings()
+    for index in range(3):
+        cache.put(f"token{index}", {"exp": time.time() + 60}, settings)
+    assert cache.stats()["size"] == 2
+    assert cache.get("token0", settings) is None
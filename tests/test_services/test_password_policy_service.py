@@ -0,0 +1,44 @@
+import asyncio
+import pytest
+from sqlalchemy import select
+from app.models.password_policy_model import PasswordHashPolicy
+from app.services.password_policy_service import PasswordPolicyService
+from app.utils.security import PasswordHasher
+from tests.conftest import AsyncTestingSessionLocal
+
+pytestmark = pytest.mark.asyncio
+
+@pytest.fixture
+def hashers():
+    hashers = [PasswordHasher(max_workers=1, rounds=12) for _ in range(3)]
+    yield hashers
+    for hasher in hashers:
+        hasher.shutdown()
+
+async def test_workers_share_one_calibrated_cost(db_session, hashers, monkeypatch):
+    costs = iter([4, 5, 6])
+
+    async def calibrate(self, target_ms, min_rounds=10, max_rounds=16):
+        # Every worker would measure something slightly different
+        self.rounds = next(costs)
+        return self.rounds
+
+    monkeypatch.setattr(PasswordHasher, "calibrate", calibrate)
+    results = await asyncio.gather(*(
+        PasswordPolicyService.apply_calibrated_cost(AsyncTestingSessionLocal, hasher, 250, min_rounds=4, max_rounds=8)
+        for hasher in hashers
+    ))
+    assert results == [4, 4, 4]
+    assert {hasher.rounds for hasher in hashers} == {4}
+    policy = (await db_session.execute(select(PasswordHashPolicy))).scalar_one()
+    assert (policy.scheme, policy.cost, policy.target_ms) == ("bcrypt", 4, 250)
+
+async def test_changing_the_budget_recalibrates(db_session, hashers):
+    first, second, _ = hashers
+    await PasswordPolicyService.apply_calibrated_cost(AsyncTestingSessionLocal, first, 60_000, min_rounds=4, max_rounds=5)
+    assert first.rounds == 5
+    # A lower budget lowers the cost, and hashes made under the old one are then rehashed
+    await PasswordPolicyService.apply_calibrated_cost(AsyncTestingSessionLocal, second, 0, min_rounds=4, max_rounds=5)
+    assert second.rounds == 4
+    policy = (await db_session.execute(select(PasswordHashPolicy))).scalar_one()
+    assert (policy.cost, policy.target_ms) == (4, 0)
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import func, select, update
+from app.models.token_model import RefreshToken
+from app.services.refresh_token_service import RefreshTokenService
+from app.services.user_service import UserService
+
+pytestmark = pytest.mark.asyncio
+
+async def test_rotate_issues_a_new_token(db_session, verified_user):
+    token = await RefreshTokenService.issue(db_session, verified_user.id)
+    rotated = await RefreshTokenService.rotate(db_session, token)
+    assert rotated is not None
+    user, new_token = rotated
+    assert user.id == verified_user.id
+    assert new_token != token
+    assert await RefreshTokenService.rotate(db_session, new_token) is not None
+
+async def test_reused_token_revokes_the_family(db_session, verified_user):
+    token = await RefreshTokenService.issue(db_session, verified_user.id)
+    _, successor = await RefreshTokenService.rotate(db_session, token)
+    assert await RefreshTokenService.rotate(db_session, token) is None
+    # The legitimate successor is burned too, since we can't tell who holds it
+    assert await RefreshTokenService.rotate(db_session, successor) is None
+    tokens = (await db_session.execute(select(RefreshToken))).scalars().all()
+    assert all(stored.revoked_at is not None for stored in tokens)
+
+async def test_unknown_and_expired_tokens_are_rejected(db_session, verified_user):
+    assert await RefreshTokenService.rotate(db_session, "not-a-token") is None
+    token = await RefreshTokenService.issue(db_session, verified_user.id)
+    await db_session.execute(update(RefreshToken).values(expires_at=datetime.now(timezone.utc) - timedelta(minutes=1)))
+    await db_session.commit()
+    assert await RefreshTokenService.rotate(db_session, token) is None
+
+async def test_purge_deletes_only_expired_tokens(db_session, verified_user):
+    expired = await RefreshTokenService.issue(db_session, verified_user.id)
+    _, used_and_expired = await RefreshTokenService.rotate(db_session, expired)
+    await db_session.execute(update(RefreshToken).values(expires_at=datetime.now(timezone.utc) - timedelta(minutes=1)))
+    await db_session.commit()
+    live = await RefreshTokenService.issue(db_session, verified_user.id)
+    assert await RefreshTokenService.purge_expired(db_session) == 2
+    assert (await db_session.execute(select(func.count()).select_from(RefreshToken))).scalar() == 1
+    assert await RefreshTokenService.rotate(db_session, live) is not None
+
+async def test_locked_user_cannot_refresh(db_session, locked_user):
+    token = await RefreshTokenService.issue(db_session, locked_user.id)
+    assert await RefreshTokenService.rotate(db_session, token) is None
+
+async def test_password_reset_revokes_refresh_tokens(db_session, verified_user):
+    token = await RefreshTokenService.issue(db_session, verified_user.id)
+    assert await UserService.reset_password(db_session, verified_user.id, "NewPassword$1234")
+    assert await RefreshTokenService.rotate(db_session, token) is None
+
+async def test_only_the_hash_is_stored(db_session, verified_user):
+    token = await RefreshTokenService.issue(db_session, verified_user.id)
+    stored = (await db_session.execute(select(RefreshToken))).scalar_one()
+    assert stored.token_hash != token
+    assert len(stored.token_hash) == 64
@@ -0,0 +1,104 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+import pytest
+from sqlalchemy import func, select, update
+from app.models.token_model import RefreshToken, RevokedToken
+from app.services import token_revocation_service
+from app.services.refresh_token_service import RefreshTokenService
+from app.services.token_revocation_service import TokenRevocationService
+from settings.config import get_settings
+
+pytestmark = pytest.mark.asyncio
+
+def in_minutes(minutes: int) -> datetime:
+    return datetime.now(timezone.utc) + timedelta(minutes=minutes)
+
+async def test_revoked_token_is_detected(db_session):
+    service = TokenRevocationService()
+    jti = uuid4().hex
+    await service.revoke(db_session, jti, in_minutes(15))
+    assert await service.is_revoked(jti)
+    assert service.stats()["revoked_hits"] == 1
+
+async def test_unrevoked_tokens_skip_the_database(db_session):
+    service = TokenRevocationService()
+    await service.revoke(db_session, uuid4().hex, in_minutes(15))
+    for _ in range(100):
+        assert not await service.is_revoked(uuid4().hex)
+    stats = service.stats()
+    assert stats["checks"] == 100
+    assert stats["bloom_positives"] <= 2
+    assert not await service.is_revoked(None)
+
+async def test_other_workers_see_revocations_after_sync(db_session):
+    this_worker, other_worker = TokenRevocationService(), TokenRevocationService()
+    await other_worker.sync()
+    jti = uuid4().hex
+    await this_worker.revoke(db_session, jti, in_minutes(15))
+    await other_worker.sync()
+    assert await other_worker.is_revoked(jti)
+
+async def test_expired_revocations_are_skipped_and_purged(db_session):
+    service = TokenRevocationService()
+    expired, live = uuid4().hex, uuid4().hex
+    await service.revoke(db_session, expired, in_minutes(-1))
+    await service.revoke(db_session, live, in_minutes(15))
+    await service.sync()
+    assert service.stats()["entries"] == 1
+    assert await service.purge_expired(db_session) == 1
+    assert (await db_session.execute(select(func.count()).select_from(RevokedToken))).scalar() == 1
+
+async def test_periodic_purge_deletes_expired_revocations_and_refresh_tokens(db_session, verified_user, monkeypatch):
+    settings = get_settings().model_copy(update={"token_revocation_purge_seconds": 0})
+    monkeypatch.setattr(token_revocation_service, "get_settings", lambda: settings)
+    service = TokenRevocationService()
+    await service.revoke(db_session, uuid4().hex, in_minutes(-1))
+    await RefreshTokenService.issue(db_session, verified_user.id)
+    await db_session.execute(update(RefreshToken).values(expires_at=in_minutes(-1)))
+    await db_session.commit()
+    await service._purge_if_due()
+    assert service.stats()["purged"] == 1
+    assert service.stats()["purged_refresh_tokens"] == 1
+    assert (await db_session.execute(select(func.count()).select_from(RevokedToken))).scalar() == 0
+    assert (await db_session.execute(select(func.count()).select_from(RefreshToken))).scalar() == 0
+
+async def test_local_revocation_during_sync_survives_the_swap(db_session, monkeypatch):
+    service = TokenRevocationService()
+    jti = uuid4().hex
+    original = token_revocation_service.BloomFilter
+
+    def revoke_after_select(*args):
+        # Runs after the rebuild's SELECT and before the swap
+        service._remember(jti)
+        return original(*args)
+
+    monkeypatch.setattr(token_revocation_service, "BloomFilter", revoke_after_select)
+    await service.sync()
+    assert jti in service._bloom
+
+async def test_revoking_twice_is_harmless(db_session):
+    service = TokenRevocationService()
+    jti = uuid4().hex
+    await service.revoke(db_session, jti, in_minutes(15))
+    await service.revoke(db_session, jti, in_minutes(15))
+    assert await service.is_revoked(jti)
+
+async def test_stop_waits_for_the_running_rebuild(db_session, monkeypatch):
+    settings = get_settings().model_copy(update={"token_revocation_sync_seconds": 0})
+    monkeypatch.setattr(token_revocation_service, "get_settings", lambda: settings)
+    service = TokenRevocationService()
+    await service.start()
+    started, finished = asyncio.Event(), []
+
+    async def slow_sync():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        finally:
+            finished.append(True)
+
+    monkeypatch.setattr(service, "sync", slow_sync)
+    await started.wait()
+    await service.stop()
+    assert finished == [True]
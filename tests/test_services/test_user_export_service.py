@@ -0,0 +1,48 @@
+import csv
+import gzip
+import io
+import orjson
+import pytest
+from app.schemas.user_schemas import RecordFormat
+from app.services import user_export_service
+from app.services.user_export_service import UserExportService
+from app.utils.record_stream import iter_csv_batches
+from settings.config import get_settings
+
+pytestmark = pytest.mark.asyncio
+
+@pytest.fixture(autouse=True)
+def small_batches(monkeypatch):
+    settings = get_settings().model_copy(update={"user_export_batch_size": 7, "user_export_cursor_window": 20})
+    monkeypatch.setattr(user_export_service, "get_settings", lambda: settings)
+
+async def export(*args, **kwargs) -> bytes:
+    return b"".join([chunk async for chunk in UserExportService.stream(*args, **kwargs)])
+
+async def test_ndjson_export_walks_every_user_in_key_order(db_session, users_with_same_role_50_users):
+    lines = (await export(("email", "nickname"), RecordFormat.NDJSON)).splitlines()
+    rows = [orjson.loads(line) for line in lines]
+    assert len(rows) == 50
+    assert list(rows[0]) == ["email", "nickname", "id", "created_at"]
+    assert sorted(row["email"] for row in rows) == sorted(user.email for user in users_with_same_role_50_users)
+    assert [(row["created_at"], row["id"]) for row in rows] == sorted((row["created_at"], row["id"]) for row in rows)
+
+async def test_export_resumes_after_key(db_session, users_with_same_role_50_users):
+    rows = [orjson.loads(line) for line in (await export(("email",), RecordFormat.NDJSON)).splitlines()]
+    last = sorted(users_with_same_role_50_users, key=lambda user: (user.created_at, user.id))[29]
+    resumed = [orjson.loads(line) for line in
+               (await export(("email",), RecordFormat.NDJSON, after=(last.created_at, last.id))).splitlines()]
+    assert resumed == rows[30:]
+
+async def test_gzip_csv_export_round_trips_through_import_parser(db_session, users_with_same_role_50_users):
+    body = gzip.decompress(await export(("email", "nickname", "bio", "role"), RecordFormat.CSV, gzip=True))
+    header, *rows = list(csv.reader(io.StringIO(body.decode("utf-8"))))
+    assert header == ["email", "nickname", "bio", "role", "id", "created_at"]
+    assert len(rows) == 50
+
+    async def chunks():
+        yield body
+
+    records = [record for batch in [batch async for batch in iter_csv_batches(chunks(), 100)] for _, record in batch]
+    assert {record["email"] for record in records} == {user.email for user in users_with_same_role_50_users}
+    assert all(record["role"] == "AUTHENTICATED" for record in records)
@@ -0,0 +1,75 @@
+import pytest
+from sqlalchemy import func, select
+from app.models.email_outbox_model import OutboxEmail
+from app.models.user_model import User
+from app.services.email_outbox_service import PRIORITY_BULK
+from app.services import user_import_service
+from app.services.user_import_service import UserImportService
+from settings.config import get_settings
+
+pytestmark = pytest.mark.asyncio
+
+async def batches_of(records, size=2):
+    numbered = list(enumerate(records, start=1))
+    for start in range(0, len(numbered), size):
+        yield numbered[start:start + size]
+
+async def test_import_creates_users_and_queues_verification(db_session):
+    records = [{"email": f"import{i}@example.com", "password": "Secure*1234"} for i in range(5)]
+    report = await UserImportService.import_users(db_session, batches_of(records))
+    assert (report.total_rows, report.created, report.failed, report.errors) == (5, 5, 0, [])
+    users = (await db_session.execute(select(User).where(User.email.like("import%")))).scalars().all()
+    assert len(users) == 5
+    assert all(user.nickname and not user.email_verified and user.hashed_password != "Secure*1234" for user in users)
+    emails = (await db_session.execute(select(OutboxEmail))).scalars().all()
+    assert sorted(email.recipient for email in emails) == sorted(user.email for user in users)
+    assert {email.priority for email in emails} == {PRIORITY_BULK}
+
+async def test_import_reports_each_failed_row(db_session, user):
+    records = [
+        {"email": "fresh@example.com", "nickname": "fresh_one", "password": "Secure*1234"},
+        {"email": user.email, "password": "Secure*1234"},
+        {"email": "fresh@example.com", "password": "Secure*1234"},
+        {"email": "second@example.com", "nickname": user.nickname, "password": "Secure*1234"},
+        {"email": "not-an-email", "password": "Secure*1234"},
+        ValueError("Expected 3 columns, got 2"),
+    ]
+    report = await UserImportService.import_users(db_session, batches_of(records, size=4), send_verification=False)
+    assert (report.total_rows, report.created, report.failed) == (6, 1, 5)
+    assert [error.row for error in report.errors] == [2, 3, 4, 5, 6]
+    assert report.errors[0].errors == ["Email already exists"]
+    assert report.errors[1].errors == ["Email appears earlier in this import"]
+    assert report.errors[2].errors == ["Nickname already exists"]
+    assert report.errors[3].errors[0].startswith("email")
+    assert await db_session.scalar(select(func.count()).select_from(OutboxEmail)) == 0
+
+async def test_import_reports_values_too_long_for_their_columns(db_session):
+    records = [
+        {"email": "short@example.com", "password": "Secure*1234", "bio": "b" * 500},
+        {"email": "long@example.com", "password": "Secure*1234", "first_name": "f" * 101, "bio": "b" * 501},
+        {"email": "url@example.com", "password": "Secure*1234", "github_profile_url": "https://github.com/" + "g" * 250},
+    ]
+    report = await UserImportService.import_users(db_session, batches_of(records, size=3), send_verification=False)
+    assert (report.total_rows, report.created, report.failed) == (3, 1, 2)
+    assert report.errors[0].errors == ["first_name: must be at most 100 characters", "bio: must be at most 500 characters"]
+    assert report.errors[1].errors == ["github_profile_url: must be at most 255 characters"]
+
+async def test_import_holds_no_transaction_while_hashing(db_session, monkeypatch):
+    in_transaction = []
+    hash_password = user_import_service.password_hasher.hash
+
+    async def recording_hash(password, bulk=False):
+        in_transaction.append(db_session.in_transaction())
+        return await hash_password(password, bulk=bulk)
+
+    monkeypatch.setattr(user_import_service.password_hasher, "hash", recording_hash)
+    records = [{"email": f"import{i}@example.com", "password": "Secure*1234"} for i in range(3)]
+    report = await UserImportService.import_users(db_session, batches_of(records), send_verification=False)
+    assert report.created == 3
+    assert in_transaction == [False, False, False]
+
+async def test_import_truncates_error_list(db_session, monkeypatch):
+    settings = get_settings().model_copy(update={"user_import_max_errors": 2})
+    monkeypatch.setattr(user_import_service, "get_settings", lambda: settings)
+    report = await UserImportService.import_users(db_session, batches_of([{"email": "bad"}] * 4))
+    assert (report.failed, len(report.errors), report.errors_truncated) == (4, 2, True)
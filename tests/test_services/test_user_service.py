@@ -1,10 +1,16 @@
 from builtins import range
+import asyncio
 import pytest
-from sqlalchemy import select
+from sqlalchemy import event, select, text
+from app.database import Database
 from app.dependencies import get_settings
 from app.models.user_model import User, UserRole
-from app.services.user_service import UserService
+from app.services.user_cache import UserSnapshot, user_cache
+from app.services.user_service import COUNT_CACHED, COUNT_ESTIMATED, COUNT_EXACT, LOGIN_INVALID, LOGIN_LOCKED, LOGIN_OK, UserService
 from app.utils.nickname_gen import generate_nickname
+from app.utils.pagination import Cursor
+from app.utils.security import hash_password, password_hasher
+from tests.conftest import AsyncTestingSessionLocal, engine
 
 pytestmark = pytest.mark.asyncio
 
@@ -35,6 +41,22 @@ async def test_get_by_id_user_exists(db_session, user):
     retrieved_user = await UserService.get_by_id(db_session, user.id)
     assert retrieved_user.id == user.id
 
+# Test that lookups run in the current transaction instead of committing after each SELECT
+async def test_lookups_do_not_commit(db_session, user, monkeypatch):
+    commits = []
+    monkeypatch.setattr(db_session, "commit", lambda: commits.append(True))
+    await UserService.get_by_email(db_session, user.email)
+    await UserService.get_by_id(db_session, user.id)
+    await UserService.list_users(db_session)
+    assert commits == []
+    assert db_session.in_transaction()
+
+# Test that a column projection returns plain rows holding only those columns
+async def test_get_by_id_with_columns(db_session, user):
+    row = await UserService.get_by_id(db_session, user.id, columns=("id", "email"))
+    assert not isinstance(row, User)
+    assert row._asdict() == {"id": user.id, "email": user.email}
+
 # Test fetching a user by ID when the user does not exist
 async def test_get_by_id_user_does_not_exist(db_session):
     non_existent_user_id = "non-existent-id"
@@ -92,6 +114,48 @@ async def test_list_users_with_pagination(db_session, users_with_same_role_50_us
     assert len(users_page_2) == 10
     assert users_page_1[0].id != users_page_2[0].id
 
+# Test walking every user with keyset pagination, forwards and backwards
+async def test_list_users_keyset(db_session, users_with_same_role_50_users):
+    seen = []
+    cursor = None
+    while True:
+        page, has_more = await UserService.list_users_keyset(db_session, limit=15, cursor=cursor)
+        seen.extend(user.id for user in page)
+        if not has_more:
+            break
+        cursor = Cursor(key=(page[-1].created_at, page[-1].id))
+    assert len(seen) == 50
+    assert len(set(seen)) == 50
+
+    last_page, has_more = await UserService.list_users_keyset(db_session, limit=15, cursor=Cursor(key=None, backward=True))
+    assert [user.id for user in last_page] == seen[-15:]
+    assert has_more
+    previous_page, _ = await UserService.list_users_keyset(
+        db_session, limit=15, cursor=Cursor(key=(last_page[0].created_at, last_page[0].id), backward=True))
+    assert [user.id for user in previous_page] == seen[-30:-15]
+
+# Test the exact, estimated and cached user count strategies
+async def test_count_with_strategy_exact(db_session, users_with_same_role_50_users):
+    assert await UserService.count_with_strategy(db_session, COUNT_EXACT) == (50, COUNT_EXACT)
+
+async def test_count_with_strategy_estimated(db_session, users_with_same_role_50_users):
+    # Before the first ANALYZE there is no estimate, so an exact count is returned
+    assert await UserService.count_with_strategy(db_session, COUNT_ESTIMATED) == (50, COUNT_EXACT)
+    await db_session.execute(text("ANALYZE users"))
+    assert await UserService.count_with_strategy(db_session, COUNT_ESTIMATED) == (50, COUNT_ESTIMATED)
+
+async def test_count_with_strategy_cached(db_session, users_with_same_role_50_users, email_service):
+    UserService.invalidate_count()
+    assert await UserService.count_with_strategy(db_session, COUNT_CACHED) == (50, COUNT_EXACT)
+    assert await UserService.count_with_strategy(db_session, COUNT_CACHED) == (50, COUNT_CACHED)
+    await UserService.delete(db_session, users_with_same_role_50_users[0].id)
+    assert await UserService.count_with_strategy(db_session, COUNT_CACHED) == (49, COUNT_EXACT)
+    UserService.invalidate_count()
+
+async def test_count_with_unknown_strategy(db_session):
+    with pytest.raises(ValueError):
+        await UserService.count_with_strategy(db_session, "guess")
+
 # Test registering a user with valid data
 async def test_register_user_with_valid_data(db_session, email_service):
     user_data = {
@@ -122,6 +186,16 @@ async def test_login_user_successful(db_session, verified_user):
     logged_in_user = await UserService.login_user(db_session, user_data["email"], user_data["password"])
     assert logged_in_user is not None
 
+# Test that a successful login upgrades a hash made under an outdated policy
+async def test_login_user_rehashes_outdated_hash(db_session, verified_user, monkeypatch):
+    verified_user.hashed_password = hash_password("MySuperPassword$1234", rounds=4)
+    await db_session.commit()
+    monkeypatch.setattr(password_hasher, "rounds", 5)
+    logged_in_user = await UserService.login_user(db_session, verified_user.email, "MySuperPassword$1234")
+    assert logged_in_user is not None
+    assert logged_in_user.hashed_password.startswith("$2b$05$")
+    assert not password_hasher.needs_rehash(logged_in_user.hashed_password)
+
 # Test user login with incorrect email
 async def test_login_user_incorrect_email(db_session):
     user = await UserService.login_user(db_session, "nonexistentuser@noway.com", "Password123!")
@@ -161,3 +235,70 @@ async def test_unlock_user_account(db_session, locked_user):
     assert unlocked, "The account should be unlocked"
     refreshed_user = await UserService.get_by_id(db_session, locked_user.id)
     assert not refreshed_user.is_locked, "The user should no longer be locked"
+
+async def test_cached_lookup_serves_snapshots(db_session, verified_user):
+    first = await UserService.get_by_id(db_session, verified_user.id, cached=True)
+    assert isinstance(first, UserSnapshot)
+    hits = user_cache.stats()["hits"]
+    assert await UserService.get_by_email(db_session, verified_user.email, cached=True) is first
+    assert user_cache.stats()["hits"] == hits + 1
+    # Uncached lookups still return session-bound ORM users
+    assert isinstance(await UserService.get_by_id(db_session, verified_user.id), User)
+
+async def test_cached_lookup_on_replica_does_not_fill_cache(db_session, verified_user):
+    replica_session_factory = Database._make_session_factory(db_session.bind, readonly=True, replica=True)
+    async with replica_session_factory() as replica_session:
+        snapshot = await UserService.get_by_id(replica_session, verified_user.id, cached=True)
+    assert isinstance(snapshot, UserSnapshot) and snapshot.email == verified_user.email
+    assert user_cache.get("id", verified_user.id) is None
+    # Reads on the primary still fill it, and replica reads are then served from it
+    primary_snapshot = await UserService.get_by_id(db_session, verified_user.id, cached=True)
+    async with replica_session_factory() as replica_session:
+        assert await UserService.get_by_id(replica_session, verified_user.id, cached=True) is primary_snapshot
+
+async def test_writes_invalidate_cached_user(db_session, verified_user):
+    await UserService.get_by_id(db_session, verified_user.id, cached=True)
+    await UserService.update(db_session, verified_user.id, {"first_name": "Changed"})
+    assert (await UserService.get_by_id(db_session, verified_user.id, cached=True)).first_name == "Changed"
+
+    await UserService.login_user(db_session, verified_user.email, "WrongPassword!")
+    assert (await UserService.get_by_id(db_session, verified_user.id, cached=True)).failed_login_attempts == 1
+
+    assert await UserService.delete(db_session, verified_user.id)
+    assert await UserService.get_by_id(db_session, verified_user.id, cached=True) is None
+
+async def test_unlock_invalidates_cached_lock_state(db_session, locked_user):
+    assert await UserService.is_account_locked(db_session, locked_user.email)
+    assert await UserService.unlock_user_account(db_session, locked_user.id)
+    assert not await UserService.is_account_locked(db_session, locked_user.email)
+
+async def test_authenticate_uses_two_statements_without_a_transaction(verified_user):
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement.split()[0])
+    event.listen(engine.sync_engine, "before_cursor_execute", listener)
+    try:
+        async with AsyncTestingSessionLocal() as session:
+            outcome, user = await UserService.authenticate(session, verified_user.email, "MySuperPassword$1234")
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", listener)
+    assert outcome == LOGIN_OK
+    assert user.last_login_at is not None
+    assert statements == ["SELECT", "UPDATE"]
+
+async def test_authenticate_reports_locked_accounts(db_session, locked_user):
+    assert await UserService.authenticate(db_session, locked_user.email, "MySuperPassword$1234") == (LOGIN_LOCKED, None)
+
+async def test_concurrent_failed_logins_are_all_counted(verified_user):
+    attempts = get_settings().max_login_attempts + 2
+
+    async def failed_login():
+        async with AsyncTestingSessionLocal() as session:
+            return await UserService.authenticate(session, verified_user.email, "wrongpassword")
+
+    outcomes = await asyncio.gather(*(failed_login() for _ in range(attempts)))
+    assert all(outcome in (LOGIN_INVALID, LOGIN_LOCKED) for outcome, _ in outcomes)
+    async with AsyncTestingSessionLocal() as session:
+        stored = (await session.execute(select(User).filter_by(id=verified_user.id))).scalar_one()
+    # Attempts that read the row before the lock landed still increment atomically
+    assert stored.is_locked
+    assert stored.failed_login_attempts == sum(outcome == LOGIN_INVALID for outcome, _ in outcomes)
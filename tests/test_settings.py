@@ -0,0 +1,44 @@
+import pytest
+from pydantic import ValidationError
+from settings.config import add_reload_listener, get_settings, reload_settings, remove_reload_listener
+
+@pytest.fixture
+def restore_settings(monkeypatch):
+    yield monkeypatch
+    monkeypatch.undo()
+    reload_settings()
+
+def test_get_settings_returns_shared_snapshot():
+    assert get_settings() is get_settings()
+
+def test_settings_snapshot_is_immutable():
+    with pytest.raises(ValidationError):
+        get_settings().max_login_attempts = 10
+
+def test_reload_settings_swaps_snapshot(restore_settings):
+    previous = get_settings()
+    seen = []
+    add_reload_listener(seen.append)
+    try:
+        restore_settings.setenv("MAX_LOGIN_ATTEMPTS", "7")
+        reloaded = reload_settings()
+    finally:
+        remove_reload_listener(seen.append)
+    assert reloaded is not previous
+    assert get_settings() is reloaded
+    assert get_settings().max_login_attempts == 7
+    assert seen[-1] is reloaded
+
+def test_reload_settings_keeps_previous_on_error(restore_settings):
+    previous = get_settings()
+    restore_settings.setenv("MAX_LOGIN_ATTEMPTS", "not-a-number")
+    with pytest.raises(ValidationError):
+        reload_settings()
+    assert get_settings() is previous
+
+def test_reload_settings_rejects_unknown_count_strategy(restore_settings):
+    previous = get_settings()
+    restore_settings.setenv("USER_COUNT_STRATEGY", "exakt")
+    with pytest.raises(ValidationError):
+        reload_settings()
+    assert get_settings() is previous
@@ -0,0 +1,78 @@
+import asyncio
+import smtplib
+import pytest
+from benchmarks.smtp_sink import SMTPSink
+from app.utils import smtp_connection
+from app.utils.smtp_connection import SMTPClient, get_smtp_client
+from settings.config import get_settings
+
+@pytest.fixture
+def smtp_sink():
+    sink = SMTPSink().start()
+    yield sink
+    sink.stop()
+
+def make_client(sink, **options) -> SMTPClient:
+    return SMTPClient(sink.host, sink.port, "sender@example.com", "secret", use_tls=False, **options)
+
+async def test_send_email_reuses_session(smtp_sink):
+    client = make_client(smtp_sink)
+    for i in range(3):
+        await client.send_email("Hello", f"<p>message {i}</p>", f"user{i}@example.com")
+    assert smtp_sink.connections == 1
+    assert [recipients for recipients, _ in smtp_sink.messages] == [[f"user{i}@example.com"] for i in range(3)]
+    assert b"Subject: Hello" in smtp_sink.messages[0][1]
+    assert client.stats()["sent"] == 3
+    await client.close()
+
+async def test_concurrent_sends_are_bounded_by_pool_size(smtp_sink):
+    smtp_sink.message_delay = 0.02
+    client = make_client(smtp_sink, pool_size=2)
+    await asyncio.gather(*(client.send_email("Hi", "<p>hi</p>", f"user{i}@example.com") for i in range(10)))
+    assert len(smtp_sink.messages) == 10
+    assert smtp_sink.connections == 2
+    assert client.stats()["open_connections"] == 2
+    await client.close()
+    assert client.stats()["open_connections"] == 0
+
+async def test_session_replaced_after_message_limit(smtp_sink):
+    client = make_client(smtp_sink, max_messages_per_connection=2)
+    for i in range(5):
+        await client.send_email("Hi", "<p>hi</p>", "user@example.com")
+    assert smtp_sink.connections == 3
+    await client.close()
+
+async def test_reconnects_when_server_drops_session(smtp_sink):
+    client = make_client(smtp_sink)
+    await client.send_email("Hi", "<p>hi</p>", "user@example.com")
+    smtp_sink.drop_connections()
+    await client.send_email("Hi", "<p>hi</p>", "user@example.com")
+    assert len(smtp_sink.messages) == 2
+    assert client.stats()["reconnects"] == 1
+    await client.close()
+
+async def test_connect_failure_raises():
+    client = SMTPClient("127.0.0.1", 1, "sender@example.com", "secret", use_tls=False, timeout=1)
+    with pytest.raises(OSError):
+        await client.send_email("Hi", "<p>hi</p>", "user@example.com")
+    assert client.stats()["failed"] == 1
+
+def test_shared_client_follows_settings(monkeypatch):
+    monkeypatch.setattr(smtp_connection, "_shared_client", None)
+    settings = get_settings()
+    client = get_smtp_client(settings)
+    assert get_smtp_client(settings) is client
+    assert get_smtp_client(settings.model_copy(update={"smtp_pool_size": 7})).pool_size == 7
+
+async def test_retired_client_closes_sessions_and_threads_after_sends_drain(smtp_sink):
+    smtp_sink.message_delay = 0.05
+    client = make_client(smtp_sink, pool_size=2)
+    await client.send_email("Hi", "<p>hi</p>", "idle@example.com")
+    sends = [asyncio.create_task(client.send_email("Hi", "<p>hi</p>", f"user{i}@example.com")) for i in range(2)]
+    await asyncio.sleep(0.01)
+    client.retire()
+    assert client._executor is not None  # still needed by the sends in flight
+    await asyncio.gather(*sends)
+    assert len(smtp_sink.messages) == 3
+    assert client.stats()["open_connections"] == 0
+    assert client._executor is None
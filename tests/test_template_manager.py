@@ -0,0 +1,44 @@
+import os
+import pytest
+from app.utils import template_manager
+from app.utils.template_manager import TemplateManager
+
+@pytest.fixture
+def templates(tmp_path, monkeypatch):
+    monkeypatch.setattr(template_manager, "_compiled", {})
+    (tmp_path / "header.md").write_text("# Header\n")
+    (tmp_path / "footer.md").write_text("Footer\n")
+    (tmp_path / "greeting.md").write_text("Hello {name},\n\n[Open]({url})\n")
+    manager = TemplateManager()
+    manager.templates_dir = tmp_path
+    return manager
+
+def test_render_substitutes_into_compiled_html(templates):
+    html = templates.render_template("greeting", name="Ann", url="http://example.com/a?b=1&c=2", email="unused")
+    assert "<h1 style=" in html and "Hello Ann," in html
+    assert 'href="http://example.com/a?b=1&amp;c=2"' in html
+    assert html.startswith('<div style="font-family') and html.endswith("</div>")
+
+def test_render_escapes_values(templates):
+    html = templates.render_template("greeting", name="<script>alert(1)</script>", url='" onclick="x')
+    assert "<script>" not in html
+    assert "&lt;script&gt;" in html
+    assert 'href="&quot; onclick=&quot;x"' in html
+
+def test_templates_compile_once_and_recompile_on_change(templates, monkeypatch):
+    templates.render_template("greeting", name="Ann", url="u")
+    reads = []
+    read = TemplateManager._read_template
+    monkeypatch.setattr(TemplateManager, "_read_template", lambda self, filename: reads.append(filename) or read(self, filename))
+    templates.render_template("greeting", name="Bob", url="u")
+    assert reads == []
+    path = templates.templates_dir / "greeting.md"
+    path.write_text("Bye {name}\n")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert "Bye Bob" in templates.render_template("greeting", name="Bob")
+    assert reads == ["greeting.md"]
+
+def test_missing_value_raises(templates):
+    with pytest.raises(KeyError):
+        templates.render_template("greeting", name="Ann")
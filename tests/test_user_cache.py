@@ -0,0 +1,75 @@
+from uuid import uuid4
+import pytest
+from app.models.user_model import User, UserRole
+from app.services.user_cache import SNAPSHOT_FIELDS, UserCache, UserSnapshot
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def make_user(index: int = 0) -> User:
+    return User(id=uuid4(), nickname=f"user_{index}", email=f"user_{index}@example.com", role=UserRole.AUTHENTICATED,
+                hashed_password="secret", verification_token="token", is_locked=False)
+
+def test_snapshot_is_immutable_and_drops_secrets():
+    snapshot = UserSnapshot.from_user(make_user())
+    assert snapshot.nickname == "user_0"
+    assert not hasattr(snapshot, "__dict__")
+    assert "hashed_password" not in SNAPSHOT_FIELDS and "verification_token" not in SNAPSHOT_FIELDS
+    with pytest.raises(AttributeError):
+        snapshot.nickname = "changed"
+
+def test_cache_lookup_by_id_email_and_nickname():
+    cache = UserCache(max_entries=10, ttl_seconds=30)
+    user = make_user()
+    cache.put(user)
+    assert cache.get("id", user.id).email == user.email
+    assert cache.get("email", user.email).id == user.id
+    assert cache.get("nickname", user.nickname).id == user.id
+    assert cache.get("email", "missing@example.com") is None
+    assert cache.stats()["hits"] == 3
+    assert cache.stats()["misses"] == 1
+
+def test_cache_ttl_expiry():
+    clock = FakeClock()
+    cache = UserCache(max_entries=10, ttl_seconds=5, clock=clock)
+    user = make_user()
+    cache.put(user)
+    clock.now = 4.9
+    assert cache.get("id", user.id) is not None
+    clock.now = 5.0
+    assert cache.get("id", user.id) is None
+    assert cache.get("email", user.email) is None
+    assert cache.stats()["size"] == 0
+
+def test_cache_lru_eviction():
+    cache = UserCache(max_entries=2, ttl_seconds=30)
+    first, second, third = make_user(1), make_user(2), make_user(3)
+    cache.put(first)
+    cache.put(second)
+    cache.get("id", first.id)  # first becomes most recently used
+    cache.put(third)
+    assert cache.get("id", second.id) is None
+    assert cache.get("email", second.email) is None
+    assert cache.get("id", first.id) is not None
+    assert cache.stats()["evictions"] == 1
+
+def test_cache_invalidate_by_id_or_email():
+    cache = UserCache(max_entries=10, ttl_seconds=30)
+    first, second = make_user(1), make_user(2)
+    cache.put(first)
+    cache.put(second)
+    cache.invalidate(first.id)
+    cache.invalidate(email=second.email)
+    assert cache.get("id", first.id) is None
+    assert cache.get("id", second.id) is None
+    assert cache.stats()["invalidations"] == 2
+
+def test_disabled_cache_stores_nothing():
+    cache = UserCache(max_entries=0, ttl_seconds=30)
+    assert not cache.enabled
+    assert cache.put(make_user()) is None
+    assert cache.stats()["size"] == 0